@@ -1,20 +1,53 @@
 import re
 import os
+import io
+import sys
+import signal
+import csv
+import math
+import json
+import html
+import time
+import itertools
+import argparse
+import zlib
 import sqlite3
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from collections.abc import Mapping, MutableMapping
+from array import array
+from bisect import bisect_left, bisect_right
 from abc import ABC, abstractmethod
+from database import (init_db, get_db, close_db, get_schema_version, check_query_plans, rebuild_payroll_summary,
+                      check_payroll_summary, WriteBehindQueue, IdSequence, EMP_ID_NUMBER_SQL,
+                      DB_PATH)
+from contributions import contribution_rules, LEGACY_FLAT_RATES
+from withholding_tax import withholding_tax_rules
+from payroll_formats import is_pay_period, format_money, CENTAVOS_PER_PESO
+from payroll_export import EXPORT_FORMATS
+from audit_ledger import AuditLedger, audit_path, ISSUED, DELETED
+
+def _intern(value):
+    # Values shared by many employees (department, manager, job title, dates) are stored once
+    return sys.intern(value) if type(value) is str else value
 
 class Employee(ABC):
+    # Fixed attribute slots instead of a per-instance __dict__ (names are mangled like the attributes)
+    __slots__ = ("__emp_id", "__name", "__job_title", "__email", "__phone", "__department",
+                 "__manager", "__hire_date", "__birth_date")
+
     def __init__(self, emp_id, name, job_title, email, phone, department, manager, hire_date, birth_date):
         self.__emp_id = emp_id
         self.__name = name
-        self.__job_title = job_title
+        self.__job_title = _intern(job_title)
         self.__email = email
         self.__phone = phone
-        self.__department = department
-        self.__manager = manager
-        self.__hire_date = hire_date
-        self.__birth_date = birth_date
+        self.__department = _intern(department)
+        self.__manager = _intern(manager)
+        self.__hire_date = _intern(hire_date)
+        self.__birth_date = _intern(birth_date)
     
     # Getter methods
     def get_emp_id(self): return self.__emp_id
@@ -37,55 +70,449 @@ class Employee(ABC):
                 f"Manager: {self.__manager}, Hire Date: {self.__hire_date}, "
                 f"Birth Date: {self.__birth_date}")
     def get_department_code(self):
-        department_mapping = {
-            "HUMAN RESOURCES": "HR",
-            "INFORMATION TECHNOLOGY": "IT",
-            "FINANCE": "FIN",
-            "MARKETING": "MKT",
-            "ENGINEERING": "ENG"
-        }
-        return department_mapping.get(self.get_department().upper())
+        """The department's code (HR, IT, FIN, MKT, ENG) as HOURLY_RATES keys it; a department
+        stored as its code is returned as is, and anything else unchanged (default rate)"""
+        department = self.get_department()
+        return DEPARTMENT_NAME_CODES.get(department.upper(), department)
         
 class FullTimeEmployee(Employee):
+    __slots__ = ()
+    TYPE_CODE = 'F'
+    HOURLY_RATES = {
+        "HR": 67.13, "IT": 117.00, "FIN": 168.00,
+        "MKT": 111.00, "ENG": 144.00
+    }
+    DEFAULT_RATE = 100.00
+
     def calculate_salary(self, total_hours_worked, over_hours):
-        hourly_rates = {
-            "HR": 67.13, "IT": 117.00, "FIN": 168.00,
-            "MKT": 111.00, "ENG": 144.00
-        }
-        base_rate = hourly_rates.get(self.get_department(), 100.00)
+        base_rate = self.HOURLY_RATES.get(self.get_department_code(), self.DEFAULT_RATE)
         regular_pay = total_hours_worked * base_rate
         overtime_pay = over_hours * (base_rate * 1.5)
         return regular_pay + overtime_pay
 
 class PartTimeEmployee(Employee):
+    __slots__ = ()
+    TYPE_CODE = 'P'
+    HOURLY_RATES = {
+        "HR": 33.57, "IT": 58.50, "FIN": 84.00,
+        "MKT": 55.50, "ENG": 72.00
+    }
+    DEFAULT_RATE = 50.00
+
     def calculate_salary(self, total_hours_worked, over_hours):
-        hourly_rates = {
-            "HR": 33.57, "IT": 58.50, "FIN": 84.00,
-            "MKT": 55.50, "ENG": 72.00
-        }
-        base_rate = hourly_rates.get(self.get_department(), 50.00)
+        base_rate = self.HOURLY_RATES.get(self.get_department_code(), self.DEFAULT_RATE)
         regular_pay = total_hours_worked * base_rate
         overtime_pay = over_hours * (base_rate * 1.25)
         return regular_pay + overtime_pay
 
 class ContractEmployee(Employee):
+    __slots__ = ()
+    TYPE_CODE = 'C'
+    HOURLY_RATES = {
+        "HR": 50.35, "IT": 87.75, "FIN": 126.00,
+        "MKT": 83.25, "ENG": 108.00
+    }
+    DEFAULT_RATE = 75.00
+
     def calculate_salary(self, total_hours_worked, over_hours):
-        hourly_rates = {
-            "HR": 50.35, "IT": 87.75, "FIN": 126.00,
-            "MKT": 83.25, "ENG": 108.00
-        }
-        base_rate = hourly_rates.get(self.get_department(), 75.00)
+        base_rate = self.HOURLY_RATES.get(self.get_department_code(), self.DEFAULT_RATE)
         return (total_hours_worked + over_hours) * base_rate
 
 class InternEmployee(Employee):
+    __slots__ = ()
+    TYPE_CODE = 'I'
+    HOURLY_RATES = {
+        "HR": 25.17, "IT": 43.88, "FIN": 63.00,
+        "MKT": 41.63, "ENG": 54.00
+    }
+    DEFAULT_RATE = 37.50
+
     def calculate_salary(self, total_hours_worked, over_hours):
-        hourly_rates = {
-            "HR": 25.17, "IT": 43.88, "FIN": 63.00,
-            "MKT": 41.63, "ENG": 54.00
-        }
-        base_rate = hourly_rates.get(self.get_department(), 37.50)
+        base_rate = self.HOURLY_RATES.get(self.get_department_code(), self.DEFAULT_RATE)
         return total_hours_worked * base_rate
-    
+
+# Integer codes used by the vectorized payroll path. An employee type code is the
+# position of its class in EMPLOYEE_TYPES, a department code is the position of the
+# department in DEPARTMENT_CODES, and -1 means "not in the rate table" (default rate).
+EMPLOYEE_TYPES = (FullTimeEmployee, PartTimeEmployee, ContractEmployee, InternEmployee)
+DEPARTMENT_CODES = ("HR", "IT", "FIN", "MKT", "ENG")
+EMPLOYEE_CLASSES = {cls.TYPE_CODE: cls for cls in EMPLOYEE_TYPES}
+EMPLOYEE_TYPE_NAMES = {'F': "Full-time", 'P': "Part-time", 'C': "Contract", 'I': "Intern"}
+
+# Money is held as integer centavos everywhere past the hourly rate arithmetic. Peso
+# amounts are converted once, rounding half away from zero; ROUNDING_EPSILON absorbs
+# binary floating-point noise so that 0.145 pesos (14.499999999999998 centavos) becomes 15.
+ROUNDING_EPSILON = 1e-7
+# Largest single amount (1 trillion pesos) a payslip figure is rounded from. Totals of a
+# few such amounts, and those totals times a rate in basis points in the contribution and
+# tax tables, then stay well inside int64, so the NumPy path cannot overflow either.
+MAX_CENTAVOS = 10 ** 14
+
+def round_centavos(value):
+    """
+    Round a float amount of centavos to a whole centavo, halves away from zero.
+    Raises ValueError for NaN, infinity or more than MAX_CENTAVOS either way.
+    """
+    if not abs(value) <= MAX_CENTAVOS:
+        raise ValueError("amount is not finite or too large to store")
+    magnitude = math.floor(abs(value) + 0.5 + ROUNDING_EPSILON)
+    return -magnitude if value < 0 else magnitude
+
+def round_centavos_array(values):
+    """round_centavos for a numpy array; the same checks and operations in the same order"""
+    import numpy as np
+    values = np.asarray(values, dtype=np.float64)
+    # Checked before the int64 cast, which would wrap around silently
+    if not (np.abs(values) <= MAX_CENTAVOS).all():
+        raise ValueError("amount is not finite or too large to store")
+    magnitude = np.floor(np.abs(values) + 0.5 + ROUNDING_EPSILON)
+    return np.where(values < 0, -magnitude, magnitude).astype(np.int64)
+
+def to_centavos(pesos):
+    """Convert a peso amount (int, float or numeric string) to integer centavos"""
+    return round_centavos(float(pesos) * CENTAVOS_PER_PESO)
+
+def encode_employees(employees):
+    """Return (type_codes, department_codes) arrays for a sequence of employees"""
+    import numpy as np
+    type_index = {cls: code for code, cls in enumerate(EMPLOYEE_TYPES)}
+    department_index = {dept: code for code, dept in enumerate(DEPARTMENT_CODES)}
+    type_codes = np.fromiter((type_index[type(emp)] for emp in employees), dtype=np.int8)
+    # Same key calculate_salary uses for its rate lookup
+    department_codes = np.fromiter((department_index.get(emp.get_department_code(), -1) for emp in employees),
+                                   dtype=np.int8)
+    return type_codes, department_codes
+
+def calculate_payroll_vectorized(total_hours_worked, over_hours, type_codes, department_codes,
+                                 salary_advance=0, incentives=0, bonus=0, rules=None, tax_rules=None):
+    """
+    Vectorized version of calculate_salary + compute_payslip for whole arrays of employees.
+    Returns a dictionary of arrays keyed like a payslip, hours as float64 and money as int64
+    centavos; the figures are identical to the per-object methods. salary_advance, incentives
+    and bonus are in pesos; rules and tax_rules are the ContributionRules and
+    WithholdingTaxRules to apply (default: this month's). Like compute_payslip, raises
+    ValueError when any amount is not finite or over MAX_CENTAVOS.
+    """
+    import numpy as np
+    hours = np.asarray(total_hours_worked, dtype=np.float64)
+    over = np.asarray(over_hours, dtype=np.float64)
+    type_codes = np.asarray(type_codes)
+    department_codes = np.asarray(department_codes)
+    salary_advance = np.broadcast_to(
+        round_centavos_array(np.asarray(salary_advance, dtype=np.float64) * CENTAVOS_PER_PESO), hours.shape)
+    incentives = np.broadcast_to(
+        round_centavos_array(np.asarray(incentives, dtype=np.float64) * CENTAVOS_PER_PESO), hours.shape)
+    bonus = np.broadcast_to(round_centavos_array(np.asarray(bonus, dtype=np.float64) * CENTAVOS_PER_PESO),
+                            hours.shape)
+
+    # Rate table: one row per employee type, one column per department plus the default
+    # rate in the last column so that department code -1 picks it up
+    rates = np.array([[cls.HOURLY_RATES[dept] for dept in DEPARTMENT_CODES] + [cls.DEFAULT_RATE]
+                      for cls in EMPLOYEE_TYPES])
+    base_rate = rates[type_codes, department_codes]
+
+    # Each branch repeats the arithmetic of the matching calculate_salary exactly
+    full_time = type_codes == 0
+    part_time = type_codes == 1
+    contract = type_codes == 2
+    base_salary = hours * base_rate
+    base_salary = np.where(full_time, base_salary + over * (base_rate * 1.5), base_salary)
+    base_salary = np.where(part_time, hours * base_rate + over * (base_rate * 1.25), base_salary)
+    base_salary = np.where(contract, (hours + over) * base_rate, base_salary)
+    base_salary = round_centavos_array(base_salary * CENTAVOS_PER_PESO)
+
+    sss, philhealth, pagibig = (rules or contribution_rules()).apply_array(base_salary)
+
+    hourly = np.divide(base_salary, hours, out=np.zeros_like(hours), where=hours > 0)
+    overtime_pay = np.where(hours > 0, round_centavos_array(over * hourly * 1.25), 0)
+    total_earnings = base_salary + incentives + bonus + overtime_pay
+    withholding_tax = (tax_rules or withholding_tax_rules()).apply_array(total_earnings - sss - philhealth - pagibig)
+    total_deductions = salary_advance + sss + philhealth + pagibig + withholding_tax
+    net_pay = total_earnings - total_deductions
+
+    return {
+        "total_hours_worked": hours,
+        "over_hours": over,
+        "basic_salary": base_salary,
+        "incentives": incentives,
+        "bonus": bonus,
+        "overtime_pay": overtime_pay,
+        "total_earnings": total_earnings,
+        "salary_advance": salary_advance,
+        "sss_employee_contribution": sss,
+        "philhealth_employee_contribution": philhealth,
+        "pagibig_employee_contribution": pagibig,
+        "withholding_tax": withholding_tax,
+        "total_deductions": total_deductions,
+        "net_pay": net_pay
+    }
+
+def benchmark_employee_memory(counts=(100_000, 1_000_000)):
+    """
+    Measure bytes per employee record, comparing the original dict-based layout ("before")
+    with the __slots__ + interned-string Employee ("after"). Every record gets freshly built
+    strings, as if it had been read from a file or the database.
+    """
+    import gc
+    import tracemalloc
+
+    class DictEmployee:
+        # The original layout: nine name-mangled attributes in a per-instance __dict__
+        def __init__(self, emp_id, name, job_title, email, phone, department, manager, hire_date, birth_date):
+            self.__emp_id = emp_id
+            self.__name = name
+            self.__job_title = job_title
+            self.__email = email
+            self.__phone = phone
+            self.__department = department
+            self.__manager = manager
+            self.__hire_date = hire_date
+            self.__birth_date = birth_date
+
+    departments = ("Human Resources", "Information Technology", "Finance", "Marketing", "Engineering")
+    managers = ("Bob Smith", "Jane Doe", "Robert Brown", "Emily Davis", "Aiden Kim")
+
+    def build(cls, count):
+        # "".join() makes a new string object each time, like a parsed CSV field would be
+        return [cls(f"HR-F-{number:04d}", f"Employee {number}", "".join(("Payroll ", "Analyst")),
+                    f"employee{number}@example.com", f"09{number % 100000000:08d}",
+                    "".join((departments[number % 5], "")), "".join((managers[number % 5], "")),
+                    "".join(("2020-01-", str(10 + number % 20))), "".join(("1990-05-", str(10 + number % 20))))
+                for number in range(count)]
+
+    results = {}
+    for count in counts:
+        for label, cls in (("before", DictEmployee), ("after", FullTimeEmployee)):
+            gc.collect()
+            tracemalloc.start()
+            employees = build(cls, count)
+            used = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del employees
+            results[(count, label)] = used / count
+        before, after = results[(count, "before")], results[(count, "after")]
+        print(f"{count:>9} employees: before {before:7.1f} bytes/employee, after {after:7.1f} bytes/employee "
+              f"({100 * (1 - after / before):.0f}% smaller)")
+    return results
+
+def benchmark_vectorized_payroll(count=1_000_000, seed=7):
+    """Time calculate_payroll_vectorized on randomly generated employees"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    hours = rng.uniform(80, 260, count).round(1)
+    over = rng.uniform(0, 20, count).round(1)
+    type_codes = rng.integers(0, len(EMPLOYEE_TYPES), count, dtype=np.int8)
+    department_codes = rng.integers(-1, len(DEPARTMENT_CODES), count, dtype=np.int8)
+
+    start = time.perf_counter()
+    calculate_payroll_vectorized(hours, over, type_codes, department_codes)
+    elapsed = time.perf_counter() - start
+    print(f"{count} employees in {elapsed:.3f}s ({count / elapsed:,.0f} employees/sec)")
+    return elapsed
+
+def compute_payslip(emp, total_hours_worked, over_hours, salary_advance=0, incentives=0, bonus=0, rules=None,
+                    tax_rules=None):
+    """
+    Compute the payslip figures for one employee without storing them. salary_advance,
+    incentives and bonus are in pesos; every money figure returned is integer centavos.
+    The contributions come from rules (ContributionRules) and the withholding tax from
+    tax_rules (WithholdingTaxRules), by default this month's schedules. Raises ValueError
+    when an amount is not finite or over MAX_CENTAVOS (see round_centavos).
+    """
+    # Get base salary calculation from employee type-specific implementation
+    base_salary = to_centavos(emp.calculate_salary(total_hours_worked, over_hours))
+    salary_advance = to_centavos(salary_advance)
+    incentives = to_centavos(incentives)
+    bonus = to_centavos(bonus)
+
+    # Calculate mandatory benefits from the bracketed schedules, on the base salary
+    sss_employee_contribution, philhealth_employee_contribution, pagibig_employee_contribution = \
+        (rules or contribution_rules())(base_salary)
+
+    # Calculate totals
+    overtime_pay = (round_centavos(over_hours * (base_salary/total_hours_worked) * 1.25)
+                    if total_hours_worked > 0 else 0)
+    total_earnings = base_salary + incentives + bonus + overtime_pay
+    # Withholding tax applies to what is left after the contributions
+    withholding_tax = (tax_rules or withholding_tax_rules())(
+        total_earnings - sss_employee_contribution - philhealth_employee_contribution - pagibig_employee_contribution)
+    total_deductions = (salary_advance + sss_employee_contribution + philhealth_employee_contribution +
+                        pagibig_employee_contribution + withholding_tax)
+    net_pay = total_earnings - total_deductions
+
+    return {
+        "total_hours_worked": total_hours_worked,
+        "over_hours": over_hours,
+        "basic_salary": base_salary,
+        "incentives": incentives,
+        "bonus": bonus,
+        "overtime_pay": overtime_pay,
+        "total_earnings": total_earnings,
+        "salary_advance": salary_advance,
+        "sss_employee_contribution": sss_employee_contribution,
+        "philhealth_employee_contribution": philhealth_employee_contribution,
+        "pagibig_employee_contribution": pagibig_employee_contribution,
+        "withholding_tax": withholding_tax,
+        "total_deductions": total_deductions,
+        "net_pay": net_pay
+    }
+
+PAYROLL_SHARD_KEYS = ("department", "hash")
+
+def shard_payroll_entries(emp_ids, shard_by="department", shards=1):
+    """
+    Split a pay run into shards: by the department code at the start of the employee ID
+    (HR, IT, FIN, MKT, ENG), or by a stable hash of the ID into the given number of shards.
+    Returns a dictionary of shard name -> array of positions in emp_ids.
+    """
+    if shard_by not in PAYROLL_SHARD_KEYS:
+        raise ValueError(f"Unknown shard key {shard_by!r}, expected one of {', '.join(PAYROLL_SHARD_KEYS)}")
+    groups = {}
+    for position, emp_id in enumerate(emp_ids):
+        if shard_by == "department":
+            key = emp_id.split("-", 1)[0]
+        else:
+            # crc32 rather than hash() so the split does not change between runs
+            key = f"#{zlib.crc32(emp_id.encode()) % shards}"
+        groups.setdefault(key, array('q')).append(position)
+    return groups
+
+# Pay run entries, contribution rules and withholding tax rules of the pool currently
+# running; set once per worker by _init_payroll_worker
+_payroll_entries = None
+_payroll_rules = None
+_payroll_tax_rules = None
+
+def _init_payroll_worker(entries, rules, tax_rules):
+    global _payroll_entries, _payroll_rules, _payroll_tax_rules
+    _payroll_entries = entries
+    _payroll_rules = rules
+    _payroll_tax_rules = tax_rules
+
+def _compute_payroll_shard(shard, positions):
+    """Worker: compute the payslips of one shard, returned as flat arrays of hours and money values"""
+    start = time.perf_counter()
+    computed = array('q')
+    too_large = array('q')
+    hours = array('d')
+    money = array('q')
+    split = len(PAYSLIP_HOUR_FIELDS)
+    for position in positions:
+        emp_id, emp, timesheet = _payroll_entries[position]
+        try:
+            payslip = compute_payslip(emp, *timesheet, rules=_payroll_rules, tax_rules=_payroll_tax_rules)
+        except ValueError:
+            too_large.append(position)
+            continue
+        values = list(payslip.values())
+        computed.append(position)
+        hours.extend(values[:split])
+        money.extend(values[split:])
+    return shard, os.getpid(), time.perf_counter() - start, computed, hours, money, too_large
+
+def compute_payroll_parallel(entries, workers=None, shard_by="department", rules=None, tax_rules=None):
+    """
+    Compute payslips for (emp_id, employee, timesheet values) entries across a process pool.
+    The entries reach the workers once, through the pool initializer (inherited for free
+    where processes are forked); tasks and results are plain arrays, so little is pickled.
+    Nothing is written here: the caller stores the results, so the database keeps a single
+    writer. Returns ({emp_id: payslip}, per-shard timings, IDs of the entries left out
+    because an amount is too large to store).
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = shard_payroll_entries([entry[0] for entry in entries], shard_by, workers)
+    hour_width = len(PAYSLIP_HOUR_FIELDS)
+    money_width = len(PAYSLIP_MONEY_FIELDS)
+    payslips = {}
+    timings = []
+    too_large = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards)) or 1,
+                             initializer=_init_payroll_worker, initargs=(entries, rules or contribution_rules(),
+                                                                          tax_rules or withholding_tax_rules())) as pool:
+        futures = [pool.submit(_compute_payroll_shard, shard, positions) for shard, positions in shards.items()]
+        for future in futures:
+            shard, pid, elapsed, positions, hours, money, rejected = future.result()
+            # Walk the flat values one payslip (width values) at a time
+            for position, hour_values, money_values in zip(positions, zip(*[iter(hours.tolist())] * hour_width),
+                                                           zip(*[iter(money.tolist())] * money_width)):
+                payslips[entries[position][0]] = dict(zip(PAYSLIP_FIELDS, hour_values + money_values))
+            too_large.extend(entries[position][0] for position in rejected)
+            timings.append({"shard": shard, "pid": pid, "processed": len(positions), "elapsed_seconds": elapsed})
+    return payslips, timings, too_large
+
+def compute_payroll_vectorized(entries, rules=None, tax_rules=None):
+    """
+    Compute payslips for (emp_id, employee, timesheet values) entries in one
+    calculate_payroll_vectorized call. Returns {emp_id: payslip} with the same figures
+    and types as compute_payslip; raises ImportError without NumPy and ValueError when an
+    amount is not finite or too large.
+    """
+    import numpy as np
+    employees = [emp for _, emp, _ in entries]
+    type_codes, department_codes = encode_employees(employees)
+    columns = np.array([values for _, _, values in entries], dtype=np.float64).reshape(len(entries), -1)
+    hours, over, salary_advance, incentives, bonus = columns.T
+    arrays = calculate_payroll_vectorized(hours, over, type_codes, department_codes, salary_advance, incentives,
+                                          bonus, rules, tax_rules)
+    # tolist() turns the arrays back into Python floats and ints
+    values = [np.broadcast_to(arrays[field], (len(entries),)).tolist() for field in PAYSLIP_FIELDS]
+    return {entry[0]: dict(zip(PAYSLIP_FIELDS, payslip)) for entry, payslip in zip(entries, zip(*values))}
+
+def compute_payroll(entries, rules=None, tax_rules=None):
+    """
+    Compute payslips for (emp_id, employee, timesheet values) entries in this process: in
+    one compute_payroll_vectorized pass when NumPy is installed, one at a time otherwise.
+    Returns ({emp_id: payslip}, IDs of the entries left out because an amount is too large
+    to store).
+    """
+    if entries:
+        try:
+            return compute_payroll_vectorized(entries, rules, tax_rules), []
+        except (ImportError, ValueError):
+            # NumPy is optional; a batch with an amount too large is redone one entry at a
+            # time so that only the offending entries are left out
+            pass
+    payslips = {}
+    too_large = []
+    for emp_id, emp, values in entries:
+        try:
+            payslips[emp_id] = compute_payslip(emp, *values, rules=rules, tax_rules=tax_rules)
+        except ValueError:
+            too_large.append(emp_id)
+    return payslips, too_large
+
+def benchmark_parallel_payroll(count=1_000_000, workers=None, seed=7):
+    """Time the pay run computation on one process and on process pools of increasing size"""
+    import random
+    rng = random.Random(seed)
+    max_workers = workers or os.cpu_count() or 1
+    entries = []
+    for number in range(count):
+        cls = EMPLOYEE_TYPES[number % len(EMPLOYEE_TYPES)]
+        department = DEPARTMENT_CODES[number % len(DEPARTMENT_CODES)]
+        emp = cls(f"{department}-{cls.TYPE_CODE}-{number:07d}", f"Employee {number}", "Analyst",
+                  f"employee{number}@example.com", "09123456789", department, "Bob Smith", "2020-01-15",
+                  "1990-05-10")
+        entries.append((emp.get_emp_id(), emp, (round(rng.uniform(80, 260), 1), round(rng.uniform(0, 20), 1))))
+
+    start = time.perf_counter()
+    for emp_id, emp, values in entries:
+        compute_payslip(emp, *values)
+    serial = time.perf_counter() - start
+    print(f"{'serial':>10}: {serial:.3f}s ({count / serial:,.0f} payslips/sec)")
+
+    results = {1: serial}
+    pool_sizes = sorted({size for size in (1, 2, 4, 8, 16, 32, max_workers) if size <= max_workers})
+    for size in pool_sizes:
+        start = time.perf_counter()
+        _, timings, _ = compute_payroll_parallel(entries, size, "hash")
+        elapsed = time.perf_counter() - start
+        results[size] = elapsed
+        slowest = max(timing["elapsed_seconds"] for timing in timings)
+        print(f"{size:>2} workers: {elapsed:.3f}s ({count / elapsed:,.0f} payslips/sec, "
+              f"{serial / elapsed:.2f}x, slowest worker {slowest:.3f}s)")
+    return results
+
 class Colors:
     RESET = "\033[0m"  
     RED = "\033[31m"
@@ -93,18 +520,79 @@ class Colors:
     YELLOW = "\033[33m"
     BLUE = "\033[34m" 
 
-def print_centered(text, color = Colors.RESET):
+# Terminal width is looked up once and cached; SIGWINCH (window resized) clears the
+# cache so the next line printed picks up the new size.
+_terminal_width = None
+
+def terminal_width():
+    global _terminal_width
+    if _terminal_width is None:
+        try:
+            _terminal_width = os.get_terminal_size().columns
+        except OSError:
+            _terminal_width = 80  # This is a Fallback width.
+    return _terminal_width
+
+def _terminal_resized(signum, frame):
+    global _terminal_width
+    _terminal_width = None
+
+if hasattr(signal, "SIGWINCH"):
     try:
-        width = os.get_terminal_size().columns
-    except OSError:
-        width = 80
-    print((color + text + Colors.RESET).center(width))
+        signal.signal(signal.SIGWINCH, _terminal_resized)
+    except ValueError:
+        pass  # Not imported from the main thread; the width is then fixed at first use
+
+# Lines written while a buffered_output() block is active are collected here and
+# written to the terminal in one go when the outermost block ends (or whenever more
+# than SCREEN_BUFFER_LIMIT characters are waiting, so huge reports stay bounded)
+SCREEN_BUFFER_LIMIT = 1 << 20
+_screen_buffer = None
+_screen_buffer_size = 0
+
+def _write_screen_buffer():
+    global _screen_buffer_size
+    text = "".join(_screen_buffer)
+    _screen_buffer.clear()
+    _screen_buffer_size = 0
+    stream = getattr(sys.stdout, "buffer", None)
+    if stream is not None:
+        sys.stdout.flush()
+        stream.write(text.encode(sys.stdout.encoding or "utf-8", errors="replace"))
+    else:
+        sys.stdout.write(text)
+    sys.stdout.flush()
+
+@contextmanager
+def buffered_output():
+    """Collect everything echoed inside the block and write it with a single write call"""
+    global _screen_buffer
+    if _screen_buffer is not None:
+        yield  # Nested block: the outer one writes everything
+        return
+    _screen_buffer = []
+    try:
+        yield
+    finally:
+        _write_screen_buffer()
+        _screen_buffer = None
+
+def echo(text="", end="\n"):
+    """print() replacement that goes through the screen buffer when one is active"""
+    global _screen_buffer_size
+    if _screen_buffer is None:
+        print(text, end=end)
+        return
+    _screen_buffer.append(text + end)
+    _screen_buffer_size += len(text) + len(end)
+    if _screen_buffer_size > SCREEN_BUFFER_LIMIT:
+        _write_screen_buffer()
+
+def print_centered(text, color = Colors.RESET):
+    echo((color + text + Colors.RESET).center(terminal_width()))
 
 def print_prompt(prompt):
-    try:
-        width = os.get_terminal_size().columns
-    except OSError:
-        width = 80  # This is a Fallback width. 
+    width = terminal_width()
 
     prompt_with_space = prompt + " "  
     prompt_length = len(prompt_with_space)  
@@ -113,27 +601,764 @@ def print_prompt(prompt):
     total_padding = (width - prompt_length) // 2
     padding = " " * total_padding
 
-    print(padding + prompt_with_space, end='')  
+    echo(padding + prompt_with_space, end='')
+    if _screen_buffer is None:
+        sys.stdout.flush()
+
+def benchmark_rendering(lines=10_000):
+    """
+    Compare printing a report line by line with rendering it through buffered_output.
+    stdout is replaced by a line-buffered stream (as on a terminal) that counts write calls.
+    """
+    class CountingDevNull(io.RawIOBase):
+        writes = 0
+        def writable(self):
+            return True
+        def write(self, data):
+            CountingDevNull.writes += 1
+            return len(data)
+
+    def report():
+        for number in range(lines):
+            print_centered(f"{'Employee ' + str(number):<20} {'Finance':<20} {160.0:<20} {8.0:<15} "
+                           f"₱{format_money(3200400):<20} ₱{format_money(140000):<20} ₱{format_money(420035):<20} "
+                           f"₱{format_money(2780365):<15}")
+
+    original_stdout = sys.stdout
+    results = {}
+    try:
+        for mode in ("line by line", "buffered"):
+            CountingDevNull.writes = 0
+            sys.stdout = io.TextIOWrapper(io.BufferedWriter(CountingDevNull()), encoding="utf-8",
+                                          line_buffering=True)
+            start = time.perf_counter()
+            if mode == "buffered":
+                with buffered_output():
+                    report()
+            else:
+                report()
+            sys.stdout.flush()
+            results[mode] = (time.perf_counter() - start, CountingDevNull.writes)
+    finally:
+        sys.stdout = original_stdout
+
+    for mode, (elapsed, writes) in results.items():
+        print(f"{mode:<14} {lines} lines: {elapsed * 1000:8.1f} ms, {writes} write calls")
+    return results
+
+# Fields of a payslip, in display order
+PAYSLIP_FIELDS = ("total_hours_worked", "over_hours", "basic_salary", "incentives", "bonus", "overtime_pay",
+                  "total_earnings", "salary_advance", "sss_employee_contribution",
+                  "philhealth_employee_contribution", "pagibig_employee_contribution", "withholding_tax",
+                  "total_deductions", "net_pay")
+# Hours are floats; every other payslip field is money in integer centavos
+PAYSLIP_HOUR_FIELDS = PAYSLIP_FIELDS[:2]
+PAYSLIP_MONEY_FIELDS = PAYSLIP_FIELDS[2:]
+
+# payslips table column holding each payslip field
+PAYSLIP_COLUMNS = {
+    "total_hours_worked": "total_hours",
+    "over_hours": "overtime_hours",
+    "basic_salary": "basic_salary",
+    "incentives": "incentives",
+    "bonus": "bonus",
+    "overtime_pay": "overtime_pay",
+    "total_earnings": "total_earnings",
+    "salary_advance": "salary_advance",
+    "sss_employee_contribution": "sss_contribution",
+    "philhealth_employee_contribution": "philhealth_contribution",
+    "pagibig_employee_contribution": "pagibig_contribution",
+    "withholding_tax": "withholding_tax",
+    "total_deductions": "total_deductions",
+    "net_pay": "net_pay",
+}
+
+# Column order shared by every write to the payslips table. There is one payslip per
+# employee and pay period, so writing a period again replaces that payslip.
+PAYSLIP_INSERT_SQL = '''
+    INSERT INTO payslips (
+        emp_id, pay_period, total_hours, overtime_hours,
+        basic_salary, incentives, bonus, overtime_pay,
+        total_earnings, salary_advance,
+        sss_contribution, philhealth_contribution, pagibig_contribution, withholding_tax,
+        total_deductions, net_pay, creation_date
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (emp_id, pay_period) DO UPDATE SET
+        total_hours = excluded.total_hours, overtime_hours = excluded.overtime_hours,
+        basic_salary = excluded.basic_salary, incentives = excluded.incentives,
+        bonus = excluded.bonus, overtime_pay = excluded.overtime_pay,
+        total_earnings = excluded.total_earnings, salary_advance = excluded.salary_advance,
+        sss_contribution = excluded.sss_contribution,
+        philhealth_contribution = excluded.philhealth_contribution,
+        pagibig_contribution = excluded.pagibig_contribution, withholding_tax = excluded.withholding_tax,
+        total_deductions = excluded.total_deductions, net_pay = excluded.net_pay,
+        creation_date = excluded.creation_date
+'''
+
+# Payslip of an employee as a row with PAYSLIP_FIELDS names: the latest one, or the one of a pay period
+_PAYSLIP_LOOKUP_SQL = f'''
+    SELECT emp_id, pay_period, {", ".join(f"{column} AS {field}" for field, column in PAYSLIP_COLUMNS.items())},
+           creation_date FROM payslips
+    WHERE emp_id = ? {{condition}}
+    ORDER BY pay_period DESC LIMIT 1
+'''
+LATEST_PAYSLIP_SQL = _PAYSLIP_LOOKUP_SQL.format(condition="")
+PERIOD_PAYSLIP_SQL = _PAYSLIP_LOOKUP_SQL.format(condition="AND pay_period = ?")
+
+def payslip_series_sql(count):
+    """Every payslip of count employees (emp_id IN (?, ...)), by employee and pay period"""
+    return (f"SELECT emp_id, pay_period, creation_date, {', '.join(PAYSLIP_COLUMNS.values())} FROM payslips "
+            f"WHERE emp_id IN ({', '.join('?' * count)}) ORDER BY emp_id, pay_period")
+
+def payslip_row(emp_id, pay_period, payslip, creation_date):
+    """Convert a payslip dictionary into a row for PAYSLIP_INSERT_SQL"""
+    return (emp_id, pay_period, *(payslip[field] for field in PAYSLIP_FIELDS), creation_date)
+
+def payslip_to_centavos(payslip):
+    """Convert a payslip with peso amounts into one with integer centavos (hours are kept, missing amounts are 0)"""
+    return {field: payslip.get(field, 0) if field in PAYSLIP_HOUR_FIELDS else to_centavos(payslip.get(field, 0))
+            for field in PAYSLIP_FIELDS}
+
+# Payslip layout shared by the terminal and printed payslips: the employee details, then
+# (heading, [(label, field), ...]) sections. Hours fields are shown as they are, every
+# other field as money.
+PAYSLIP_DETAILS = (("Employee ID", "emp_id"), ("Name", "name"), ("Job Title", "job_title"),
+                   ("Phone Number", "phone"), ("Department", "department"), ("Pay Period", "pay_period"))
+PAYSLIP_SECTIONS = (
+    ("Earnings:", (("Total Hours Worked", "total_hours_worked"), ("Overtime Hours", "over_hours"),
+                   ("Basic Salary", "basic_salary"), ("Incentives", "incentives"), ("Bonus", "bonus"),
+                   ("Overtime Pay", "overtime_pay"), ("TOTAL EARNINGS", "total_earnings"))),
+    ("Deductions:", (("Salary in Advance", "salary_advance"), ("SSS Contribution", "sss_employee_contribution"),
+                     ("PhilHealth Contribution", "philhealth_employee_contribution"),
+                     ("Pag-ibig Contribution", "pagibig_employee_contribution"),
+                     ("Withholding Tax", "withholding_tax"), ("TOTAL DEDUCTIONS", "total_deductions"))),
+    (None, (("Net Pay", "net_pay"),)),
+)
+# Values of one payslip record, in the order bulk rendering passes them around
+PAYSLIP_RECORD_FIELDS = tuple(key for _, key in PAYSLIP_DETAILS) + PAYSLIP_FIELDS
+# Output format -> file extension (the terminal format is not written to files)
+PAYSLIP_FORMATS = {"terminal": None, "text": ".txt", "html": ".html"}
+
+HTML_DOCUMENT_START = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Payslips</title>
+<style>
+body { font-family: sans-serif; }
+.payslip { page-break-after: always; max-width: 40em; margin: 2em auto; }
+th { text-align: left; font-weight: normal; padding-right: 2em; }
+.amounts td { text-align: right; }
+</style>
+</head>
+<body>
+'''
+HTML_DOCUMENT_END = "</body>\n</html>\n"
+
+class PayslipTemplate:
+    """
+    PAYSLIP_DETAILS and PAYSLIP_SECTIONS compiled once for an output format ("terminal",
+    "text" or "html") into format strings, so rendering a payslip is one format_map call.
+    On the terminal, amounts go into fixed-width slots: every line keeps the same length,
+    so the layout is centred here, once, instead of line by line.
+    """
+    AMOUNT_WIDTH = 14
+
+    def __init__(self, fmt="text", width=None):
+        if fmt not in PAYSLIP_FORMATS:
+            raise ValueError(f"Unknown payslip format {fmt!r}, expected one of {', '.join(PAYSLIP_FORMATS)}")
+        self.fmt = fmt
+        if fmt == "html":
+            self.header, self.body = self._compile_html()
+            self.document_start, self.separator, self.document_end = HTML_DOCUMENT_START, "", HTML_DOCUMENT_END
+        else:
+            self.header, self.body = self._compile_text(width if fmt == "terminal" else None)
+            # A form feed starts every payslip of a combined text file on a new page
+            self.document_start, self.separator, self.document_end = "", "\f\n", ""
+        self.source = self.header + self.body
+
+    def _compile_text(self, width):
+        slot = "\0" * self.AMOUNT_WIDTH
+
+        def line(text="", color=Colors.RESET, field=None, centred=True):
+            # Only centred lines need a fixed-width slot; the others end with the value
+            slotted = width and centred and field
+            if slotted:
+                text += slot
+            if width and centred:
+                text = (color + text + Colors.RESET).center(width)
+            text = text.replace("{", "{{").replace("}", "}}")
+            if slotted:
+                text = text.replace(slot, f"{{{field}:<{self.AMOUNT_WIDTH}}}")
+            elif field:
+                text += f"{{{field}}}"
+            return text + "\n"
+
+        rule = 130 if width else 30 + self.AMOUNT_WIDTH
+        indent = "\t" * 6 if width else ""
+        header = (line("=" * rule) + line("Payslip", Colors.BLUE) + line("=" * rule) +
+                  "".join(line(f"{indent}{label}: ", field=key, centred=False) for label, key in PAYSLIP_DETAILS) +
+                  line("-" * rule))
+        body = ""
+        for heading, lines in PAYSLIP_SECTIONS:
+            if heading:
+                body += line(heading, Colors.GREEN)
+            body += "".join(line(f"  {label + ':':<28}", field=field) for label, field in lines)
+        return header, body
+
+    def _compile_html(self):
+        def rows(lines):
+            return "".join(f"<tr><th>{html.escape(label)}</th><td>{{{field}}}</td></tr>\n" for label, field in lines)
+
+        header = ('<section class="payslip">\n<h1>Payslip</h1>\n'
+                  f'<table class="details">\n{rows(PAYSLIP_DETAILS)}</table>\n')
+        body = ""
+        for heading, lines in PAYSLIP_SECTIONS:
+            if heading:
+                body += f"<h2>{html.escape(heading.rstrip(':'))}</h2>\n"
+            body += f'<table class="amounts">\n{rows(lines)}</table>\n'
+        return header, body + "</section>\n"
+
+    def detail_values(self, record):
+        values = {key: str(record.get(key) or "") for _, key in PAYSLIP_DETAILS}
+        if self.fmt == "html":
+            values = {key: html.escape(value) for key, value in values.items()}
+        return values
+
+    def values(self, record):
+        """Display strings for a payslip record: employee details plus PAYSLIP_FIELDS"""
+        values = self.detail_values(record)
+        for field in PAYSLIP_HOUR_FIELDS:
+            values[field] = str(record[field])
+        for field in PAYSLIP_MONEY_FIELDS:
+            values[field] = "₱" + format_money(record[field])
+        return values
+
+    def render(self, record):
+        return self.source.format_map(self.values(record))
+
+    def render_header(self, record):
+        """Only the title and employee details (no payslip fields needed)"""
+        return self.header.format_map(self.detail_values(record))
+
+@lru_cache(maxsize=None)
+def payslip_template(fmt="text", width=None):
+    """The compiled template of a format; compiled once per process (and terminal width)"""
+    return PayslipTemplate(fmt, width)
+
+def _render_payslip_chunk(fmt, out_dir, rows):
+    """
+    Worker: render PAYSLIP_RECORD_FIELDS rows. With out_dir, writes one file per payslip and
+    returns how many; otherwise returns the rendered payslips joined for a combined file.
+    """
+    template = payslip_template(fmt)
+    if out_dir is None:
+        return template.separator.join(template.render(dict(zip(PAYSLIP_RECORD_FIELDS, row))) for row in rows)
+    extension = PAYSLIP_FORMATS[fmt]
+    for row in rows:
+        record = dict(zip(PAYSLIP_RECORD_FIELDS, row))
+        # The employee ID names the file; anything that is not safe in a file name is replaced
+        name = re.sub(r"[^\w.-]", "_", str(record["emp_id"]))
+        with open(os.path.join(out_dir, name + extension), "w", encoding="utf-8") as output:
+            output.write(template.document_start + template.render(record) + template.document_end)
+    return len(rows)
+
+def render_payslip_files(rows, out_dir, fmt="text", single_file=None, workers=0, chunk_size=500):
+    """
+    Render payslip rows (PAYSLIP_RECORD_FIELDS tuples) as text or HTML files in out_dir:
+    one file per employee (<emp_id>.txt / .html), or all of them in the file named
+    single_file. With workers > 1 the chunks are rendered on a process pool; for a single
+    file the workers return the text and this process writes it in order.
+    Returns a summary with the throughput.
+    """
+    if not PAYSLIP_FORMATS.get(fmt):
+        raise ValueError(f"Payslips can be written as {', '.join(f for f, ext in PAYSLIP_FORMATS.items() if ext)}")
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    template = payslip_template(fmt)
+    chunks = [rows[position:position + chunk_size] for position in range(0, len(rows), chunk_size)]
+    target = None if single_file else out_dir
+    pool = None
+    if workers and workers > 1 and len(chunks) > 1:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(chunks)))
+    try:
+        mapper = pool.map if pool else map
+        results = mapper(_render_payslip_chunk, itertools.repeat(fmt), itertools.repeat(target), chunks)
+        if single_file:
+            path = os.path.join(out_dir, single_file)
+            with open(path, "w", encoding="utf-8") as output:
+                output.write(template.document_start)
+                for number, text in enumerate(results):
+                    output.write(template.separator + text if number else text)
+                output.write(template.document_end)
+            files = 1 if rows else 0
+        else:
+            path = out_dir
+            files = sum(results)
+    finally:
+        if pool:
+            pool.shutdown()
+    elapsed = time.perf_counter() - start
+    return {
+        "rendered": len(rows),
+        "files": files,
+        "path": path,
+        "elapsed_seconds": elapsed,
+        "payslips_per_second": len(rows) / elapsed if elapsed > 0 else 0.0
+    }
+
+class PayslipView(Mapping):
+    """Read-only view of one PayslipHistory row; reads like a payslip dictionary"""
+    __slots__ = ("_history", "_row")
+    KEYS = ("pay_period", "creation_date", *PAYSLIP_FIELDS)
+
+    def __init__(self, history, row):
+        self._history = history
+        self._row = row
+
+    def __getitem__(self, key):
+        return self._history.value(self._row, key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f"PayslipView({dict(self)!r})"
+
+class PayslipHistory:
+    """
+    Every payslip of every employee, stored by column: one typed array per payslip field
+    (float hours, int64 centavos) with one row per payslip. Each employee has a series of
+    pay periods (yyyy-mm) sorted for binary search, and the row number of each. Mirrors the
+    payslips table: load() reads it all at once, or, given a db_path, each employee's
+    series is read the first time it is needed. PayrollSystem calls add()/remove_employee()
+    whenever it writes.
+
+    Lookups return PayslipView rows, which follow later writes to the same row; take a
+    dict() of a view to keep it. The rows of removed employees are reused.
+    """
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self._clear()
+
+    def _clear(self):
+        self._columns = {field: array('d' if field in PAYSLIP_HOUR_FIELDS else 'q') for field in PAYSLIP_FIELDS}
+        self._pay_periods = []     # row number -> pay period
+        self._creation_dates = []  # row number -> creation date
+        self._free_rows = []       # rows of removed employees, reused first
+        self._periods = {}         # emp_id -> sorted list of pay periods
+        self._rows = {}            # emp_id -> row numbers, parallel to _periods
+
+    def _new_row(self, pay_period, creation_date, values):
+        """Store one payslip (values in PAYSLIP_FIELDS order); returns its row number"""
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._write_row(row, pay_period, creation_date, values)
+            return row
+        self._pay_periods.append(_intern(pay_period))
+        self._creation_dates.append(creation_date)
+        for column, value in zip(self._columns.values(), values):
+            column.append(value)
+        return len(self._pay_periods) - 1
+
+    def _write_row(self, row, pay_period, creation_date, values):
+        self._pay_periods[row] = _intern(pay_period)
+        self._creation_dates[row] = creation_date
+        for column, value in zip(self._columns.values(), values):
+            column[row] = value
+
+    def _series(self, emp_id):
+        """(periods, rows) of one employee, reading them from the database on first use"""
+        if emp_id not in self._periods:
+            self.preload((emp_id,))
+        return self._periods[emp_id], self._rows[emp_id]
+
+    def _read(self, cursor):
+        # Rows arrive sorted by emp_id and pay period, so appending keeps every series in order
+        for emp_id, pay_period, creation_date, *values in cursor:
+            if emp_id not in self._periods:
+                self._periods[emp_id] = []
+                self._rows[emp_id] = array('q')
+            self._periods[emp_id].append(_intern(pay_period))
+            self._rows[emp_id].append(self._new_row(pay_period, creation_date, values))
+
+    def preload(self, emp_ids, chunk_size=500):
+        """
+        Read the series of the given employees that are not loaded yet. Writers call this
+        before changing the payslips table, so that add() can still return what it replaced.
+        """
+        missing = [emp_id for emp_id in dict.fromkeys(emp_ids) if emp_id not in self._periods]
+        for emp_id in missing:
+            self._periods[emp_id] = []
+            self._rows[emp_id] = array('q')
+        if not self.db_path:
+            return
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start:start + chunk_size]
+            self._read(get_db(self.db_path).execute(payslip_series_sql(len(chunk)), chunk))
+
+    def load(self, conn):
+        """Replace the contents with the payslips table"""
+        self._clear()
+        columns = ", ".join(PAYSLIP_COLUMNS.values())
+        self._read(conn.execute(f"SELECT emp_id, pay_period, creation_date, {columns} FROM payslips "
+                                f"ORDER BY emp_id, pay_period"))
+
+    def value(self, row, key):
+        """One value of a row: a PAYSLIP_FIELDS field, pay_period or creation_date"""
+        if key == "pay_period":
+            return self._pay_periods[row]
+        if key == "creation_date":
+            return self._creation_dates[row]
+        return self._columns[key][row]
+
+    def add(self, emp_id, pay_period, payslip, creation_date):
+        """Insert a payslip, replacing the one for the same period; returns the replaced payslip or None"""
+        periods, rows = self._series(emp_id)
+        values = [payslip[field] for field in PAYSLIP_FIELDS]
+        position = bisect_left(periods, pay_period)
+        if position < len(periods) and periods[position] == pay_period:
+            # The row is overwritten in place, so the replaced payslip is returned as a copy
+            replaced = dict(PayslipView(self, rows[position]))
+            self._write_row(rows[position], pay_period, creation_date, values)
+            return replaced
+        periods.insert(position, _intern(pay_period))
+        rows.insert(position, self._new_row(pay_period, creation_date, values))
+        return None
+
+    def remove_employee(self, emp_id):
+        """Forget every payslip of an employee; returns copies of them, oldest first"""
+        periods, rows = self._series(emp_id)
+        removed = [dict(PayslipView(self, row)) for row in rows]
+        self._free_rows.extend(rows)
+        del self._periods[emp_id], self._rows[emp_id]
+        return removed
+
+    def last(self, emp_id, count):
+        """The latest count payslips, oldest first"""
+        rows = self._series(emp_id)[1]
+        return [PayslipView(self, row) for row in rows[-count:]] if count > 0 else []
+
+    def between(self, emp_id, first_period, last_period):
+        """Payslips whose pay period lies in [first_period, last_period]"""
+        periods, rows = self._series(emp_id)
+        return [PayslipView(self, row)
+                for row in rows[bisect_left(periods, first_period):bisect_right(periods, last_period)]]
+
+    def as_of(self, emp_id, date):
+        """The payslip in force on a date (yyyy-mm-dd or yyyy-mm): the latest period not after it"""
+        periods, rows = self._series(emp_id)
+        position = bisect_right(periods, date[:7])
+        return PayslipView(self, rows[position - 1]) if position else None
+
+    def totals(self, emp_id, first_period="0000-00", last_period="9999-99"):
+        """Sum of every PAYSLIP_FIELDS value over the payslips between two pay periods"""
+        periods, rows = self._series(emp_id)
+        rows = rows[bisect_left(periods, first_period):bisect_right(periods, last_period)]
+        # Money columns add up exactly as integers
+        return {field: math.fsum(column[row] for row in rows) if column.typecode == 'd'
+                else sum(column[row] for row in rows) for field, column in self._columns.items()}
+
+    def __len__(self):
+        """Number of payslips held in memory (only employees looked up so far when loading lazily)"""
+        return len(self._pay_periods) - len(self._free_rows)
+
+class PayrollAggregates:
+    """
+    Running payroll totals per (pay period, department, employee type code): the number of
+    payslips plus the sum of every PAYSLIP_FIELDS value. Writers apply deltas with add() and
+    subtract(), so reading the totals of a period costs O(departments x types), never O(payslips).
+    Counts and money sums are integers, so adding and subtracting never drifts.
+    """
+    def __init__(self):
+        self._periods = {}  # pay_period -> {(department, employee_type): [count, *fields]}
+
+    def load(self, conn):
+        """Replace the totals with the payroll_summary table (kept current by database triggers)"""
+        self._periods.clear()
+        cursor = conn.execute(f"SELECT pay_period, department, employee_type, payslip_count, "
+                              f"{', '.join(PAYSLIP_COLUMNS.values())} FROM payroll_summary")
+        for pay_period, department, employee_type, *values in cursor:
+            self._periods.setdefault(pay_period, {})[(department, employee_type)] = values
+
+    def add(self, pay_period, department, employee_type, payslip, sign=1):
+        groups = self._periods.setdefault(pay_period, {})
+        totals = groups.get((department, employee_type))
+        if totals is None:
+            totals = groups[(department, employee_type)] = [0] * (len(PAYSLIP_FIELDS) + 1)
+        totals[0] += sign
+        for position, field in enumerate(PAYSLIP_FIELDS, start=1):
+            totals[position] += sign * payslip[field]
+        if totals[0] <= 0:
+            del groups[(department, employee_type)]
+            if not groups:
+                del self._periods[pay_period]
+
+    def subtract(self, pay_period, department, employee_type, payslip):
+        self.add(pay_period, department, employee_type, payslip, sign=-1)
+
+    PERIOD_SQL = (f"SELECT department, employee_type, payslip_count, {', '.join(PAYSLIP_COLUMNS.values())} "
+                  f"FROM payroll_summary WHERE pay_period = ?")
+
+    def load_period(self, conn, pay_period):
+        """Replace the totals of one pay period with its payroll_summary rows, which include other processes' writes"""
+        cursor = conn.execute(self.PERIOD_SQL, (pay_period,))
+        groups = {(department, employee_type): values for department, employee_type, *values in cursor}
+        if groups:
+            self._periods[pay_period] = groups
+        else:
+            self._periods.pop(pay_period, None)
+
+    def totals(self, pay_period, by=None):
+        """
+        Totals of a pay period as {"count": n, field: sum, ...}. With by="department" or
+        by="employee_type" returns {group: totals} instead, sorted by group.
+        """
+        result = {}
+        for (department, employee_type), values in self._periods.get(pay_period, {}).items():
+            group = {"department": department, "employee_type": employee_type}.get(by)
+            sums = result.setdefault(group, [0] * len(values))
+            for position, value in enumerate(values):
+                sums[position] += value
+        names = ("count",) + PAYSLIP_FIELDS
+        result = {group: dict(zip(names, sums)) for group, sums in sorted(result.items())}
+        if by is None:
+            return result.get(None, dict.fromkeys(names, 0))
+        return result
+
+# Timesheet columns needed by a pay run; the money columns default to 0 when left out
+TIMESHEET_FIELDS = ("emp_id", "total_hours_worked", "over_hours", "salary_advance", "incentives", "bonus")
+
+def read_timesheets(path):
+    """Yield one timesheet dictionary per row of a CSV file with TIMESHEET_FIELDS as header"""
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            yield row
+
+# Department names accepted when no department code is given
+DEPARTMENT_NAME_CODES = {
+    "HUMAN RESOURCES": "HR",
+    "INFORMATION TECHNOLOGY": "IT",
+    "FINANCE": "FIN",
+    "MARKETING": "MKT",
+    "ENGINEERING": "ENG"
+}
+
+class EmployeeValidator:
+    """
+    Validation rules for employee fields, compiled once. check() tests one value; validate_batch()
+    tests whole batches of records, given either as a list of row dictionaries or as a
+    dictionary of columns, and returns one error vector per field.
+    """
+    LETTERS_AND_SPACES = re.compile("^[A-Za-z ]+$")
 
-class PayrollSystem:
     def __init__(self):
-        self.__employees = {}
-        self.__payslips = {}
-        self.__unique_id_counter = 1
+        letters = self.LETTERS_AND_SPACES.match
+        date = re.compile(r"^\d{4}-\d{2}-\d{2}$").match
+        # field -> (test, error message)
+        self.rules = {
+            "department_code": (frozenset(DEPARTMENT_CODES).__contains__, "invalid department code"),
+            "employee_type": (frozenset(EMPLOYEE_CLASSES).__contains__, "invalid employee type code"),
+            "name": (letters, "invalid name"),
+            "job_title": (letters, "invalid job title"),
+            "email": (re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$").match, "invalid email"),
+            "phone": (lambda phone: phone.isdigit() and len(phone) == 10, "invalid phone number"),
+            "department": (letters, "invalid department"),
+            "manager": (letters, "invalid manager name"),
+            "hire_date": (date, "invalid hire date"),
+            "birth_date": (date, "invalid birth date"),
+        }
+        # Codes are accepted in any case
+        self.normalizers = {"department_code": str.upper, "employee_type": str.upper}
+
+    def check(self, field, value):
+        test, message = self.rules[field]
+        normalize = self.normalizers.get(field)
+        return bool(test(normalize(value) if normalize else value))
+
+    def validate_batch(self, records, fields=None):
+        """
+        Return {field: [None or error message, one per record]} for the given fields
+        (every rule by default). Missing values count as empty strings.
+        """
+        fields = fields or tuple(self.rules)
+        if isinstance(records, dict):
+            columns = {field: records.get(field) or () for field in fields}
+            size = max((len(column) for column in columns.values()), default=0)
+            columns = {field: list(column) + [""] * (size - len(column)) for field, column in columns.items()}
+        else:
+            columns = {field: [record.get(field) or "" for record in records] for field in fields}
+
+        errors = {}
+        for field, column in columns.items():
+            test, message = self.rules[field]
+            normalize = self.normalizers.get(field)
+            if normalize:
+                column = [normalize(value) for value in column]
+            errors[field] = [None if test(value) else message for value in column]
+        return errors
+
+    @staticmethod
+    def errors_by_record(field_errors):
+        """Turn validate_batch output into a list of "field: message" lists, one per record"""
+        per_record = None
+        for field, column in field_errors.items():
+            if per_record is None:
+                per_record = [[] for _ in column]
+            for errors, message in zip(per_record, column):
+                if message:
+                    errors.append(f"{field}: {message}")
+        return per_record or []
+
+EMPLOYEE_VALIDATOR = EmployeeValidator()
+
+# Columns of an employee import file; department_code may be left out when the
+# department is one of DEPARTMENT_NAME_CODES
+EMPLOYEE_IMPORT_FIELDS = ("department_code", "employee_type", "name", "job_title", "email", "phone",
+                          "department", "manager", "hire_date", "birth_date")
+
+# Employee details in constructor order (after the ID)
+EMPLOYEE_DETAIL_FIELDS = EMPLOYEE_IMPORT_FIELDS[2:]
+# Details whose employees column may be NULL
+NULLABLE_EMPLOYEE_FIELDS = ("phone", "manager", "hire_date", "birth_date")
+
+EMPLOYEE_INSERT_SQL = '''
+    INSERT INTO employees
+    (emp_id, name, job_title, email, phone, department, manager, hire_date, birth_date, employee_type)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def read_records(path):
+    """
+    Yield (line number, dictionary, problem) for each record of a CSV or JSON Lines (.jsonl)
+    file. The line number counts from 1 and includes the CSV header and blank lines; for a
+    CSV record with quoted line breaks it is the line the record ends on. problem is None,
+    or says why a JSON line is not a record (the dictionary is then empty).
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, {}, f"not valid JSON: {e.msg}"
+                    continue
+                if isinstance(record, dict):
+                    yield line_number, record, None
+                else:
+                    yield line_number, {}, "not a JSON object"
+        else:
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record, None
+
+EMPLOYEE_SELECT_SQL = f"SELECT emp_id, {', '.join(EMPLOYEE_DETAIL_FIELDS)}, employee_type FROM employees"
+EMPLOYEE_BY_ID_SQL = f"{EMPLOYEE_SELECT_SQL} WHERE emp_id = ?"
+
+def employee_from_row(row):
+    """Build the Employee subclass object for an EMPLOYEE_SELECT_SQL row"""
+    emp_id, *details, type_code = row
+    # Older rows without a type code still have it in the ID
+    cls = EMPLOYEE_CLASSES.get(type_code) or EMPLOYEE_CLASSES[emp_id.split("-")[1]]
+    return cls(emp_id, *details)
+
+class EmployeeDirectory(MutableMapping):
+    """
+    Employees by ID, read from the employees table the first time each one is looked up
+    and cached afterwards, so nothing is loaded at start-up. Assigning or deleting only
+    changes the cache (PayrollSystem writes the table itself); iterating and len() go
+    over the whole table.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._cache = {}
+
+    def __getitem__(self, emp_id):
+        emp = self._cache.get(emp_id)
+        if emp is None:
+            row = get_db(self.db_path).execute(EMPLOYEE_BY_ID_SQL, (emp_id,)).fetchone()
+            if row is None:
+                raise KeyError(emp_id)
+            emp = self._cache[emp_id] = employee_from_row(row)
+        return emp
+
+    def __setitem__(self, emp_id, emp):
+        self._cache[emp_id] = emp
+
+    def __delitem__(self, emp_id):
+        self._cache.pop(emp_id, None)
+
+    def __iter__(self):
+        for (emp_id,) in get_db(self.db_path).execute("SELECT emp_id FROM employees ORDER BY emp_id"):
+            yield emp_id
+
+    def __len__(self):
+        return get_db(self.db_path).execute("SELECT COUNT(*) FROM employees").fetchone()[0]
+
+class PayrollSystem:
+    def __init__(self, write_behind=False, flat_contributions=False):
         self.db_path = 'paysphere.db'
-        from database import init_db
-        init_db()  # Initialize database first
+        self.flat_contributions = flat_contributions  # Old flat 4.5% / 2.25% / 2% instead of the schedules
+        self.__employees = EmployeeDirectory(self.db_path)  # Loaded from the database on first access
+        self.__history = PayslipHistory(self.db_path)  # Loaded per employee on first access
+        self.__aggregates = PayrollAggregates()
+        init_db(self.db_path)  # Initialize database first
+        self.__employee_ids = IdSequence(self.db_path, "employee_id")  # Shared with other processes
+        # Every payslip stored or deleted is also appended to the hash-chained audit ledger
+        self.audit_ledger = AuditLedger(audit_path(self.db_path), tuple(PAYSLIP_COLUMNS.values()))
         self.setup_predefined_employees()  # Then setup predefined employees
+        self.__aggregates.load(get_db(self.db_path))  # Running payroll totals
+        # Optional write-behind for single payslips (see WriteBehindQueue for what a crash can lose);
+        # queued payslips reach the audit ledger once their batch has committed
+        self.__payslip_writer = None
+        if write_behind:
+            self.__payslip_writer = WriteBehindQueue(self.db_path, PAYSLIP_INSERT_SQL,
+                                                     on_commit=partial(self.audit_ledger.append, ISSUED))
+
+    def flush_payslips(self):
+        """Commit payslips still waiting in the write-behind queue (nothing to do without write-behind)"""
+        if self.__payslip_writer is not None:
+            self.__payslip_writer.flush()
+
+    def contribution_rules(self, pay_period):
+        """The SSS / PhilHealth / Pag-IBIG tables for a pay period's payslips"""
+        return LEGACY_FLAT_RATES if self.flat_contributions else contribution_rules(pay_period)
+
+    def sync_id_counter(self):
+        """Move the employee ID sequence past the highest numeric ID suffix in the database"""
+        highest = get_db(self.db_path).execute(f"SELECT MAX({EMP_ID_NUMBER_SQL}) FROM employees").fetchone()[0]
+        self.__employee_ids.advance_past(highest or 0)
+
+    def new_emp_id(self, department_code, employee_type_code):
+        """Next DEPT-T-NNNN employee ID; the number has at least 4 digits and keeps growing past 9999"""
+        return f"{department_code}-{employee_type_code}-{self.__employee_ids.next():04d}"
 
     def setup_database(self):
         """Initialize the database connection and create necessary tables"""
-        from database import init_db
-        init_db()
+        init_db(self.db_path)
 
 
     #Menu method implementation
     def menu(self):
         while True:
+            self.show_menu()
+            choice = input() 
+            if choice == '1':
+                self.manage_employees()
+            elif choice == '2':
+                self.manage_payslip()
+            elif choice == '3':
+                self.manage_payroll()
+            else:
+                print("Invalid choice. Please try again.", Colors.RED)
+
+    def show_menu(self):
+        with buffered_output():
             print_centered("~" * 130)  
             print_centered("Welcome to PaySphere Pro", Colors.GREEN)
             print_centered("~" * 130) 
@@ -144,29 +1369,22 @@ class PayrollSystem:
 
             # Call the print_prompt function to display the prompt
             print_prompt("Choose an option:" )
-            choice = input() 
-            if choice == '1':
-                self.manage_employees()
-            elif choice == '2':
-                self.manage_payslip()
-            elif choice == '3':
-                self.manage_payroll()
-            else:
-                print("Invalid choice. Please try again.", Colors.RED)
 
     #This is the function for managing employees
     def manage_employees(self):
         while True:
-            print_centered("~" * 130)  
-            print_centered("Manage Employees", Colors.GREEN)
-            print_centered("~" * 130)  
-            print_centered("1. Register Employee")
-            print_centered("2. View Employees")
-            print_centered("3. Update Employee")
-            print_centered("4. Delete Employee")
-            print_centered("5. Exit to Main Menu")
-
-            print_prompt("Choose an option:")
+            with buffered_output():
+                print_centered("~" * 130)  
+                print_centered("Manage Employees", Colors.GREEN)
+                print_centered("~" * 130)  
+                print_centered("1. Register Employee")
+                print_centered("2. View Employees")
+                print_centered("3. Update Employee")
+                print_centered("4. Delete Employee")
+                print_centered("5. Bulk Import Employees")
+                print_centered("6. Exit to Main Menu")
+
+                print_prompt("Choose an option:")
             choice = input()  
             if choice == '1':
                 self.register_employee()
@@ -177,6 +1395,8 @@ class PayrollSystem:
             elif choice == '4':
                 self.delete_employee()
             elif choice == '5':
+                self.bulk_import_employees()
+            elif choice == '6':
                 break  
             else:
                 print("Invalid choice. Please try again.", Colors.RED)
@@ -184,20 +1404,24 @@ class PayrollSystem:
     #This is the function for managing payslip       
     def manage_payslip(self):
         while True:
-            print_centered("~" * 130)  
-            print_centered("Manage Payslip", Colors.GREEN)
-            print_centered("~" * 130)  
-            print_centered("1. Create Payslip")
-            print_centered("2. View Payslip")
-            print_centered("3. Exit to Main Menu")
-
-            print_prompt("Choose an option:")
+            with buffered_output():
+                print_centered("~" * 130)  
+                print_centered("Manage Payslip", Colors.GREEN)
+                print_centered("~" * 130)  
+                print_centered("1. Create Payslip")
+                print_centered("2. View Payslip")
+                print_centered("3. View Payslip History")
+                print_centered("4. Exit to Main Menu")
+
+                print_prompt("Choose an option:")
             choice = input()  
             if choice == '1':
                 self.create_payslip() 
             elif choice == '2':
                 self.view_payslip()
             elif choice == '3':
+                self.view_payslip_history()
+            elif choice == '4':
                 break  
             else:
                 print("Invalid choice. Please try again.", Colors.RED)
@@ -205,17 +1429,27 @@ class PayrollSystem:
     #This is the function for managing payroll
     def manage_payroll(self):
         while True:
-            print_centered("~" * 130)  
-            print_centered("Manage Payroll", Colors.GREEN)
-            print_centered("~" * 130)  
-            print_centered("1. View Payroll")
-            print_centered("2. Exit to Main Menu")
-
-            print_prompt("Choose an option:")
+            with buffered_output():
+                print_centered("~" * 130)  
+                print_centered("Manage Payroll", Colors.GREEN)
+                print_centered("~" * 130)  
+                print_centered("1. View Payroll")
+                print_centered("2. Run Pay Period")
+                print_centered("3. Print Payslips")
+                print_centered("4. Export Payroll")
+                print_centered("5. Exit to Main Menu")
+
+                print_prompt("Choose an option:")
             choice = input()  
             if choice == '1':
                 self.view_payroll() 
             elif choice == '2':
+                self.pay_run()
+            elif choice == '3':
+                self.print_payslips()
+            elif choice == '4':
+                self.export_payroll_menu()
+            elif choice == '5':
                 break
             else:
                 print_centered("Invalid choice. Please try again.", Colors.RED)    
@@ -224,14 +1458,7 @@ class PayrollSystem:
     def create_employee(self, emp_type, name, job_title, email, phone, department, manager, hire_date, birth_date):
         try:
             # Extract department code based on the department name
-            department_mapping = {
-                "HUMAN RESOURCES": "HR",
-                "INFORMATION TECHNOLOGY": "IT",
-                "FINANCE": "FIN",
-                "MARKETING": "MKT",
-                "ENGINEERING": "ENG"
-            }
-            department_code = department_mapping.get(department.upper())
+            department_code = DEPARTMENT_NAME_CODES.get(department.upper())
             if not department_code:
                 raise ValueError("Invalid department")
                 
@@ -245,7 +1472,7 @@ class PayrollSystem:
             if not self.validate_employee_type_code(emp_type_code):
                 raise ValueError("Invalid employee type code")
                 
-            emp_id = f"{department_code}-{emp_type_code}-{str(self.__unique_id_counter).zfill(4)}"
+            emp_id = self.new_emp_id(department_code, emp_type_code)
             
             employee_classes = {
                 'F': FullTimeEmployee,
@@ -263,17 +1490,12 @@ class PayrollSystem:
 
             # Add database storage alongside existing code
             try:
-                from database import get_db
-                with get_db() as conn:
+                with get_db(self.db_path) as conn:
                     cursor = conn.cursor()
-                    cursor.execute('''
-                        INSERT INTO employees 
-                        (emp_id, name, job_title, email, phone, department, manager, hire_date, birth_date, employee_type)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (emp_id, name, job_title, email, phone, department, manager, hire_date, birth_date, emp_type))
+                    cursor.execute(EMPLOYEE_INSERT_SQL, (emp_id, name, job_title, email, phone, department,
+                                                         manager, hire_date, birth_date, emp_type_code))
                     conn.commit()
 
-                self.__unique_id_counter += 1
                 return emp_id
 
             except sqlite3.IntegrityError as e:
@@ -292,40 +1514,40 @@ class PayrollSystem:
 
     #These are input validation function for employee record to filter errors during input 
     def validate_department_code(self, code):
-        return code.upper() in ["HR", "IT", "FIN", "MKT", "ENG"]
+        return EMPLOYEE_VALIDATOR.check("department_code", code)
     
     def validate_employee_type_code(self, code):
-        return code.upper() in ["F", "P", "C", "I"]
+        return EMPLOYEE_VALIDATOR.check("employee_type", code)
     
     def validate_unique_identifier(self, identifier):
-        return identifier.isdigit() and len(identifier) == 4 and 1 <= int(identifier) <= 9999
+        return identifier.isdigit() and len(identifier) >= 4 and int(identifier) >= 1
     
     def validate_name(self, name):
-        return bool(re.match("^[A-Za-z ]+$", name))
+        return EMPLOYEE_VALIDATOR.check("name", name)
 
     def validate_job_title(self, job_title):
-        return bool(re.match("^[A-Za-z ]+$", job_title))
+        return EMPLOYEE_VALIDATOR.check("job_title", job_title)
 
     def validate_email(self, email):
-        return bool(re.match(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", email))
+        return EMPLOYEE_VALIDATOR.check("email", email)
 
     def validate_phone(self, phone):
-        return phone.isdigit() and len(phone) == 10
+        return EMPLOYEE_VALIDATOR.check("phone", phone)
 
     def validate_department(self, department):
-        return bool(re.match("^[A-Za-z ]+$", department))
+        return EMPLOYEE_VALIDATOR.check("department", department)
 
     def validate_manager(self, manager):
-        return bool(re.match("^[A-Za-z ]+$", manager))
+        return EMPLOYEE_VALIDATOR.check("manager", manager)
 
     def validate_date(self, date):
-        return bool(re.match(r"^\d{4}-\d{2}-\d{2}$", date))
+        return EMPLOYEE_VALIDATOR.check("hire_date", date)
 
     #Employee management methods
     """
     Format for ID number: [Department Code(3 letters)-HR:Human Resources, IT:Infomation Technology, FIN: Finance, MKT: Marketing, ENG: Engineering]
                       [Employee Type Code(1 letter)-F:Full-time, P:Part-time, C:Contract, I:Intern]
-                      [Unique Identifier (4 digits)-This start from 0001 and increment for each new employee]
+                      [Unique Identifier (4 or more digits)-This start from 0001 and increment for each new employee]
     """
     def register_employee(self):
         while True:
@@ -341,8 +1563,7 @@ class PayrollSystem:
                 break
             print("\t\t\t\tInvalid employee type code. Please enter F, P, C, or I.", Colors.RED)
 
-        emp_id = f"{department_code}-{employee_type_code}-{str(self.__unique_id_counter).zfill(4)}"
-        self.__unique_id_counter += 1
+        emp_id = self.new_emp_id(department_code, employee_type_code)
         print_centered(f"Employee ID registered: {emp_id}", Colors.YELLOW)
 
         while True:
@@ -406,36 +1627,434 @@ class PayrollSystem:
             return
             
         new_employee = employee_class(emp_id, name, job_title, email, phone, department, manager, hire_date, birth_date)
+
+        # Save to the database so the employee shows up in listings and later sessions
+        try:
+            with get_db(self.db_path) as conn:
+                conn.execute(EMPLOYEE_INSERT_SQL, (emp_id, name, job_title, email, phone, department,
+                                                   manager, hire_date, birth_date, employee_class.TYPE_CODE))
+        except sqlite3.IntegrityError:
+            print_centered("Error: Email address already exists!", Colors.RED)
+            return
+        except sqlite3.Error as e:
+            print_centered(f"Database error: {str(e)}", Colors.RED)
+            return
+
         self.__employees[emp_id] = new_employee
         print_centered("Employee registered successfully.", Colors.YELLOW)
         print()
 
+    def normalize_import_record(self, record):
+        """Strip an import record down to EMPLOYEE_IMPORT_FIELDS and fill in the codes"""
+        values = {field: str(record.get(field) or "").strip() for field in EMPLOYEE_IMPORT_FIELDS}
+        values["department_code"] = (values["department_code"] or
+                                     DEPARTMENT_NAME_CODES.get(values["department"].upper(), "")).upper()
+        values["employee_type"] = values["employee_type"][:1].upper()
+        return values
+
+    # Non-interactive operations shared by the menus and the JSON API (payroll_api.py).
+    # They raise ValueError for invalid input and KeyError for unknown employee IDs.
+    def add_employee(self, record):
+        """Register one employee from a dictionary of EMPLOYEE_IMPORT_FIELDS and return the new ID"""
+        values = self.normalize_import_record(record)
+        errors = EMPLOYEE_VALIDATOR.errors_by_record(EMPLOYEE_VALIDATOR.validate_batch([values]))[0]
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        type_code = values["employee_type"]
+        emp_id = self.new_emp_id(values['department_code'], type_code)
+        details = [values[field] for field in EMPLOYEE_DETAIL_FIELDS]
+        try:
+            with get_db(self.db_path) as conn:
+                conn.execute(EMPLOYEE_INSERT_SQL, (emp_id, *details, type_code))
+        except sqlite3.IntegrityError:
+            raise ValueError("email: already exists") from None
+
+        self.__employees[emp_id] = EMPLOYEE_CLASSES[type_code](emp_id, *details)
+        return emp_id
+
+    def edit_employee(self, emp_id, changes):
+        """Change some of an employee's EMPLOYEE_DETAIL_FIELDS; returns the updated employee"""
+        emp = self.__employees.get(emp_id)
+        if emp is None:
+            raise KeyError(emp_id)
+        unknown = set(changes) - set(EMPLOYEE_DETAIL_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+
+        # None (JSON null) clears a nullable detail and is refused for the others
+        required = [field for field in EMPLOYEE_DETAIL_FIELDS
+                    if field in changes and changes[field] is None and field not in NULLABLE_EMPLOYEE_FIELDS]
+        if required:
+            raise ValueError("; ".join(f"{field}: cannot be empty" for field in required))
+
+        current = {field: getattr(emp, f"get_{field}")() for field in EMPLOYEE_DETAIL_FIELDS}
+        values = {**current, **{field: None if value is None else str(value).strip()
+                                for field, value in changes.items()}}
+        # Only values that actually change are validated, so older records can still be edited
+        changed = tuple(field for field in EMPLOYEE_DETAIL_FIELDS if values[field] != current[field])
+        if not changed:
+            return emp
+        validated = tuple(field for field in changed if values[field] is not None)
+        if validated:
+            errors = EMPLOYEE_VALIDATOR.errors_by_record(EMPLOYEE_VALIDATOR.validate_batch([values], validated))
+            if errors[0]:
+                raise ValueError("; ".join(errors[0]))
+
+        try:
+            with get_db(self.db_path) as conn:
+                conn.execute('''
+                    UPDATE employees
+                    SET name = ?, job_title = ?, email = ?, phone = ?,
+                        department = ?, manager = ?, hire_date = ?, birth_date = ?
+                    WHERE emp_id = ?
+                ''', (*(values[field] for field in EMPLOYEE_DETAIL_FIELDS), emp_id))
+        except sqlite3.IntegrityError:
+            raise ValueError("email: already exists") from None
+
+        new_emp = type(emp)(emp_id, *(values[field] for field in EMPLOYEE_DETAIL_FIELDS))
+        self.__employees[emp_id] = new_emp
+
+        # Payslips count towards the department the employee is in now
+        if new_emp.get_department() != emp.get_department():
+            for payslip in self.get_payslip_history(emp_id, first_period="0000-00"):
+                self.__aggregates.subtract(payslip["pay_period"], emp.get_department(), type(emp).TYPE_CODE, payslip)
+                self.__aggregates.add(payslip["pay_period"], new_emp.get_department(), type(emp).TYPE_CODE, payslip)
+        return new_emp
+
+    def remove_employee(self, emp_id):
+        """Delete an employee and their payslips"""
+        if emp_id not in self.__employees:
+            raise KeyError(emp_id)
+        # A queued payslip must not be written after its employee is gone
+        self.flush_payslips()
+        self.__history.preload((emp_id,))
+        with get_db(self.db_path) as conn:
+            # The employees delete trigger removes the payslips as well
+            conn.execute("DELETE FROM employees WHERE emp_id = ?", (emp_id,))
+
+        emp = self.__employees.pop(emp_id)
+        removed = self.__history.remove_employee(emp_id)
+        for payslip in removed:
+            self.__aggregates.subtract(payslip["pay_period"], emp.get_department(), type(emp).TYPE_CODE, payslip)
+        self.audit_ledger.append(DELETED, [payslip_row(emp_id, payslip["pay_period"], payslip,
+                                                       payslip["creation_date"]) for payslip in removed])
+
+    def issue_payslip(self, emp_id, total_hours_worked, over_hours, salary_advance=0, incentives=0, bonus=0,
+                      pay_period=None):
+        """Compute and store the payslip of one employee for a pay period (default: this month)"""
+        emp = self.__employees.get(emp_id)
+        if emp is None:
+            raise KeyError(emp_id)
+        figures = {"total_hours_worked": total_hours_worked, "over_hours": over_hours,
+                   "salary_advance": salary_advance, "incentives": incentives, "bonus": bonus}
+        for field, value in figures.items():
+            try:
+                figures[field] = float(value or 0)
+            except (TypeError, ValueError):
+                raise ValueError(f"{field}: not a number") from None
+            if not math.isfinite(figures[field]):
+                raise ValueError(f"{field}: must be a finite number")
+            if figures[field] < 0:
+                raise ValueError(f"{field}: cannot be negative")
+        pay_period = pay_period or datetime.now().strftime('%Y-%m')
+        if not is_pay_period(pay_period):
+            raise ValueError("pay_period: use yyyy-mm format with a month from 01 to 12")
+
+        # Raises ValueError when an amount is too large to store
+        payslip = compute_payslip(emp, **figures, rules=self.contribution_rules(pay_period),
+                                  tax_rules=withholding_tax_rules(pay_period))
+        creation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        row = payslip_row(emp_id, pay_period, payslip, creation_date)
+        self.__history.preload((emp_id,))
+        if self.__payslip_writer is not None:
+            self.__payslip_writer.put(row)
+        else:
+            with get_db(self.db_path) as conn:
+                conn.execute(PAYSLIP_INSERT_SQL, row)
+            self.audit_ledger.append(ISSUED, (row,))
+        self.record_payslip(emp_id, pay_period, payslip, creation_date)
+        # Same shape as fetch_payslip
+        return {"emp_id": emp_id, "pay_period": pay_period, **payslip, "creation_date": creation_date}
+
+    # Read-only lookups. They only query the database (each thread has its own connection),
+    # so they can run on any thread while another thread makes changes.
+    def fetch_employee(self, emp_id):
+        """The employee's details as a dictionary, or None"""
+        row = get_db(self.db_path).execute(EMPLOYEE_BY_ID_SQL, (emp_id,)).fetchone()
+        return dict(row) if row else None
+
+    def fetch_payslip(self, emp_id, pay_period=None):
+        """The payslip of a pay period (default: the latest one) as a dictionary, or None"""
+        self.flush_payslips()
+        if pay_period:
+            row = get_db(self.db_path).execute(PERIOD_PAYSLIP_SQL, (emp_id, pay_period)).fetchone()
+        else:
+            row = get_db(self.db_path).execute(LATEST_PAYSLIP_SQL, (emp_id,)).fetchone()
+        return dict(row) if row else None
+
+    def payroll_report(self, pay_period):
+        """
+        Payslips of a pay period with subtotals by department and employee type and the totals.
+        Money is in integer centavos.
+        """
+        self.flush_payslips()
+        conn = get_db(self.db_path)
+        fields = ", ".join(f"p.{column} AS {field}" for field, column in PAYSLIP_COLUMNS.items())
+        payslips = [dict(row) for row in conn.execute(f'''
+            SELECT p.emp_id, COALESCE(e.name, p.emp_id) AS name, COALESCE(e.department, '') AS department, {fields}
+            FROM payslips p LEFT JOIN employees e ON e.emp_id = p.emp_id
+            WHERE p.pay_period = ?
+            ORDER BY p.emp_id
+        ''', (pay_period,))]
+
+        # Subtotals come from the trigger-maintained payroll_summary table
+        sums = ", ".join(f"SUM({column}) AS {field}" for field, column in PAYSLIP_COLUMNS.items())
+        report = {"pay_period": pay_period, "payslips": payslips}
+        for key, group in (("by_department", "department"), ("by_employee_type", "employee_type"), ("totals", None)):
+            rows = conn.execute(f'''
+                SELECT {group or "NULL"} AS grp, SUM(payslip_count) AS count, {sums}
+                FROM payroll_summary WHERE pay_period = ? GROUP BY grp ORDER BY grp
+            ''', (pay_period,)).fetchall()
+            groups = {row["grp"]: {name: row[name] for name in ("count",) + PAYSLIP_FIELDS} for row in rows}
+            report[key] = groups if group else groups.get(None, dict.fromkeys(("count",) + PAYSLIP_FIELDS, 0))
+        return report
+
+    def render_payslips(self, pay_period, out_dir, fmt="text", single_file=None, workers=0):
+        """
+        Write the payslips of a pay period as text or HTML files (see render_payslip_files):
+        one per employee in out_dir, or all of them in out_dir/single_file
+        """
+        self.flush_payslips()
+        columns = ", ".join(f"p.{column}" for column in PAYSLIP_COLUMNS.values())
+        rows = get_db(self.db_path).execute(f'''
+            SELECT p.emp_id, COALESCE(e.name, p.emp_id), COALESCE(e.job_title, ''), COALESCE(e.phone, ''),
+                   COALESCE(e.department, ''), p.pay_period, {columns}
+            FROM payslips p LEFT JOIN employees e ON e.emp_id = p.emp_id
+            WHERE p.pay_period = ?
+            ORDER BY p.emp_id
+        ''', (pay_period,)).fetchall()
+        return render_payslip_files([tuple(row) for row in rows], out_dir, fmt, single_file, workers)
+
+    def export_payroll(self, pay_period, path, fmt="csv", chunk_size=5000):
+        """Stream a pay period's payslips and employee details to a CSV or columnar file (see payroll_export)"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+        self.flush_payslips()
+        return EXPORT_FORMATS[fmt](get_db(self.db_path), pay_period, path, chunk_size)
+
+    def import_employees(self, path, error_path=None, chunk_size=5000):
+        """
+        Stream employees from a CSV or JSONL file, validate them, assign DEPT-T-NNNN IDs and
+        insert them chunk by chunk (one executemany and one transaction per chunk).
+        Rejected records are written to error_path with an extra "errors" column.
+        """
+        start = time.perf_counter()
+        conn = get_db(self.db_path)
+        error_path = error_path or os.path.splitext(path)[0] + ".errors" + os.path.splitext(path)[1]
+
+        # Skip past IDs stored by other means (e.g. restored backups) so imported IDs never collide
+        self.sync_id_counter()
+        known_emails = {email.lower() for (email,) in conn.execute("SELECT email FROM employees")}
+
+        imported = 0
+        rejected = 0
+        error_file = None
+        records = read_records(path)
+        try:
+            while True:
+                chunk = list(itertools.islice(records, chunk_size))
+                if not chunk:
+                    break
+                # IDs for the whole chunk come from one reserved block
+                self.__employee_ids.reserve(len(chunk))
+
+                rows = []
+                new_employees = {}
+                chunk_values = [self.normalize_import_record(record) for line_number, record, problem in chunk]
+                chunk_errors = EMPLOYEE_VALIDATOR.errors_by_record(EMPLOYEE_VALIDATOR.validate_batch(chunk_values))
+                for (line_number, record, problem), values, errors in zip(chunk, chunk_values, chunk_errors):
+                    if problem:
+                        errors = [problem]
+                    elif not errors and values["email"].lower() in known_emails:
+                        errors.append("email: already exists")
+                    if errors:
+                        # The error file is only created once there is something to put in it
+                        if error_file is None:
+                            error_file = open(error_path, "w", newline='', encoding='utf-8')
+                            error_csv = csv.DictWriter(error_file, extrasaction='ignore',
+                                                       fieldnames=["line", *EMPLOYEE_IMPORT_FIELDS, "errors"])
+                            if not error_path.lower().endswith((".jsonl", ".ndjson")):
+                                error_csv.writeheader()
+                        rejected_record = {"line": line_number, **record, "errors": "; ".join(errors)}
+                        if error_path.lower().endswith((".jsonl", ".ndjson")):
+                            error_file.write(json.dumps(rejected_record) + "\n")
+                        else:
+                            error_csv.writerow(rejected_record)
+                        rejected += 1
+                        continue
+
+                    known_emails.add(values["email"].lower())
+                    type_code = values["employee_type"]
+                    emp_id = self.new_emp_id(values['department_code'], type_code)
+                    new_employees[emp_id] = EMPLOYEE_CLASSES[type_code](
+                        emp_id, values["name"], values["job_title"], values["email"], values["phone"],
+                        values["department"], values["manager"], values["hire_date"], values["birth_date"])
+                    rows.append((emp_id, values["name"], values["job_title"], values["email"], values["phone"],
+                                 values["department"], values["manager"], values["hire_date"],
+                                 values["birth_date"], type_code))
+
+                with conn:
+                    conn.executemany(EMPLOYEE_INSERT_SQL, rows)
+                self.__employees.update(new_employees)
+                imported += len(rows)
+        finally:
+            if error_file is not None:
+                error_file.close()
+
+        elapsed = time.perf_counter() - start
+        return {
+            "imported": imported,
+            "rejected": rejected,
+            "error_path": error_path if rejected else None,
+            "elapsed_seconds": elapsed,
+            "rows_per_second": (imported + rejected) / elapsed if elapsed > 0 else 0.0
+        }
+
+    def bulk_import_employees(self):
+        print_centered("." * 130)
+        path = input("\t\t\t\tEnter Employee File (CSV or JSONL): ").strip()
+        try:
+            summary = self.import_employees(path)
+        except (OSError, csv.Error, UnicodeDecodeError) as e:
+            print_centered(f"Error reading employee file: {str(e)}", Colors.RED)
+            return
+        except sqlite3.Error as e:
+            print_centered(f"Database error: {str(e)}", Colors.RED)
+            return
+
+        print_centered(f"Imported {summary['imported']} employees in {summary['elapsed_seconds']:.2f}s", Colors.YELLOW)
+        if summary["rejected"]:
+            print_centered(f"{summary['rejected']} rejected records written to {summary['error_path']}", Colors.RED)
+        print_centered("." * 130)
+        print()
+
+    # Columns that can be used to sort the employee listing
+    EMPLOYEE_SORT_KEYS = ("emp_id", "name", "department", "manager", "hire_date", "employee_type")
+    # Sort keys that may be NULL; the rows without a value come first (last when descending)
+    NULLABLE_SORT_KEYS = ("manager", "hire_date")
+
+    # Listing filters: SQL condition per list_employees argument
+    EMPLOYEE_FILTERS = (
+        ("department", "department = ? COLLATE NOCASE"),
+        ("employee_type", "employee_type = ?"),
+        ("manager", "manager = ? COLLATE NOCASE"),
+        ("hired_from", "hire_date >= ?"),
+        ("hired_to", "hire_date <= ?"),
+    )
+
+    @classmethod
+    def employee_page_queries(cls, sort_by="emp_id", descending=False, conditions=()):
+        """
+        The queries list_employees pages with, as (seek columns, first page SQL, next page SQL)
+        per run. Their parameters are the filter values, then (next page only) the seek columns
+        of the last row read, then the page size.
+        """
+        # emp_id breaks ties so the key of the last row on a page identifies the next page.
+        # A NULL never compares greater or less than anything, so a nullable key is walked in two
+        # runs over the same (sort_by, emp_id) index: the rows without a value in emp_id order,
+        # then the rows with one (the other way round when descending). Each query is one
+        # index search starting after the last row read, never a scan and sort.
+        key_columns = ("emp_id",) if sort_by == "emp_id" else (sort_by, "emp_id")
+        runs = [(None, key_columns)]
+        if sort_by in cls.NULLABLE_SORT_KEYS:
+            runs = [(f"{sort_by} IS NULL", ("emp_id",)), (f"{sort_by} IS NOT NULL", key_columns)]
+            if descending:
+                runs.reverse()
+        direction = "DESC" if descending else "ASC"
+        order_by = ", ".join(f"{column} {direction}" for column in key_columns)
+
+        queries = []
+        for run_condition, seek_columns in runs:
+            run_conditions = [*conditions, run_condition] if run_condition else list(conditions)
+            after_last = (f"({', '.join(seek_columns)}) {'<' if descending else '>'} "
+                          f"({', '.join('?' * len(seek_columns))})")
+            first, following = (f"SELECT * FROM employees {'WHERE ' + ' AND '.join(where) if where else ''} "
+                                f"ORDER BY {order_by} LIMIT ?"
+                                for where in (run_conditions, run_conditions + [after_last]))
+            queries.append((seek_columns, first, following))
+        return queries
+
+    def list_employees(self, department=None, employee_type=None, manager=None, hired_from=None,
+                       hired_to=None, sort_by="emp_id", descending=False, page_size=50):
+        """
+        Yield pages (lists of rows) of employees from the database. Filters are optional;
+        pages are fetched with keyset pagination on (sort_by, emp_id), so every row is read
+        once and only one page is held in memory at a time.
+        """
+        if sort_by not in self.EMPLOYEE_SORT_KEYS:
+            raise ValueError(f"Cannot sort by {sort_by}")
+        conn = get_db(self.db_path)
+
+        values = {"department": department, "employee_type": employee_type, "manager": manager,
+                  "hired_from": hired_from, "hired_to": hired_to}
+        conditions = [condition for name, condition in self.EMPLOYEE_FILTERS if values[name]]
+        params = [values[name] for name, condition in self.EMPLOYEE_FILTERS if values[name]]
+
+        page = []
+        for seek_columns, first, following in self.employee_page_queries(sort_by, descending, conditions):
+            last_key = None
+            while True:
+                wanted = page_size - len(page)
+                if last_key is None:
+                    rows = conn.execute(first, params + [wanted]).fetchall()
+                else:
+                    rows = conn.execute(following, params + list(last_key) + [wanted]).fetchall()
+                page.extend(rows)
+                if len(page) == page_size:
+                    yield page
+                    page = []
+                if len(rows) < wanted:
+                    break  # this run is exhausted
+                last_key = tuple(rows[-1][column] for column in seek_columns)
+        if page:
+            yield page
+
     # This function is used to display all employees
     def view_employees(self):
-        print("-" * 199)
-        if not self.__employees:
-            print_centered("No employees registered.", Colors.RED)
+        print_centered("." * 130)
+        print_centered("Leave a filter blank to include every employee.", Colors.YELLOW)
+        department = input("\t\t\t\tFilter by Department: ").strip()
+        employee_type = input("\t\t\t\tFilter by Employee Type Code (F, P, C, I): ").strip().upper()
+        manager = input("\t\t\t\tFilter by Manager Name: ").strip()
+        hired_from = input("\t\t\t\tHired on or after (yyyy-mm-dd): ").strip()
+        hired_to = input("\t\t\t\tHired on or before (yyyy-mm-dd): ").strip()
+        sort_by = input(f"\t\t\t\tSort by ({', '.join(self.EMPLOYEE_SORT_KEYS)}): ").strip().lower() or "emp_id"
+
+        if (hired_from and not self.validate_date(hired_from)) or (hired_to and not self.validate_date(hired_to)):
+            print_centered("Invalid date format. Please use yyyy-mm-dd format.", Colors.RED)
             return
-        for emp in self.__employees.values():
-            print(emp)
-            print("-" * 199)
-
-        # Show employees from database
-        from database import get_db
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM employees')
-            db_employees = cursor.fetchall()
-            
-            if db_employees:
-                print_centered("Database Records:", Colors.BLUE)
-                for emp in db_employees:
-                    print(f"ID: {emp[0]}, Name: {emp[1]}, Job Title: {emp[2]}, "
-                          f"Email: {emp[3]}, Phone: {emp[4]}, Department: {emp[5]}, "
-                          f"Manager: {emp[6]}, Hire Date: {emp[7]}, Birth Date: {emp[8]}, "
-                          f"Type: {emp[9]}")
-                    print("-" * 199)
-        
+        if sort_by not in self.EMPLOYEE_SORT_KEYS:
+            print_centered("Invalid sort key.", Colors.RED)
+            return
+
+        echo("-" * 199)
+        shown = 0
+        for page in self.list_employees(department, employee_type, manager, hired_from, hired_to, sort_by):
+            with buffered_output():
+                for emp in page:
+                    echo(f"ID: {emp['emp_id']}, Name: {emp['name']}, Job Title: {emp['job_title']}, "
+                         f"Email: {emp['email']}, Phone: {emp['phone']}, Department: {emp['department']}, "
+                         f"Manager: {emp['manager']}, Hire Date: {emp['hire_date']}, Birth Date: {emp['birth_date']}, "
+                         f"Type: {emp['employee_type']}")
+                    echo("-" * 199)
+                shown += len(page)
+                print_prompt(f"{shown} shown. Press Enter for the next page or Q to stop:")
+            if input().strip().upper() == "Q":
+                return
+        if not shown:
+            print_centered("No employees found.", Colors.RED)
+
     # This function is used for updating employee details
     def update_employee(self):
         print_centered("." * 199)
@@ -509,46 +2128,18 @@ class PayrollSystem:
                 print("\t\t\t\tInvalid birth date format. Please use yyyy-mm-dd format.", Colors.RED)
                 return
     
-            # Get employee type from ID
-            emp_type = emp_id.split('-')[1]
-            
-            # Create new employee object with updated information
-            employee_classes = {
-                'F': FullTimeEmployee,
-                'P': PartTimeEmployee,
-                'C': ContractEmployee,
-                'I': InternEmployee
-            }
-            
-            employee_class = employee_classes.get(emp_type)
-            if not employee_class:
-                print("\t\t\t\tInvalid employee type.", Colors.RED)
-                return
-                
-            # Create new employee with updated information
-            new_emp = employee_class(emp_id, name, job_title, email, phone, department, 
-                                   manager, hire_date, birth_date)
-            
-            # Replace old employee details with new employee details
-            self.__employees[emp_id] = new_emp
-            
-            # Update database
+            # Update memory and database
             try:
-                from database import get_db
-                with get_db() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        UPDATE employees 
-                        SET name = ?, job_title = ?, email = ?, phone = ?, 
-                            department = ?, manager = ?, hire_date = ?, birth_date = ?
-                        WHERE emp_id = ?
-                    ''', (name, job_title, email, phone, department, manager, hire_date, birth_date, emp_id))
-                    conn.commit()
+                self.edit_employee(emp_id, {"name": name, "job_title": job_title, "email": email, "phone": phone,
+                                            "department": department, "manager": manager,
+                                            "hire_date": hire_date, "birth_date": birth_date})
             except sqlite3.Error as e:
                 print_centered(f"Database error: {str(e)}", Colors.RED)
-            except Exception as e:
+                return
+            except ValueError as e:
                 print_centered(f"Error updating employee: {str(e)}", Colors.RED)
-            
+                return
+
             print_centered("Employee updated successfully.", Colors.YELLOW)
             print_centered("." * 130)
             print()
@@ -565,24 +2156,7 @@ class PayrollSystem:
         
         if emp_id in self.__employees:
             try:
-                # Delete from database first
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                
-                # Delete from employees table
-                cursor.execute("DELETE FROM employees WHERE emp_id = ?", (emp_id,))
-                
-                # Delete associated payslips
-                cursor.execute("DELETE FROM payslips WHERE emp_id = ?", (emp_id,))
-                
-                conn.commit()
-                conn.close()
-                
-                # Delete from memory
-                del self.__employees[emp_id]
-                if emp_id in self.__payslips:
-                    del self.__payslips[emp_id]
-                
+                self.remove_employee(emp_id)
                 print_centered(f"Employee {emp_id} has been deleted successfully.", Colors.GREEN)
                 
             except sqlite3.Error as e:
@@ -604,16 +2178,13 @@ class PayrollSystem:
                 return 
             emp = self.__employees[emp_id]
             
+            pay_period = datetime.now().strftime('%Y-%m')
+
             # Displaying employee details
-            print_centered("=" * 130)
-            print_centered("Payslip", Colors.BLUE)
-            print_centered("=" * 130)
-            print(f"\t\t\t\t\t\tEmployee ID: {emp.get_emp_id()}")
-            print(f"\t\t\t\t\t\tName: {emp.get_name()}")
-            print(f"\t\t\t\t\t\tJob Title: {emp.get_job_title()}")
-            print(f"\t\t\t\t\t\tPhone Number: +63-{emp.get_phone()}")
-            print(f"\t\t\t\t\t\tDepartment: {emp.get_department()}")
-            print_centered("-" * 130)
+            with buffered_output():
+                details = {"emp_id": emp.get_emp_id(), "name": emp.get_name(), "job_title": emp.get_job_title(),
+                           "phone": emp.get_phone(), "department": emp.get_department(), "pay_period": pay_period}
+                echo(payslip_template("terminal", terminal_width()).render_header(details), end="")
             
             # Getting payslip details with validation
             try:
@@ -641,69 +2212,17 @@ class PayrollSystem:
                 print_centered(f"Invalid input: {str(e)}", Colors.RED)
                 return
     
-            # These are the calcualtions for the payslip
+            # These are the calcualtions for the payslip; the payslip is stored for this month
             try:
-                # Get base salary calculation from employee type-specific implementation
-                base_salary = emp.calculate_salary(total_hours_worked, over_hours)
-                
-                # Calculate mandatory benefits
-                sss_employee_contribution = base_salary * 0.045
-                philhealth_employee_contribution = base_salary * 0.0225
-                pagibig_employee_contribution = base_salary * 0.02
-    
-                # Calculate totals
-                overtime_pay = over_hours * (base_salary/total_hours_worked) * 1.25 if total_hours_worked > 0 else 0
-                total_earnings = base_salary + incentives + bonus + overtime_pay
-                total_deductions = (salary_advance + sss_employee_contribution + 
-                                  philhealth_employee_contribution + pagibig_employee_contribution)
-                net_pay = total_earnings - total_deductions
-    
-                # Store payslip
-                self.__payslips[emp_id] = {
-                    "total_hours_worked": total_hours_worked,
-                    "over_hours": over_hours,
-                    "basic_salary": base_salary,
-                    "incentives": incentives,
-                    "bonus": bonus,
-                    "overtime_pay": overtime_pay,
-                    "total_earnings": total_earnings,
-                    "salary_advance": salary_advance,
-                    "sss_employee_contribution": sss_employee_contribution,
-                    "philhealth_employee_contribution": philhealth_employee_contribution,
-                    "pagibig_employee_contribution": pagibig_employee_contribution,
-                    "total_deductions": total_deductions,
-                    "net_pay": net_pay
-                }
-                # Store payslip in database
                 try:
-                    from database import get_db
-                    with get_db() as conn:
-                        cursor = conn.cursor()
-                        cursor.execute('''
-                            INSERT INTO payslips (
-                                emp_id, pay_period, total_hours, overtime_hours,
-                                basic_salary, incentives, bonus, overtime_pay,
-                                total_earnings, salary_advance,
-                                sss_contribution, philhealth_contribution, pagibig_contribution,
-                                total_deductions, net_pay, creation_date
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            emp_id, datetime.now().strftime('%Y-%m'),
-                            total_hours_worked, over_hours,
-                            base_salary, incentives, bonus, overtime_pay,
-                            total_earnings, salary_advance,
-                            sss_employee_contribution, philhealth_employee_contribution, 
-                            pagibig_employee_contribution, total_deductions, net_pay,
-                            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        ))
-                        conn.commit()
+                    self.issue_payslip(emp_id, total_hours_worked, over_hours, salary_advance, incentives, bonus,
+                                       pay_period)
                 except sqlite3.Error as e:
                     print_centered(f"Database error: {str(e)}", Colors.RED)
-                except Exception as e:
-                    print_centered(f"Error storing payslip in database: {str(e)}", Colors.RED)
+                    return
     
                 # Display payslip
-                self.display_payslip(emp_id)
+                self.display_payslip(emp_id, pay_period)
                 
             except Exception as e:
                 print_centered(f"Error calculating payslip: {str(e)}", Colors.RED)
@@ -711,45 +2230,182 @@ class PayrollSystem:
         except Exception as e:
             print_centered(f"Error creating payslip: {str(e)}", Colors.RED)
 
-    def display_payslip(self, emp_id):
-        """Helper method to display a formatted payslip"""
-        if emp_id in self.__payslips and emp_id in self.__employees:
-            payslip = self.__payslips[emp_id]
-            emp = self.__employees[emp_id]
-
-            print_centered("=" * 130)
-            print_centered("Payslip", Colors.BLUE)
-            print_centered("=" * 130)
-        
-            # Employee Details
-            print(f"\t\t\t\t\t\tEmployee ID: {emp.get_emp_id()}")
-            print(f"\t\t\t\t\t\tName: {emp.get_name()}")
-            print(f"\t\t\t\t\t\tJob Title: {emp.get_job_title()}")
-            print(f"\t\t\t\t\t\tDepartment: {emp.get_department()}")
-            print_centered("-" * 130)
-        
-            # Earnings Section
-            print_centered("Earnings:", Colors.GREEN)
-            print_centered(f"  Total Hours Worked:         {payslip['total_hours_worked']}")
-            print_centered(f"  Overtime Hours:             {payslip['over_hours']}")
-            print_centered(f"  Basic Salary:               ₱{payslip['basic_salary']:.2f}")
-            print_centered(f"  Incentives:                 ₱{payslip['incentives']:.2f}")
-            print_centered(f"  Bonus:                      ₱{payslip['bonus']:.2f}")
-            print_centered(f"  Overtime Pay:               ₱{payslip['overtime_pay']:.2f}")
-            print_centered(f"  TOTAL EARNINGS:             ₱{payslip['total_earnings']:.2f}")
-        
-            # Deductions Section
-            print_centered("Deductions:", Colors.GREEN)
-            print_centered(f"  Salary in Advance:          ₱{payslip['salary_advance']:.2f}")
-            print_centered(f"  SSS Contribution:           ₱{payslip['sss_employee_contribution']:.2f}")
-            print_centered(f"  PhilHealth Contribution:    ₱{payslip['philhealth_employee_contribution']:.2f}")
-            print_centered(f"  Pag-ibig Contribution:      ₱{payslip['pagibig_employee_contribution']:.2f}")
-            print_centered(f"  TOTAL DEDUCTIONS:           ₱{payslip['total_deductions']:.2f}")
-        
-            # Net Pay
-            print_centered(f"  Net Pay:                    ₱{payslip['net_pay']:.2f}")
+    def compute_payslip(self, emp, total_hours_worked, over_hours, salary_advance=0, incentives=0, bonus=0):
+        """Compute the payslip figures for one employee without storing them"""
+        return compute_payslip(emp, total_hours_worked, over_hours, salary_advance, incentives, bonus)
+
+    def run_payroll(self, pay_period, timesheets, workers=0, shard_by="department"):
+        """
+        Batch pay run: compute a payslip for every timesheet entry and store them all
+        in a single database transaction. Returns a summary with the throughput.
+        The payslips are computed in one vectorized pass when NumPy is installed, one
+        at a time otherwise. With workers > 1 they are computed on a process pool, sharded
+        by department or by hash (see compute_payroll_parallel); this process stays the
+        only database writer and the summary also lists the per-worker timings.
+        """
+        start = time.perf_counter()
+        creation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        entries = []
+        rejected = []
+
+        for entry in timesheets:
+            emp_id = str(entry.get("emp_id", "")).strip().upper()
+            emp = self.__employees.get(emp_id)
+            if emp is None:
+                rejected.append((emp_id, "Employee not found"))
+                continue
+            try:
+                values = [float(entry.get(field) or 0) for field in TIMESHEET_FIELDS[1:]]
+            except (TypeError, ValueError):
+                rejected.append((emp_id, "Non-numeric timesheet value"))
+                continue
+            if not all(math.isfinite(value) for value in values):
+                rejected.append((emp_id, "Timesheet values must be finite numbers"))
+                continue
+            if any(value < 0 for value in values):
+                rejected.append((emp_id, "Timesheet values cannot be negative"))
+                continue
+            entries.append((emp_id, emp, values))
+
+        rules = self.contribution_rules(pay_period)
+        tax_rules = withholding_tax_rules(pay_period)
+        timings = []
+        if workers and workers > 1 and entries:
+            payslips, timings, too_large = compute_payroll_parallel(entries, workers, shard_by, rules, tax_rules)
         else:
-            print_centered("Payslip or employee not found.", Colors.RED)
+            payslips, too_large = compute_payroll(entries, rules, tax_rules)
+        rejected.extend((emp_id, "Payslip amounts too large to store") for emp_id in too_large)
+        rows = [payslip_row(emp_id, pay_period, payslip, creation_date) for emp_id, payslip in payslips.items()]
+
+        # Queued single payslips go first so they cannot overwrite this pay run later
+        self.flush_payslips()
+        self.__history.preload(payslips)
+        with get_db(self.db_path) as conn:
+            conn.executemany(PAYSLIP_INSERT_SQL, rows)
+        self.audit_ledger.append(ISSUED, rows)
+        for emp_id, payslip in payslips.items():
+            self.record_payslip(emp_id, pay_period, payslip, creation_date)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "pay_period": pay_period,
+            "processed": len(rows),
+            "rejected": rejected,
+            "elapsed_seconds": elapsed,
+            "payslips_per_second": len(rows) / elapsed if elapsed > 0 else 0.0,
+            "workers": timings
+        }
+
+    def pay_run(self):
+        print_centered("." * 130)
+        pay_period = input("\t\t\t\tEnter Pay Period (yyyy-mm, leave blank for current month): ").strip()
+        if not pay_period:
+            pay_period = datetime.now().strftime('%Y-%m')
+        elif not is_pay_period(pay_period):
+            print_centered("Invalid pay period format. Please use yyyy-mm format.", Colors.RED)
+            return
+        path = input("\t\t\t\tEnter Timesheet CSV File: ").strip()
+        workers = input("\t\t\t\tWorker Processes (leave blank for 1): ").strip()
+        if workers and not workers.isdigit():
+            print_centered("Invalid number of worker processes.", Colors.RED)
+            return
+        shard_by = "department"
+        if workers and int(workers) > 1:
+            shard_by = input("\t\t\t\tShard by department or hash (leave blank for department): ").strip().lower()
+            if shard_by not in PAYROLL_SHARD_KEYS:
+                shard_by = "department"
+
+        try:
+            summary = self.run_payroll(pay_period, read_timesheets(path), int(workers or 1), shard_by)
+        except (OSError, csv.Error) as e:
+            print_centered(f"Error reading timesheets: {str(e)}", Colors.RED)
+            return
+        except sqlite3.Error as e:
+            print_centered(f"Database error: {str(e)}", Colors.RED)
+            return
+
+        for emp_id, reason in summary["rejected"]:
+            print_centered(f"Skipped {emp_id or '(blank ID)'}: {reason}", Colors.RED)
+        for timing in summary["workers"]:
+            print_centered(f"Shard {timing['shard']} (pid {timing['pid']}): {timing['processed']} payslips in "
+                           f"{timing['elapsed_seconds']:.3f}s")
+        print_centered(f"Pay run {pay_period}: {summary['processed']} payslips in "
+                       f"{summary['elapsed_seconds']:.3f}s "
+                       f"({summary['payslips_per_second']:.0f} payslips/sec)", Colors.YELLOW)
+        print_centered("." * 130)
+        print()
+
+    def print_payslips(self):
+        print_centered("." * 130)
+        pay_period = input("\t\t\t\tEnter Pay Period (yyyy-mm, leave blank for current month): ").strip()
+        if not pay_period:
+            pay_period = datetime.now().strftime('%Y-%m')
+        elif not is_pay_period(pay_period):
+            print_centered("Invalid pay period format. Please use yyyy-mm format.", Colors.RED)
+            return
+        fmt = input("\t\t\t\tFormat, text or html (leave blank for text): ").strip().lower() or "text"
+        if not PAYSLIP_FORMATS.get(fmt):
+            print_centered("Invalid format. Please choose text or html.", Colors.RED)
+            return
+        out_dir = input(f"\t\t\t\tOutput Folder (leave blank for payslips-{pay_period}): ").strip()
+        single_file = input("\t\t\t\tSingle File Name (leave blank for one file per employee): ").strip()
+        workers = input("\t\t\t\tWorker Processes (leave blank for 1): ").strip()
+        if workers and not workers.isdigit():
+            print_centered("Invalid number of worker processes.", Colors.RED)
+            return
+
+        try:
+            summary = self.render_payslips(pay_period, out_dir or f"payslips-{pay_period}", fmt, single_file or None,
+                                           int(workers or 1))
+        except OSError as e:
+            print_centered(f"Error writing payslips: {str(e)}", Colors.RED)
+            return
+        except sqlite3.Error as e:
+            print_centered(f"Database error: {str(e)}", Colors.RED)
+            return
+        print_centered(f"Pay period {pay_period}: {summary['rendered']} payslips in {summary['files']} file(s) "
+                       f"under {summary['path']}, {summary['elapsed_seconds']:.3f}s "
+                       f"({summary['payslips_per_second']:.0f} payslips/sec)", Colors.YELLOW)
+        print_centered("." * 130)
+        print()
+
+    def export_payroll_menu(self):
+        print_centered("." * 130)
+        pay_period = input("\t\t\t\tEnter Pay Period (yyyy-mm, leave blank for current month): ").strip()
+        if not pay_period:
+            pay_period = datetime.now().strftime('%Y-%m')
+        elif not is_pay_period(pay_period):
+            print_centered("Invalid pay period format. Please use yyyy-mm format.", Colors.RED)
+            return
+        fmt = input("\t\t\t\tFormat, csv or columnar (leave blank for csv): ").strip().lower() or "csv"
+        if fmt not in EXPORT_FORMATS:
+            print_centered("Invalid format. Please choose csv or columnar.", Colors.RED)
+            return
+        default_path = f"payroll-{pay_period}.{'csv' if fmt == 'csv' else 'cols'}"
+        path = input(f"\t\t\t\tOutput File (leave blank for {default_path}): ").strip() or default_path
+
+        try:
+            summary = self.export_payroll(pay_period, path, fmt)
+        except OSError as e:
+            print_centered(f"Error writing export: {str(e)}", Colors.RED)
+            return
+        except sqlite3.Error as e:
+            print_centered(f"Database error: {str(e)}", Colors.RED)
+            return
+        print_centered(f"Pay period {pay_period}: {summary['rows']} payslips exported to {summary['path']} in "
+                       f"{summary['elapsed_seconds']:.3f}s ({summary['rows_per_second']:.0f} rows/sec)", Colors.YELLOW)
+        print_centered("." * 130)
+        print()
+
+    def display_payslip(self, emp_id, pay_period=None):
+        """Show a stored payslip (default: the latest one) through the terminal payslip template"""
+        emp = self.fetch_employee(emp_id)
+        payslip = self.fetch_payslip(emp_id, pay_period) if emp else None
+        with buffered_output():
+            if payslip is None:
+                print_centered("Payslip or employee not found.", Colors.RED)
+                return
+            echo(payslip_template("terminal", terminal_width()).render({**emp, **payslip}), end="")
 
     def get_numeric_input(self, prompt):
         while True:
@@ -759,85 +2415,43 @@ class PayrollSystem:
                 print("Invalid input. Please enter a numeric value.", Colors.RED)
     
     def setup_predefined_employees(self):
-        # Adding some predefined employees using concrete classes based on employee type code
-        predefined_employees = {
+        # Adding some predefined employees (same columns as EMPLOYEE_INSERT_SQL, employee type code last)
+        predefined_employees = (
             # Full-time employees (F)
-            "HR-F-0001": FullTimeEmployee("HR-F-0001", "Dwayne Johnson", "Chief HR Manager", "dwayne.johnson@example.com", "09123456789", "Human Resources", "Bob Smith", "2015-01-15", "1990-05-20"),
-            "HR-F-0002": FullTimeEmployee("HR-F-0002", "Evelyn Carter", "HR Manager", "evelyn.carter@example.com", "09123456789", "Human Resources", "Bob Smith", "2020-01-15", "1999-09-20"),
-            "IT-F-0003": FullTimeEmployee("IT-F-0003", "Kit Mayson", "Programmer", "kit.mayson@example.com", "09123456788", "Info. Technology", "Jane Doe", "2021-03-10", "1992-07-30"),
-            
+            ("HR-F-0001", "Dwayne Johnson", "Chief HR Manager", "dwayne.johnson@example.com", "09123456789", "Human Resources", "Bob Smith", "2015-01-15", "1990-05-20", "F"),
+            ("HR-F-0002", "Evelyn Carter", "HR Manager", "evelyn.carter@example.com", "09123456789", "Human Resources", "Bob Smith", "2020-01-15", "1999-09-20", "F"),
+            ("IT-F-0003", "Kit Mayson", "Programmer", "kit.mayson@example.com", "09123456788", "Info. Technology", "Jane Doe", "2021-03-10", "1992-07-30", "F"),
+
             # Part-time employee (P)
-            "IT-P-0004": PartTimeEmployee("IT-P-0004", "Liam Thompson", "Data Analyst", "liam.thompson@example.com", "09123456788", "Info. Technology", "Jane Doe", "2022-05-10", "1996-07-30"),
-            
+            ("IT-P-0004", "Liam Thompson", "Data Analyst", "liam.thompson@example.com", "09123456788", "Info. Technology", "Jane Doe", "2022-05-10", "1996-07-30", "P"),
+
             # Contract employees (C)
-            "FIN-C-0005": ContractEmployee("FIN-C-0005", "Mary Merrier", "Financial Analyst", "mary.merrier@example.com", "09123456787", "Finance", "Robert Brown", "2013-06-20", "1988-04-11"),
-            "ENG-C-0010": ContractEmployee("ENG-C-0010", "Lucas Nguyen", "Computer Engineer", "lucas.nguyen@example.com", "09123456786", "Engineering", "Aiden Kim", "2020-02-01", "1992-03-25"),
-            
+            ("FIN-C-0005", "Mary Merrier", "Financial Analyst", "mary.merrier@example.com", "09123456787", "Finance", "Robert Brown", "2013-06-20", "1988-04-11", "C"),
+            ("ENG-C-0010", "Lucas Nguyen", "Computer Engineer", "lucas.nguyen@example.com", "09123456786", "Engineering", "Aiden Kim", "2020-02-01", "1992-03-25", "C"),
+
             # More full-time employees
-            "FIN-F-0006": FullTimeEmployee("FIN-F-0006", "Sofia Martinez", "Assistant Financial Analyst", "sofia.martinez@example.com", "09123456787", "Finance", "Robert Brown", "2019-06-20", "1994-11-15"),
-            "MKT-F-0007": FullTimeEmployee("MKT-F-0007", "James Delaware", "Executive Marketing Manager", "james.delaware@example.com", "09123456786", "Marketing", "Emily Davis", "2014-09-21", "1991-01-10"),
-            "ENG-F-0009": FullTimeEmployee("ENG-F-0009", "Ethan Garcia", "Software Engineer", "ethan.garcia@example.com", "09123456786", "Engineering", "Aiden Kim", "2018-09-01", "1984-01-10"),
-            
+            ("FIN-F-0006", "Sofia Martinez", "Assistant Financial Analyst", "sofia.martinez@example.com", "09123456787", "Finance", "Robert Brown", "2019-06-20", "1994-11-15", "F"),
+            ("MKT-F-0007", "James Delaware", "Executive Marketing Manager", "james.delaware@example.com", "09123456786", "Marketing", "Emily Davis", "2014-09-21", "1991-01-10", "F"),
+            ("ENG-F-0009", "Ethan Garcia", "Software Engineer", "ethan.garcia@example.com", "09123456786", "Engineering", "Aiden Kim", "2018-09-01", "1984-01-10", "F"),
+
             # Intern employee (I)
-            "MKT-I-0008": InternEmployee("MKT-I-0008", "Noah Patel", "Intern", "noah.patel@example.com", "09123456786", "Marketing", "Emily Davis", "2022-09-01", "1999-01-10"),
-        }
-        
-        self.__employees = predefined_employees
-        
-        # Save predefined employees to database
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                for emp_id, employee in predefined_employees.items():
-                    # Validate employee ID format and type
-                    parts = emp_id.split('-')
-                    if len(parts) != 3:
-                        print(f"Invalid employee ID format for {emp_id}")
-                        continue
-                        
-                    emp_type = parts[1]
-                    if emp_type not in ['F', 'P', 'C', 'I']:
-                        print(f"Invalid employee type {emp_type} for {emp_id}")
-                        continue
+            ("MKT-I-0008", "Noah Patel", "Intern", "noah.patel@example.com", "09123456786", "Marketing", "Emily Davis", "2022-09-01", "1999-01-10", "I"),
+        )
 
-                    try:
-                        # Check if employee already exists
-                        cursor.execute('SELECT emp_id FROM employees WHERE emp_id = ?', (emp_id,))
-                        if cursor.fetchone() is None:
-                            # Format dates consistently
-                            hire_date = datetime.strptime(employee.get_hire_date(), '%Y-%m-%d').strftime('%Y-%m-%d')
-                            birth_date = datetime.strptime(employee.get_birth_date(), '%Y-%m-%d').strftime('%Y-%m-%d')
-                            
-                            # Insert only if employee doesn't exist
-                            cursor.execute('''
-                                INSERT INTO employees (emp_id, name, job_title, email, phone, department, 
-                                                    manager, hire_date, birth_date, employee_type)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            ''', (
-                                employee.get_emp_id(),
-                                employee.get_name(),
-                                employee.get_job_title(),
-                                employee.get_email(),
-                                employee.get_phone(),
-                                employee.get_department(),
-                                employee.get_manager(),
-                                hire_date,
-                                birth_date,
-                                emp_type
-                            ))
-                            print(f"Successfully added employee {emp_id}")
-                    except sqlite3.IntegrityError as e:
-                        print(f"Database integrity error for {emp_id}: {e}")
-                    except ValueError as e:
-                        print(f"Date format error for {emp_id}: {e}")
-                    except sqlite3.Error as e:
-                        print(f"Error inserting employee {emp_id}: {e}")
-                conn.commit()
+        # One statement for all of them; employees that are already stored are left as they are
+        try:
+            with get_db(self.db_path) as conn:
+                inserted = conn.executemany(EMPLOYEE_INSERT_SQL.replace("INSERT INTO", "INSERT OR IGNORE INTO"),
+                                            predefined_employees).rowcount
+            # New employees are numbered after the predefined ones
+            if inserted:
+                self.__employee_ids.advance_past(max(int(row[0].rsplit("-", 1)[1]) for row in predefined_employees))
         except sqlite3.Error as e:
             print(f"Database connection error: {e}")
             return
-        # Predefined payslip details for each employee
-        self.__payslips = {
+
+        # Predefined payslip details for each employee, in pesos
+        predefined_payslips = {
             "HR-F-0001": {
                 "total_hours_worked": 254,
                 "over_hours": 10,
@@ -990,157 +2604,469 @@ class PayrollSystem:
             }
         }
 
+        # Save the predefined payslips (current pay period) for employees that have none yet,
+        # so that the payroll report, which reads the database, includes them
+        try:
+            with get_db(self.db_path) as conn:
+                pay_period = datetime.now().strftime('%Y-%m')
+                creation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                # One query finds the employees that already have payslips
+                paid = {emp_id for (emp_id,) in conn.execute(
+                    f"SELECT DISTINCT emp_id FROM payslips WHERE emp_id IN ({', '.join('?' * len(predefined_payslips))})",
+                    tuple(predefined_payslips))}
+                rows = [payslip_row(emp_id, pay_period, payslip_to_centavos(payslip), creation_date)
+                        for emp_id, payslip in predefined_payslips.items() if emp_id not in paid]
+                conn.executemany(PAYSLIP_INSERT_SQL, rows)
+            self.audit_ledger.append(ISSUED, rows)
+        except sqlite3.Error as e:
+            print(f"Error saving predefined payslips: {e}")
+
     def view_payslip(self):
-        emp_id = input("\t\t\t\tEnter Employee ID to view payslip: ")
-        if emp_id in self.__payslips:
-            payslip = self.__payslips[emp_id]
-            emp = self.__employees[emp_id]
-            
-            # First check in-memory payslips (preserving existing functionality)
-            payslip = self.__payslips.get(emp_id)
-        
-            # Then check database
-            try:
-                from database import get_db
-                db = get_db()
-                cursor = db.cursor()
-            
-                # Get the latest payslip from database
-                cursor.execute("""
-                    SELECT * FROM payslips 
-                    WHERE emp_id = ? 
-                    ORDER BY creation_date DESC 
-                    LIMIT 1
-                """, (emp_id,))
-                db_payslip = cursor.fetchone()
-            
-                if payslip or db_payslip:
-                    # If employee exists, display their information
-                    if emp_id in self.__employees:
-                        emp = self.__employees[emp_id]
-                    
-                        print_centered("=" * 130)
-                        print_centered("Payslip", Colors.BLUE)
-                        print_centered("=" * 130)
-                        print(f"\t\t\t\t\t\tEmployee ID: {emp.get_emp_id()}")
-                        print(f"\t\t\t\t\t\tName: {emp.get_name()}")
-                        print(f"\t\t\t\t\t\tJob Title: {emp.get_job_title()}")
-                        print(f"\t\t\t\t\t\tPhone Number: {emp.get_phone()}")
-                        print(f"\t\t\t\t\t\tDepartment: {emp.get_department()}")
-                        print_centered("-" * 130)
-                        
-
-                        # Display payslip details - prioritize in-memory if available
-                        if payslip:
-                            # Display the stored payslip details
-                            print_centered("Earnings:", Colors.GREEN)
-                            print_centered(f"  Total Hours Worked:         {payslip['total_hours_worked']}")
-                            print_centered(f"  Overtime Hours:             {payslip['over_hours']}")
-                            print_centered(f"  Basic Salary:               ₱{payslip['basic_salary']:.2f}")
-                            print_centered(f"  Incentives:                 ₱{payslip['incentives']:.2f}")
-                            print_centered(f"  Bonus:                      ₱{payslip['bonus']:.2f}")
-                            print_centered(f"  Overtime Pay:               ₱{payslip['overtime_pay']:.2f}")
-                            print_centered(f"  TOTAL EARNINGS:             ₱{payslip['total_earnings']:.2f}")
-
-                            print_centered("Deductions:", Colors.GREEN)
-                            print_centered(f"  Salary in Advance:          ₱{payslip['salary_advance']:.2f}")
-                            print_centered(f"  SSS Contribution:           ₱{payslip['sss_employee_contribution']:.2f}")
-                            print_centered(f"  PhilHealth Contribution:    ₱{payslip['philhealth_employee_contribution']:.2f}")
-                            print_centered(f"  Pag-ibig Contribution:      ₱{payslip['pagibig_employee_contribution']:.2f}")
-                            print_centered(f"  TOTAL DEDUCTIONS:           ₱{payslip['total_deductions']:.2f}")
-
-                            # Final Net Pay
-                            print_centered(f"  Net Pay:                    ₱{payslip['net_pay']:.2f}")
-                        else:
-                            # Display database payslip details
-                            print_centered("Earnings:", Colors.GREEN)
-                            print_centered(f"  Total Hours Worked:         {db_payslip['total_hours']}")
-                            print_centered(f"  Overtime Hours:             {db_payslip['overtime_hours']}")
-                            print_centered(f"  Basic Salary:               ₱{db_payslip['basic_salary']:.2f}")
-                            print_centered(f"  Incentives:                 ₱{db_payslip['incentives']:.2f}")
-                            print_centered(f"  Bonus:                      ₱{db_payslip['bonus']:.2f}")
-                            print_centered(f"  Overtime Pay:               ₱{db_payslip['overtime_pay']:.2f}")
-                            print_centered(f"  TOTAL EARNINGS:             ₱{db_payslip['total_earnings']:.2f}")
-
-                            print_centered("Deductions:", Colors.GREEN)
-                            print_centered(f"  Salary in Advance:          ₱{db_payslip['salary_advance']:.2f}")
-                            print_centered(f"  SSS Contribution:           ₱{db_payslip['sss_contribution']:.2f}")
-                            print_centered(f"  PhilHealth Contribution:    ₱{db_payslip['philhealth_contribution']:.2f}")
-                            print_centered(f"  Pag-ibig Contribution:      ₱{db_payslip['pagibig_contribution']:.2f}")
-                            print_centered(f"  TOTAL DEDUCTIONS:           ₱{db_payslip['total_deductions']:.2f}")
-
-                            # Final Net Pay
-                            print_centered(f"  Net Pay:                    ₱{db_payslip['net_pay']:.2f}")
-                    else:
-                        print_centered("Employee not found.", Colors.RED)
-                else:
-                    print_centered("No payslip found for this Employee ID.", Colors.RED)        
+        emp_id = input("\t\t\t\tEnter Employee ID to view payslip: ").strip().upper()
+        try:
+            self.display_payslip(emp_id)
+        except sqlite3.Error as e:
+            print_centered(f"Error retrieving payslip: {str(e)}", Colors.RED)
+
+    def record_payslip(self, emp_id, pay_period, payslip, creation_date):
+        """Apply a payslip that was just written to the database to the history and the running totals"""
+        emp = self.__employees[emp_id]
+        key = (emp.get_department(), type(emp).TYPE_CODE)
+        replaced = self.__history.add(emp_id, pay_period, payslip, creation_date)
+        if replaced is not None:
+            self.__aggregates.subtract(pay_period, *key, replaced)
+        self.__aggregates.add(pay_period, *key, payslip)
+
+    def get_payslip_history(self, emp_id, count=None, first_period=None, last_period=None, as_of=None):
+        """
+        Payslips of one employee, oldest first: the last count payslips, the ones between
+        first_period and last_period (yyyy-mm), or the single payslip in force as_of a date
+        """
+        if as_of:
+            payslip = self.__history.as_of(emp_id, as_of)
+            return [payslip] if payslip else []
+        if first_period or last_period:
+            return self.__history.between(emp_id, first_period or "0000-00", last_period or "9999-99")
+        return self.__history.last(emp_id, count or 12)
+
+    def view_payslip_history(self):
+        emp_id = input("\t\t\t\tEnter Employee ID to view payslip history: ").strip().upper()
+        if emp_id not in self.__employees:
+            print_centered("Employee not found.", Colors.RED)
+            return
+        first_period = input("\t\t\t\tFrom Pay Period (yyyy-mm, leave blank for the last 12 payslips): ").strip()
+        last_period = input("\t\t\t\tTo Pay Period (yyyy-mm, leave blank for the latest): ").strip() if first_period else ""
+        for period in (first_period, last_period):
+            if period and not is_pay_period(period):
+                print_centered("Invalid pay period format. Please use yyyy-mm format.", Colors.RED)
+                return
+
+        history = self.get_payslip_history(emp_id, first_period=first_period, last_period=last_period)
+        if not history:
+            print_centered("No payslips found for this Employee ID.", Colors.RED)
+            return
+
+        with buffered_output():
+            print_centered("=" * 130)
+            print_centered(f"Payslip History - {self.__employees[emp_id].get_name()} ({emp_id})", Colors.BLUE)
+            print_centered("=" * 130)
+            print_centered(f"{'Pay Period':<12} {'Hours':<10} {'Overtime':<10} {'Total Earnings':<18} {'Total Deductions':<18} {'Net Pay':<15}", Colors.YELLOW)
+            for payslip in history:
+                print_centered(f"{payslip['pay_period']:<12} {payslip['total_hours_worked']:<10} {payslip['over_hours']:<10} "
+                               f"₱{format_money(payslip['total_earnings']):<17} ₱{format_money(payslip['total_deductions']):<17} ₱{format_money(payslip['net_pay']):<14}")
+            print_centered("-" * 130)
+            totals = self.__history.totals(emp_id, history[0]["pay_period"], history[-1]["pay_period"])
+            print_centered(f"{'Total':<12} {totals['total_hours_worked']:<10} {totals['over_hours']:<10} "
+                           f"₱{format_money(totals['total_earnings']):<17} ₱{format_money(totals['total_deductions']):<17} ₱{format_money(totals['net_pay']):<14}", Colors.GREEN)
+            print_centered("=" * 130)
+
+    # One line of the payroll report per payslip of a pay period
+    PAYROLL_LINES_SQL = '''
+        SELECT COALESCE(e.name, p.emp_id), COALESCE(e.department, ''), p.total_hours, p.overtime_hours,
+               p.total_earnings, p.withholding_tax, p.total_deductions, p.net_pay
+        FROM payslips p LEFT JOIN employees e ON e.emp_id = p.emp_id
+        WHERE p.pay_period = ?
+        ORDER BY p.emp_id
+    '''
 
-            except Exception as e:
-                print_centered(f"Error retrieving payslip: {str(e)}", Colors.RED)
-                if payslip:
-                # If database fails but in-memory exists, still show in-memory payslip
-                    self.display_payslip(emp_id)
-                
     def view_payroll(self):
-        if not self.__payslips:
-            print_centered("No payslips available.", Colors.RED)
+        self.flush_payslips()
+        conn = get_db(self.db_path)
+
+        with buffered_output():
+            echo("=" * 199)
+            print_centered("Payroll Report", Colors.BLUE)
+            echo("=" * 199)
+        pay_period = input("\t\t\t\tEnter Pay Period (yyyy-mm, leave blank for current month): ").strip()
+        if not pay_period:
+            pay_period = datetime.now().strftime('%Y-%m')
+        elif not is_pay_period(pay_period):
+            print_centered("Invalid pay period format. Please use yyyy-mm format.", Colors.RED)
             return
 
-        print("=" * 199)
-        print_centered("Payroll Report", Colors.BLUE)
-        print("=" * 199)
-        payroll_date = input("\t\t\t\tEnter Payroll Date (YYYY-MM-DD): ")
-        print(payroll_date)
-        print("-" * 199)
-
-        # Initialize totals
-        total_basic_salary = 0
-        total_incentives = 0
-        total_bonus = 0
-        total_overtime_pay = 0
-        total_earnings = 0
-        total_sss = 0
-        total_philhealth = 0
-        total_pagibig = 0
-        total_salary_advance = 0
-        total_deductions = 0
-        total_net_pay = 0
-        total_hours_worked = 0
-        total_overtime_hours = 0
-
-        # Print header for the report
-        print_centered(f"{'Name':<20} {'Department':<20} {'Total Hours Worked':<20} {'Overtime Hours':<15} {'Total Earnings':<20} {'Total Deductions':<20} {'Net Pay':<25}", Colors.YELLOW)
-        print()
+        # Other processes may have issued payslips since startup, so the totals of the period are
+        # read again from payroll_summary; one read transaction keeps them in step with the lines
+        conn.execute("BEGIN")
+        try:
+            self.__aggregates.load_period(conn, pay_period)
+            totals = self.__aggregates.totals(pay_period)
+            if not totals["count"]:
+                print_centered(f"No payslips available for {pay_period}.", Colors.RED)
+                return
 
-        # Iterate through payslips
-        for emp_id, payslip in self.__payslips.items():
-            emp = self.__employees[emp_id]
-        
-            #Print employee details
-            print_centered(f"{emp.get_name():<20} {emp.get_department():<20} {payslip['total_hours_worked']:<20} {payslip['over_hours']:<15} ₱{payslip['total_earnings']:<20.2f} ₱{payslip['total_deductions']:<20.2f} ₱{payslip['net_pay']:<15.2f}")
-
-            # Accumulate totals
-            total_basic_salary += payslip['basic_salary']
-            total_incentives += payslip['incentives']
-            total_bonus += payslip['bonus']
-            total_overtime_pay += payslip.get('overtime_pay', 0)
-            total_earnings += payslip['total_earnings']
-            total_salary_advance += payslip['salary_advance']
-            total_sss += payslip['sss_employee_contribution']
-            total_philhealth += payslip['philhealth_employee_contribution']
-            total_pagibig += payslip['pagibig_employee_contribution']
-            total_deductions += payslip['total_deductions']
-            total_net_pay += payslip['net_pay']
-            total_hours_worked += payslip['total_hours_worked']
-            total_overtime_hours += payslip['over_hours']
-
-        # Print totals
-        print("=" * 199)
-        print_centered(f"{'Total':<20} {'':<20} {total_hours_worked:<20} {total_overtime_hours:<15} ₱{total_earnings:<20.2f} ₱{total_deductions:<20.2f} ₱{total_net_pay:<15.2f}", Colors.YELLOW)
-        print("=" * 199)
+            # The whole report is rendered into one buffer and written at once
+            with buffered_output():
+                echo(pay_period)
+                echo("-" * 199)
+
+                # Print header for the report
+                print_centered(f"{'Name':<20} {'Department':<20} {'Total Hours Worked':<20} {'Overtime Hours':<15} {'Total Earnings':<20} {'Withholding Tax':<20} {'Total Deductions':<20} {'Net Pay':<25}", Colors.YELLOW)
+                echo()
+
+                # Stream one line per payslip straight from the cursor
+                cursor = conn.execute(self.PAYROLL_LINES_SQL, (pay_period,))
+                for name, department, hours, over_hours, earnings, tax, deductions, net_pay in cursor:
+                    print_centered(f"{name:<20} {department:<20} {hours:<20} {over_hours:<15} ₱{format_money(earnings):<20} ₱{format_money(tax):<20} ₱{format_money(deductions):<20} ₱{format_money(net_pay):<15}")
+
+                # Subtotals and totals come from payroll_summary: O(departments), not O(payslips)
+                for title, by in (("Department", "department"), ("Employee Type", "employee_type")):
+                    echo("-" * 199)
+                    print_centered(f"Subtotals by {title}", Colors.GREEN)
+                    for group, sums in self.__aggregates.totals(pay_period, by).items():
+                        label = f"{EMPLOYEE_TYPE_NAMES.get(group, group)} ({sums['count']:.0f})"
+                        print_centered(f"{label:<41} {sums['total_hours_worked']:<20} {sums['over_hours']:<15} ₱{format_money(sums['total_earnings']):<20} ₱{format_money(sums['withholding_tax']):<20} ₱{format_money(sums['total_deductions']):<20} ₱{format_money(sums['net_pay']):<15}")
+
+                # Print totals
+                count = f"({totals['count']:.0f})"
+                echo("=" * 199)
+                print_centered(f"{'Total':<20} {count:<20} {totals['total_hours_worked']:<20} {totals['over_hours']:<15} ₱{format_money(totals['total_earnings']):<20} ₱{format_money(totals['withholding_tax']):<20} ₱{format_money(totals['total_deductions']):<20} ₱{format_money(totals['net_pay']):<15}", Colors.YELLOW)
+                echo("=" * 199)
+        finally:
+            conn.commit()
+
+def query_plan_checks():
+    """
+    The lookups PayrollSystem runs, as (name, sql, params) for check_query_plans, built from the
+    same SQL strings: employee and payslip lookups, the payroll report, and the employee listing
+    in every sort order and direction, first and following pages
+    """
+    checks = [
+        ("employee by ID", EMPLOYEE_BY_ID_SQL, ("HR-F-0001",)),
+        ("latest payslip of an employee", LATEST_PAYSLIP_SQL, ("HR-F-0001",)),
+        ("payslip of an employee for a pay period", PERIOD_PAYSLIP_SQL, ("HR-F-0001", "2024-01")),
+        ("payslip history of employees", payslip_series_sql(2), ("HR-F-0001", "HR-F-0002")),
+        ("payroll report of a pay period", PayrollSystem.PAYROLL_LINES_SQL, ("2024-01",)),
+        ("payroll totals of a pay period", PayrollAggregates.PERIOD_SQL, ("2024-01",)),
+    ]
+    listings = [(f"employees by {sort_by}{' descending' if descending else ''}",
+                 PayrollSystem.employee_page_queries(sort_by, descending), ())
+                for sort_by in PayrollSystem.EMPLOYEE_SORT_KEYS for descending in (False, True)]
+    listings.append(("employees of a department",
+                     PayrollSystem.employee_page_queries(conditions=(dict(PayrollSystem.EMPLOYEE_FILTERS)["department"],)),
+                     ("Finance",)))
+    for name, queries, params in listings:
+        for run, (seek_columns, first, following) in enumerate(queries, start=1):
+            label = f"{name} (run {run})" if len(queries) > 1 else name
+            checks.append((f"{label}, first page", first, (*params, 50)))
+            checks.append((f"{label}, next page", following, (*params, *("",) * len(seek_columns), 50)))
+    return checks
+
+# Time-to-first-menu allowed by benchmark_startup, in seconds
+STARTUP_BUDGET = 0.5
+
+def benchmark_startup(employees=100_000, budget=STARTUP_BUDGET, payslips_per_employee=2):
+    """
+    Time from PayrollSystem() to the first menu on the screen, with a database holding the
+    given number of employees (and payslips for each) in a temporary directory.
+    Returns (seconds, within budget).
+    """
+    import shutil
+    import tempfile
+    from contextlib import redirect_stdout
+
+    directory = tempfile.mkdtemp(prefix="paysphere-startup-")
+    previous_directory = os.getcwd()
+    os.chdir(directory)
+    try:
+        # Fill the database directly; the triggers keep payroll_summary up to date
+        init_db()
+        conn = get_db()
+        departments = tuple(DEPARTMENT_NAME_CODES.items())
+        rows = []
+        for number in range(1, employees + 1):
+            department, code = departments[number % len(departments)]
+            type_code = EMPLOYEE_TYPES[number % len(EMPLOYEE_TYPES)].TYPE_CODE
+            rows.append((f"{code}-{type_code}-{number + 10000:06d}", f"Employee {number}", "Analyst",
+                         f"employee{number}@example.com", "0912345678", department.title(), "Bob Smith",
+                         "2020-01-15", "1990-05-10", type_code))
+        payslip = compute_payslip(FullTimeEmployee(*rows[0][:9]), 160, 4)
+        with conn:
+            conn.executemany(EMPLOYEE_INSERT_SQL, rows)
+            conn.executemany(PAYSLIP_INSERT_SQL, [payslip_row(row[0], f"2024-{month:02d}", payslip, "2024-01-01")
+                                                  for row in rows for month in range(1, payslips_per_employee + 1)])
+        close_db()
+
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            PayrollSystem().show_menu()
+        elapsed = time.perf_counter() - start
+    finally:
+        close_db()
+        os.chdir(previous_directory)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    within_budget = elapsed <= budget
+    print(f"Time to first menu with {employees} employees: {elapsed * 1000:.1f} ms "
+          f"(budget {budget * 1000:.0f} ms, {'OK' if within_budget else 'OVER BUDGET'})")
+    return elapsed, within_budget
+
+def benchmark_payslip_rendering(count=100_000, workers=None, fmt="text", seed=7):
+    """
+    Render synthetic payslips to files in a temporary directory, one file per employee and
+    one combined file, on one process and on process pools of increasing size.
+    Returns payslips per second by (mode, pool size).
+    """
+    import random
+    import shutil
+    import tempfile
+    rng = random.Random(seed)
+    max_workers = workers or os.cpu_count() or 1
+    rows = []
+    for number in range(count):
+        cls = EMPLOYEE_TYPES[number % len(EMPLOYEE_TYPES)]
+        department = DEPARTMENT_CODES[number % len(DEPARTMENT_CODES)]
+        emp = cls(f"{department}-{cls.TYPE_CODE}-{number:07d}", f"Employee {number}", "Analyst",
+                  f"employee{number}@example.com", "09123456789", department, "Bob Smith", "2020-01-15",
+                  "1990-05-10")
+        payslip = compute_payslip(emp, round(rng.uniform(80, 260), 1), round(rng.uniform(0, 20), 1))
+        rows.append((emp.get_emp_id(), emp.get_name(), emp.get_job_title(), emp.get_phone(), department, "2024-01",
+                     *(payslip[field] for field in PAYSLIP_FIELDS)))
+
+    results = {}
+    pool_sizes = sorted({size for size in (1, 2, 4, 8, 16, 32, max_workers) if size <= max_workers})
+    directory = tempfile.mkdtemp(prefix="paysphere-payslips-")
+    try:
+        for mode, single_file in (("per file", None), ("single file", "payslips" + PAYSLIP_FORMATS[fmt])):
+            for size in pool_sizes:
+                out_dir = os.path.join(directory, f"{mode.replace(' ', '-')}-{size}")
+                summary = render_payslip_files(rows, out_dir, fmt, single_file, size)
+                results[mode, size] = summary["payslips_per_second"]
+                print(f"{mode:>11}, {size:>2} workers: {summary['elapsed_seconds']:.3f}s "
+                      f"({summary['payslips_per_second']:,.0f} payslips/sec)")
+                shutil.rmtree(out_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PaySphere Pro Payroll Management System")
+    parser.add_argument("--write-behind", action="store_true",
+                        help="queue single payslips and write them in grouped transactions in the background")
+    parser.add_argument("--flat-contributions", action="store_true",
+                        help="use the old flat SSS / PhilHealth / Pag-IBIG rates instead of the bracketed schedules")
+    subparsers = parser.add_subparsers(dest="command")
+
+    bench_salary = subparsers.add_parser("benchmark-salary", help="time the vectorized salary computation")
+    bench_salary.add_argument("--count", type=int, default=1_000_000, help="number of employees")
+
+    bench_payrun = subparsers.add_parser("benchmark-payrun", help="compare serial and process-pool pay runs")
+    bench_payrun.add_argument("--count", type=int, default=1_000_000, help="number of employees")
+    bench_payrun.add_argument("--workers", type=int, help="largest pool size to try (default: CPU count)")
+
+    import_parser = subparsers.add_parser("import", help="bulk import employees from a CSV or JSONL file")
+    import_parser.add_argument("path", help="CSV or JSONL file with one employee per record")
+    import_parser.add_argument("--errors", help="where to write rejected records")
+    import_parser.add_argument("--chunk-size", type=int, default=5000, help="records per transaction")
+
+    bench_memory = subparsers.add_parser("benchmark-memory", help="measure bytes per employee record")
+    bench_memory.add_argument("--counts", type=int, nargs="+", default=[100_000, 1_000_000],
+                              help="numbers of employees to measure")
+
+    bench_render = subparsers.add_parser("benchmark-render", help="compare line-by-line and buffered report output")
+    bench_render.add_argument("--lines", type=int, default=10_000, help="number of report lines")
+
+    subparsers.add_parser("rebuild-summary", help="recompute the payroll_summary table from the payslips")
+    subparsers.add_parser("check-summary", help="compare payroll_summary with a full recompute")
+    subparsers.add_parser("check-schema", help="migrate paysphere.db and check that lookups use indexes")
+    check_write_parser = subparsers.add_parser("check-write-behind",
+                                               help="kill a write-behind writer mid-batch and check what was stored")
+    check_write_parser.add_argument("--rounds", type=int, default=5, help="number of writer processes to kill")
+    check_write_parser.add_argument("--batch-size", type=int, default=2000, help="rows per transaction")
+    check_write_parser.add_argument("--seed", type=int, default=17, help="seed of the kill points")
+    subparsers.add_parser("check-contributions", help="check the contribution tables against published values")
+    subparsers.add_parser("check-withholding-tax", help="check the withholding tax tables against published values")
+    bench_contributions = subparsers.add_parser("benchmark-contributions", help="time contribution bracket lookups")
+    bench_contributions.add_argument("--count", type=int, default=1_000_000, help="number of compensations")
+
+    render_parser = subparsers.add_parser("render-payslips", help="write a pay period's payslips as text or HTML files")
+    render_parser.add_argument("pay_period", help="pay period to render (yyyy-mm)")
+    render_parser.add_argument("--format", choices=("text", "html"), default="text", help="output format")
+    render_parser.add_argument("--out", help="output folder (default: payslips-<pay period>)")
+    render_parser.add_argument("--single-file", help="write every payslip into this one file inside the folder")
+    render_parser.add_argument("--workers", type=int, default=1, help="rendering processes")
+
+    export_parser = subparsers.add_parser("export", help="stream a pay period's payroll to CSV or a columnar file")
+    export_parser.add_argument("pay_period", help="pay period to export (yyyy-mm)")
+    export_parser.add_argument("--format", choices=tuple(EXPORT_FORMATS), default="csv", help="output format")
+    export_parser.add_argument("--out", help="output file (default: payroll-<pay period>.csv / .cols)")
+    export_parser.add_argument("--chunk-size", type=int, default=5000, help="rows read from the database at a time")
+
+    load_export_parser = subparsers.add_parser("load-export", help="load a columnar payroll export and time it")
+    load_export_parser.add_argument("path", help="columnar export file")
+
+    subparsers.add_parser("check-audit", help="verify the hash chain of the payslip audit ledger")
+    audit_record_parser = subparsers.add_parser("audit-record", help="show one record of the payslip audit ledger")
+    audit_record_parser.add_argument("index", type=int, help="record number (negative counts from the end)")
+
+    bench_payslips = subparsers.add_parser("benchmark-payslips", help="time rendering payslips to files")
+    bench_payslips.add_argument("--count", type=int, default=100_000, help="number of payslips")
+    bench_payslips.add_argument("--workers", type=int, help="largest pool size to try (default: CPU count)")
+    bench_payslips.add_argument("--format", choices=("text", "html"), default="text", help="output format")
+
+    bench_startup = subparsers.add_parser("benchmark-startup", help="time to the first menu with many stored employees")
+    bench_startup.add_argument("--employees", type=int, default=100_000, help="number of stored employees")
+    bench_startup.add_argument("--budget", type=float, default=STARTUP_BUDGET, help="allowed time in seconds")
+
+    serve_parser = subparsers.add_parser("serve", help="run the local HTTP/JSON API")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    serve_parser.add_argument("--readers", type=int, default=8, help="threads serving read requests")
+
+    load_parser = subparsers.add_parser("load-test", help="measure API latency (p50/p99) against a running server")
+    load_parser.add_argument("--host", default="127.0.0.1", help="address of the API")
+    load_parser.add_argument("--port", type=int, default=8080, help="port of the API")
+    load_parser.add_argument("--requests", type=int, default=2000, help="number of requests")
+    load_parser.add_argument("--concurrency", type=int, default=16, help="parallel keep-alive connections")
+    load_parser.add_argument("--write-ratio", type=float, default=0.1, help="share of payslip writes")
+    load_parser.add_argument("--pay-period", help="pay period to report on and write to (default: this month)")
+
+    args = parser.parse_args(argv)
+    if args.command == "benchmark-salary":
+        benchmark_vectorized_payroll(args.count)
+        return
+    if args.command == "benchmark-payrun":
+        benchmark_parallel_payroll(args.count, args.workers)
+        return
+    if args.command == "benchmark-startup":
+        sys.exit(0 if benchmark_startup(args.employees, args.budget)[1] else 1)
+    if args.command == "benchmark-memory":
+        benchmark_employee_memory(args.counts)
+        return
+    if args.command == "benchmark-render":
+        benchmark_rendering(args.lines)
+        return
+    if args.command in ("rebuild-summary", "check-summary"):
+        init_db()
+        conn = get_db()
+        if args.command == "rebuild-summary":
+            rebuild_payroll_summary(conn)
+            print("payroll_summary rebuilt")
+            return
+        differences = check_payroll_summary(conn)
+        for pay_period, department, employee_type, column, stored, expected in differences:
+            print(f"{pay_period} {department} / {employee_type}: {column} is {stored}, expected {expected}")
+        print("payroll_summary is consistent" if not differences else f"{len(differences)} differences found")
+        sys.exit(1 if differences else 0)
+    if args.command == "check-schema":
+        applied = init_db()
+        conn = get_db()
+        check_query_plans(conn, query_plan_checks())
+        print(f"Schema version {get_schema_version(conn)} (applied now: {applied or 'none'}); "
+              f"all payroll lookups use index searches")
+        return
+    if args.command == "check-write-behind":
+        from write_behind_check import check_write_behind
+        problems, results = check_write_behind(args.rounds, args.batch_size, args.seed)
+        for result in results:
+            where = (f"with {result['rows_in_flight']} rows of a batch sent to SQLite" if result["rows_in_flight"]
+                     else "between batch transactions")
+            print(f"round {result['round']}: killed {where} after {result['committed']} committed batches; "
+                  f"{result['stored']} complete batches stored, "
+                  f"integrity_check {result['integrity']}")
+        for problem in problems:
+            print(problem)
+        inside = sum(1 for result in results if result["rows_in_flight"])
+        print(f"{inside} of {len(results)} kills inside a batch transaction, "
+              f"{'no partial or missing batches' if not problems else f'{len(problems)} problems'}")
+        sys.exit(1 if problems else 0)
+    if args.command in ("check-contributions", "check-withholding-tax"):
+        import contributions
+        import withholding_tax
+        tables = contributions if args.command == "check-contributions" else withholding_tax
+        mismatches = tables.verify()
+        for mismatch in mismatches:
+            print(mismatch)
+        print(f"{len(tables.PUBLISHED_VALUES)} published values checked, "
+              f"{'all match' if not mismatches else f'{len(mismatches)} mismatches'}")
+        sys.exit(1 if mismatches else 0)
+    if args.command == "benchmark-contributions":
+        import contributions
+        contributions.benchmark(args.count)
+        return
+    if args.command == "benchmark-payslips":
+        benchmark_payslip_rendering(args.count, args.workers, args.format)
+        return
+    if args.command == "export":
+        path = args.out or f"payroll-{args.pay_period}.{'csv' if args.format == 'csv' else 'cols'}"
+        summary = PayrollSystem(flat_contributions=args.flat_contributions).export_payroll(
+            args.pay_period, path, args.format, args.chunk_size)
+        print(f"Exported {summary['rows']} payslips to {summary['path']} in {summary['elapsed_seconds']:.2f}s "
+              f"({summary['rows_per_second']:,.0f} rows/sec)")
+        return
+    if args.command == "load-export":
+        from payroll_export import load_columnar
+        start = time.perf_counter()
+        header, columns = load_columnar(args.path)
+        elapsed = time.perf_counter() - start
+        print(f"Loaded {len(columns['emp_id'])} payslips of {header['pay_period']} ({len(columns)} columns) "
+              f"in {elapsed * 1000:.1f} ms")
+        return
+    if args.command in ("check-audit", "audit-record"):
+        if not os.path.exists(audit_path(DB_PATH)):
+            print(f"No audit ledger at {audit_path(DB_PATH)}")
+            sys.exit(1)
+        ledger = AuditLedger(audit_path(DB_PATH))
+        if args.command == "audit-record":
+            try:
+                print(json.dumps(ledger.record(args.index), indent=2))
+            except IndexError as e:
+                print(f"No such audit record: {e}")
+                sys.exit(1)
+            return
+        start = time.perf_counter()
+        problems = ledger.verify()
+        elapsed = time.perf_counter() - start
+        for problem in problems:
+            print(problem)
+        count, head = ledger.head()
+        print(f"{count} audit records checked in {elapsed * 1000:.1f} ms, "
+              f"{'chain intact' if not problems else f'{len(problems)} problems'}; head {head}")
+        sys.exit(1 if problems else 0)
+    if args.command == "render-payslips":
+        summary = PayrollSystem(flat_contributions=args.flat_contributions).render_payslips(
+            args.pay_period, args.out or f"payslips-{args.pay_period}", args.format, args.single_file, args.workers)
+        print(f"Rendered {summary['rendered']} payslips into {summary['files']} file(s) under {summary['path']} "
+              f"in {summary['elapsed_seconds']:.2f}s ({summary['payslips_per_second']:,.0f} payslips/sec)")
+        return
+    if args.command == "serve":
+        from payroll_api import serve
+        serve(PayrollSystem(args.write_behind, args.flat_contributions), args.host, args.port, args.readers)
+        return
+    if args.command == "load-test":
+        from payroll_api import run_load
+        run_load(args.host, args.port, args.requests, args.concurrency, args.write_ratio, args.pay_period)
+        return
+    if args.command == "import":
+        summary = PayrollSystem(flat_contributions=args.flat_contributions).import_employees(args.path, args.errors, args.chunk_size)
+        print(f"Imported {summary['imported']} employees, rejected {summary['rejected']} "
+              f"in {summary['elapsed_seconds']:.2f}s ({summary['rows_per_second']:,.0f} rows/sec)")
+        if summary["rejected"]:
+            print(f"Rejected records written to {summary['error_path']}")
+        return
+
+    # Without a command the interactive menu starts (this will call __init__ automatically)
+    system = PayrollSystem(args.write_behind, args.flat_contributions)
+    system.menu()
 
 if __name__ == "__main__":
-       # This will call __init__ automatically
-        system = PayrollSystem()  
-        system.menu()  
\ No newline at end of file
+    main()
@@ -0,0 +1,221 @@
+"""
+Append-only audit ledger of payslips, written next to the database (paysphere.audit).
+
+Every payslip issued, and every payslip deleted with its employee, becomes one fixed-size
+record, so record N always starts at HEADER_SIZE + N * RECORD_SIZE:
+
+    header (HEADER_SIZE bytes): magic, format version, record size, then the payslip
+                                columns stored in each record, comma separated
+    record (RECORD_SIZE bytes): sequence number, event, emp_id, pay period, creation date,
+                                time recorded, hours (float64) and money (int64 centavos)
+                                in column order, zero padding, previous hash, hash
+
+Each hash is SHA-256 over the record body and the previous hash (the first record chains
+from the hash of the header), so changing, inserting or removing a record breaks the chain
+at that point. Dropping records from the end is only visible against a head() noted
+elsewhere. Records are read through mmap: a lookup unpacks one record and verify() walks
+the file once without reading it into memory.
+"""
+import os
+import mmap
+import struct
+import hashlib
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+from database import HOUR_COLUMNS
+
+try:
+    import fcntl  # Locks the file against other processes appending at the same time (not on Windows)
+except ImportError:
+    fcntl = None
+
+MAGIC = b"PSAUDIT\x00"
+FORMAT_VERSION = 1
+HEADER_SIZE = 256
+RECORD_SIZE = 256
+HASH_SIZE = 32
+BODY_SIZE = RECORD_SIZE - 2 * HASH_SIZE
+
+ISSUED = 1
+DELETED = 2
+EVENT_NAMES = {ISSUED: "issued", DELETED: "deleted"}
+
+_HEADER = struct.Struct("<8sHH")
+# sequence, event, emp_id, pay_period, creation_date, recorded_at; the amounts follow
+_RECORD_PREFIX = "<QB24s7s19s19s"
+_SEQUENCE = struct.Struct("<Q")
+
+
+def audit_path(db_path):
+    """The ledger file kept next to a database file"""
+    return os.path.splitext(db_path)[0] + ".audit"
+
+
+class AuditLedger:
+    """
+    The ledger file of one database. columns are the payslip amount columns in the order
+    appended rows carry them; an existing ledger keeps the columns of its header, and
+    opening it with different ones is an error.
+    """
+
+    def __init__(self, path, columns=None, sync=False):
+        self.path = path
+        self.sync = sync  # fsync after every append
+        self._lock = threading.Lock()
+        self._map = None
+        self._file = open(path, "a+b")
+        try:
+            with self._locked():
+                self._file.seek(0, os.SEEK_END)
+                if self._file.tell() == 0:
+                    if not columns:
+                        raise ValueError(f"{path}: new ledger needs its payslip columns")
+                    self._file.write(self._header(columns))
+                    self._file.flush()
+                self._file.seek(0)
+                header = self._file.read(HEADER_SIZE)
+        except BaseException:
+            self._file.close()
+            raise
+        magic, version, record_size = _HEADER.unpack_from(header.ljust(HEADER_SIZE, b"\0"))
+        if len(header) < HEADER_SIZE or magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD_SIZE:
+            self._file.close()
+            raise ValueError(f"{path}: not a version {FORMAT_VERSION} payslip audit ledger")
+        self.columns = tuple(header[_HEADER.size:].rstrip(b"\0").decode("ascii").split(","))
+        if columns and tuple(columns) != self.columns:
+            self._file.close()
+            raise ValueError(f"{path}: ledger records columns {', '.join(self.columns)}")
+        self._record = struct.Struct(_RECORD_PREFIX + "".join("d" if column in HOUR_COLUMNS else "q"
+                                                              for column in self.columns))
+        self.genesis = hashlib.sha256(header).digest()
+
+    def _header(self, columns):
+        names = ",".join(columns).encode("ascii")
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, RECORD_SIZE) + names
+        if len(header) > HEADER_SIZE:
+            raise ValueError("too many columns for the ledger header")
+        if struct.calcsize(_RECORD_PREFIX + "q" * len(columns)) > BODY_SIZE:
+            raise ValueError("too many columns for a ledger record")
+        return header.ljust(HEADER_SIZE, b"\0")
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _size(self):
+        return os.fstat(self._file.fileno()).st_size
+
+    def __len__(self):
+        return (self._size() - HEADER_SIZE) // RECORD_SIZE
+
+    def append(self, event, rows):
+        """
+        Append one record per row (emp_id, pay_period, *amounts in column order, creation_date),
+        as written to the payslips table, in a single write. Returns the number of records.
+        """
+        recorded_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S').encode("ascii")
+        with self._locked():
+            size = self._size()
+            count, partial = divmod(size - HEADER_SIZE, RECORD_SIZE)
+            if partial:
+                raise ValueError(f"{self.path}: ends with a partial record, check the ledger")
+            if count:
+                self._file.seek(size - HASH_SIZE)
+                previous = self._file.read(HASH_SIZE)
+            else:
+                previous = self.genesis
+            records = []
+            for emp_id, pay_period, *amounts, creation_date in rows:
+                emp_id = emp_id.encode("utf-8")
+                if len(emp_id) > 24:
+                    raise ValueError(f"{emp_id!r}: employee ID too long for the audit ledger")
+                body = self._record.pack(count + len(records), event, emp_id, pay_period.encode("ascii"),
+                                         creation_date.encode("ascii"), recorded_at, *amounts)
+                body = body.ljust(BODY_SIZE, b"\0")
+                digest = hashlib.sha256(body + previous).digest()
+                records.append(body + previous + digest)
+                previous = digest
+            # The file is opened for appending, so this always lands at the end
+            self._file.write(b"".join(records))
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+        return len(records)
+
+    def _view(self):
+        """The ledger mapped read-only, mapped again once it has grown"""
+        size = self._size()
+        if self._map is None or len(self._map) != size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        return self._map
+
+    def record(self, index):
+        """Record number index (negative counts from the end) as a dictionary"""
+        view = self._view()
+        count = (len(view) - HEADER_SIZE) // RECORD_SIZE
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(f"record {index} of {count}")
+        offset = HEADER_SIZE + index * RECORD_SIZE
+        sequence, event, emp_id, pay_period, creation_date, recorded_at, *amounts = \
+            self._record.unpack_from(view, offset)
+        return {"sequence": sequence, "event": EVENT_NAMES.get(event, event),
+                "emp_id": emp_id.rstrip(b"\0").decode("utf-8"), "pay_period": pay_period.decode("ascii"),
+                "creation_date": creation_date.decode("ascii"), "recorded_at": recorded_at.decode("ascii"),
+                **dict(zip(self.columns, amounts)),
+                "previous_hash": view[offset + BODY_SIZE:offset + BODY_SIZE + HASH_SIZE].hex(),
+                "hash": view[offset + RECORD_SIZE - HASH_SIZE:offset + RECORD_SIZE].hex()}
+
+    __getitem__ = record
+
+    def head(self):
+        """(number of records, hash of the last record); note it elsewhere to detect truncation"""
+        view = self._view()
+        count = (len(view) - HEADER_SIZE) // RECORD_SIZE
+        last = view[HEADER_SIZE + count * RECORD_SIZE - HASH_SIZE:HEADER_SIZE + count * RECORD_SIZE]
+        return count, (last if count else self.genesis).hex()
+
+    def verify(self):
+        """
+        Check every record's sequence number, link and hash in one pass over the mapped file.
+        Returns a list of problem descriptions (empty when the chain is intact).
+        """
+        problems = []
+        view = self._view()
+        count, partial = divmod(len(view) - HEADER_SIZE, RECORD_SIZE)
+        previous = self.genesis
+        previous_sequence = -1
+        for index in range(count):
+            offset = HEADER_SIZE + index * RECORD_SIZE
+            linked = view[offset + BODY_SIZE:offset + BODY_SIZE + HASH_SIZE]
+            stored = view[offset + BODY_SIZE + HASH_SIZE:offset + RECORD_SIZE]
+            (sequence,) = _SEQUENCE.unpack_from(view, offset)
+            if sequence != previous_sequence + 1:
+                problems.append(f"record {index}: sequence number {sequence} after {previous_sequence}")
+            previous_sequence = sequence
+            if linked != previous:
+                problems.append(f"record {index}: does not follow the record before it")
+            if hashlib.sha256(view[offset:offset + BODY_SIZE + HASH_SIZE]).digest() != stored:
+                problems.append(f"record {index}: contents do not match its hash")
+            previous = stored
+        if partial:
+            problems.append(f"{partial} bytes of a partial record at the end")
+        return problems
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
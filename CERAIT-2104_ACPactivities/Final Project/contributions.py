@@ -0,0 +1,219 @@
+"""
+Statutory contributions (employee share) for SSS, PhilHealth and Pag-IBIG.
+
+Each schedule is a list of brackets (lower bound, fixed amount, rate), compiled once into
+parallel lists sorted by lower bound. A contribution is one bisect (or one searchsorted
+for NumPy arrays) followed by integer arithmetic:
+
+    contribution = fixed + compensation * rate / 10000     (rate in basis points)
+
+Every amount is integer centavos of monthly compensation and the division rounds halves
+up. Schedules are versioned by the first pay period (yyyy-mm) they apply to;
+contribution_rules() returns the set in force for a pay period.
+"""
+import time
+from bisect import bisect_right
+from functools import lru_cache
+
+BASIS_POINTS = 10000
+
+
+def _percent(centavos, rate):
+    return (centavos * rate + BASIS_POINTS // 2) // BASIS_POINTS
+
+
+def salary_credit_brackets(min_credit, max_credit, step, rate):
+    """
+    SSS brackets: compensation is rounded to a monthly salary credit (MSC) in steps, from
+    min_credit to max_credit, and the contribution is rate of the credit. Each credit
+    covers compensation from half a step below it, e.g. 5,250.00-5,749.99 for 5,500.
+    """
+    brackets = [(0, _percent(min_credit, rate), 0)]
+    for credit in range(min_credit + step, max_credit + 1, step):
+        brackets.append((credit - step // 2, _percent(credit, rate), 0))
+    return brackets
+
+
+def premium_brackets(rate, floor, ceiling):
+    """PhilHealth brackets: rate of the compensation, which counts as at least floor and at most ceiling"""
+    return [(0, _percent(floor, rate), 0), (floor, 0, rate), (ceiling, _percent(ceiling, rate), 0)]
+
+
+def fund_brackets(low_rate, high_rate, threshold, max_compensation):
+    """
+    Pag-IBIG brackets: low_rate of compensation up to threshold, high_rate above it,
+    on at most max_compensation
+    """
+    return [(0, 0, low_rate), (threshold + 1, 0, high_rate),
+            (max_compensation, _percent(max_compensation, high_rate), 0)]
+
+
+# Published schedules, oldest first: (first pay period, brackets)
+SCHEDULES = {
+    "sss": (
+        # SSS Circular 2022-033: 14% of the MSC, employee 4.5%, MSC 4,000-30,000
+        ("2023-01", salary_credit_brackets(400000, 3000000, 50000, 450)),
+        # SSS Circular 2024-006: 15% of the MSC, employee 5%, MSC 5,000-35,000
+        ("2025-01", salary_credit_brackets(500000, 3500000, 50000, 500)),
+    ),
+    "philhealth": (
+        # 4% premium shared equally, income floor 10,000 and ceiling 80,000
+        ("2023-01", premium_brackets(200, 1000000, 8000000)),
+        # 5% premium shared equally, income floor 10,000 and ceiling 100,000
+        ("2024-01", premium_brackets(250, 1000000, 10000000)),
+    ),
+    "pagibig": (
+        # 1% up to 1,500, 2% above, on at most 5,000 (at most 100)
+        ("2023-01", fund_brackets(100, 200, 150000, 500000)),
+        # HDMF Circular 460: maximum fund salary raised to 10,000 (at most 200)
+        ("2024-02", fund_brackets(100, 200, 150000, 1000000)),
+    ),
+}
+CONTRIBUTION_NAMES = {"sss": "SSS", "philhealth": "PhilHealth", "pagibig": "Pag-IBIG"}
+
+
+class BracketTable:
+    """One compiled schedule; call it with a compensation in centavos"""
+    __slots__ = ("lower", "fixed", "rate", "_arrays")
+
+    def __init__(self, brackets):
+        brackets = sorted(brackets)
+        if not brackets or brackets[0][0] != 0:
+            raise ValueError("the first bracket must start at 0")
+        self.lower = [bracket[0] for bracket in brackets]
+        self.fixed = [bracket[1] for bracket in brackets]
+        self.rate = [bracket[2] for bracket in brackets]
+        self._arrays = None
+
+    def __call__(self, compensation):
+        # lo=1 keeps amounts below the first bound (i.e. negative ones) in the first bracket
+        position = bisect_right(self.lower, compensation, 1) - 1
+        return self.fixed[position] + (compensation * self.rate[position] + BASIS_POINTS // 2) // BASIS_POINTS
+
+    def apply_array(self, compensation):
+        """The same lookup for a NumPy array of compensations; returns int64 centavos"""
+        import numpy as np
+        if self._arrays is None:
+            self._arrays = tuple(np.array(values, dtype=np.int64) for values in (self.lower, self.fixed, self.rate))
+        lower, fixed, rate = self._arrays
+        compensation = np.asarray(compensation, dtype=np.int64)
+        position = np.maximum(np.searchsorted(lower, compensation, side="right") - 1, 0)
+        return fixed[position] + (compensation * rate[position] + BASIS_POINTS // 2) // BASIS_POINTS
+
+
+class ContributionRules:
+    """The SSS, PhilHealth and Pag-IBIG tables used together for one payslip"""
+    __slots__ = ("name", "sss", "philhealth", "pagibig")
+
+    def __init__(self, name, sss, philhealth, pagibig):
+        self.name = name
+        self.sss = BracketTable(sss)
+        self.philhealth = BracketTable(philhealth)
+        self.pagibig = BracketTable(pagibig)
+
+    def __call__(self, compensation):
+        """(sss, philhealth, pagibig) employee contributions for a monthly compensation in centavos"""
+        return self.sss(compensation), self.philhealth(compensation), self.pagibig(compensation)
+
+    def apply_array(self, compensation):
+        return (self.sss.apply_array(compensation), self.philhealth.apply_array(compensation),
+                self.pagibig.apply_array(compensation))
+
+    def __repr__(self):
+        return f"ContributionRules({self.name!r})"
+
+
+# The flat rates used before the schedules: 4.5%, 2.25% and 2% of the compensation
+LEGACY_FLAT_RATES = ContributionRules("flat rates", [(0, 0, 450)], [(0, 0, 225)], [(0, 0, 200)])
+
+
+@lru_cache(maxsize=None)
+def _rules_for(pay_period):
+    tables = {}
+    versions = []
+    for contribution, schedule in SCHEDULES.items():
+        # The latest version starting on or before the pay period (the oldest one for earlier periods)
+        position = max(bisect_right([start for start, _ in schedule], pay_period) - 1, 0)
+        start, tables[contribution] = schedule[position]
+        versions.append(f"{CONTRIBUTION_NAMES[contribution]} {start}")
+    return ContributionRules(", ".join(versions), **tables)
+
+
+def contribution_rules(pay_period=None):
+    """The schedules in force for a pay period (yyyy-mm, default: this month), compiled once per version"""
+    return _rules_for(pay_period or time.strftime("%Y-%m"))
+
+
+# Employee shares taken from the published tables: (pay period, compensation, sss, philhealth, pagibig)
+PUBLISHED_VALUES = (
+    ("2025-01", 400000, 25000, 25000, 8000),
+    ("2025-01", 524999, 25000, 25000, 10500),
+    ("2025-01", 525000, 27500, 25000, 10500),
+    ("2025-01", 1000000, 50000, 25000, 20000),
+    ("2025-01", 2025000, 102500, 50625, 20000),
+    ("2025-01", 3474999, 172500, 86875, 20000),
+    ("2025-01", 3475000, 175000, 86875, 20000),
+    ("2025-01", 10000000, 175000, 250000, 20000),
+    ("2025-01", 15000000, 175000, 250000, 20000),
+    ("2025-06", 150000, 25000, 25000, 1500),
+    ("2025-06", 150001, 25000, 25000, 3000),
+    ("2024-01", 300000, 18000, 25000, 6000),
+    ("2024-01", 425000, 20250, 25000, 8500),
+    ("2024-01", 1650000, 74250, 41250, 10000),
+    ("2024-01", 2975000, 135000, 74375, 10000),
+    ("2024-02", 2000000, 90000, 50000, 20000),
+    ("2023-06", 5000000, 135000, 100000, 10000),
+    ("2023-06", 9000000, 135000, 160000, 10000),
+)
+
+
+def verify():
+    """
+    Check the scalar and the NumPy lookups against PUBLISHED_VALUES and each other.
+    Returns a list of mismatch descriptions (empty when everything agrees).
+    """
+    mismatches = []
+    for pay_period, compensation, *expected in PUBLISHED_VALUES:
+        actual = contribution_rules(pay_period)(compensation)
+        if list(actual) != expected:
+            mismatches.append(f"{pay_period} {compensation}: {actual}, published {tuple(expected)}")
+    try:
+        import numpy as np
+    except ImportError:
+        return mismatches
+    compensation = np.arange(-100, 12000000, 997, dtype=np.int64)
+    for pay_period in sorted({start for schedule in SCHEDULES.values() for start, _ in schedule}):
+        rules = contribution_rules(pay_period)
+        for name, table in (("sss", rules.sss), ("philhealth", rules.philhealth), ("pagibig", rules.pagibig)):
+            vectorized = table.apply_array(compensation)
+            scalar = np.fromiter((table(int(value)) for value in compensation), dtype=np.int64,
+                                 count=len(compensation))
+            if not np.array_equal(vectorized, scalar):
+                mismatches.append(f"{pay_period} {name}: scalar and vectorized lookups differ")
+    return mismatches
+
+
+def benchmark(count=1_000_000, seed=7):
+    """Time scalar and vectorized lookups of all three contributions; returns lookups per second"""
+    import random
+    rules = contribution_rules()
+    rng = random.Random(seed)
+    compensation = [rng.randrange(0, 15000000) for _ in range(count)]
+
+    start = time.perf_counter()
+    for value in compensation:
+        rules(value)
+    scalar = 3 * count / (time.perf_counter() - start)
+    print(f"scalar:     {scalar:,.0f} lookups/sec ({rules.name})")
+
+    results = {"scalar": scalar}
+    try:
+        import numpy as np
+    except ImportError:
+        return results
+    array = np.array(compensation, dtype=np.int64)
+    start = time.perf_counter()
+    rules.apply_array(array)
+    results["vectorized"] = 3 * count / (time.perf_counter() - start)
+    print(f"vectorized: {results['vectorized']:,.0f} lookups/sec")
+    return results
@@ -0,0 +1,679 @@
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+
+DB_PATH = 'paysphere.db'
+
+# Payslip columns summed into payroll_summary, as created by schema version 5 ...
+_SUMMARY_COLUMNS_V5 = ("total_hours", "overtime_hours", "basic_salary", "incentives", "bonus", "overtime_pay",
+                       "total_earnings", "salary_advance", "sss_contribution", "philhealth_contribution",
+                       "pagibig_contribution", "total_deductions", "net_pay")
+# ... and from version 8, which added the withholding tax
+SUMMARY_COLUMNS = _SUMMARY_COLUMNS_V5 + ("withholding_tax",)
+
+# Payslip columns holding hours; every other amount is money in integer centavos (from schema version 7)
+HOUR_COLUMNS = ("total_hours", "overtime_hours")
+_MONEY_COLUMNS_V5 = tuple(column for column in _SUMMARY_COLUMNS_V5 if column not in HOUR_COLUMNS)
+
+# Department / type a payslip is summarised under; payslips without an employee row go to 'Unknown'
+_SUMMARY_DEPARTMENT = "COALESCE((SELECT department FROM employees WHERE emp_id = {row}.emp_id), 'Unknown')"
+_SUMMARY_TYPE = "COALESCE((SELECT employee_type FROM employees WHERE emp_id = {row}.emp_id), 'Unknown')"
+
+
+def _summary_upsert(select, columns):
+    """INSERT ... SELECT into payroll_summary that adds onto an existing row instead of failing"""
+    additions = ", ".join(f"{column} = {column} + excluded.{column}" for column in columns)
+    return (f"INSERT INTO payroll_summary (pay_period, department, employee_type, payslip_count, "
+            f"{', '.join(columns)}) "
+            f"{select} "
+            f"ON CONFLICT (pay_period, department, employee_type) DO UPDATE SET "
+            f"payslip_count = payslip_count + excluded.payslip_count, {additions}")
+
+
+def _summary_payslip_delta(row, sign, columns):
+    """Add (sign '+') or remove (sign '-') a single payslip row (NEW or OLD) from the summary"""
+    values = ", ".join(f"{sign}{row}.{column}" for column in columns)
+    return _summary_upsert(f"SELECT {row}.pay_period, {_SUMMARY_DEPARTMENT.format(row=row)}, "
+                           f"{_SUMMARY_TYPE.format(row=row)}, {sign}1, {values} WHERE true", columns)
+
+
+def _summary_employee_delta(row, department, employee_type, sign, columns):
+    """Add or remove all payslips of one employee, per pay period, under the given department/type"""
+    sums = ", ".join(f"{sign}SUM({column})" for column in columns)
+    return _summary_upsert(f"SELECT pay_period, {department}, {employee_type}, {sign}COUNT(*), {sums} "
+                           f"FROM payslips WHERE emp_id = {row}.emp_id GROUP BY pay_period", columns)
+
+
+def _summary_prune(pay_periods, department, employee_type):
+    """Drop the summary rows a trigger emptied, looking only at the keys it changed (by primary key)"""
+    return (f"DELETE FROM payroll_summary WHERE pay_period IN ({pay_periods}) AND department = {department} "
+            f"AND employee_type = {employee_type} AND payslip_count <= 0")
+
+
+def _summary_payslip_prune(row):
+    """_summary_prune for the key a single payslip row (OLD) was summarised under"""
+    return _summary_prune(f"{row}.pay_period", _SUMMARY_DEPARTMENT.format(row=row), _SUMMARY_TYPE.format(row=row))
+
+
+def _summary_employee_prune(row, department, employee_type):
+    """_summary_prune for the keys of all pay periods of one employee under the given department/type"""
+    return _summary_prune(f"SELECT pay_period FROM payslips WHERE emp_id = {row}.emp_id", department, employee_type)
+
+
+def _summary_recompute_sql(columns):
+    """Full recompute of payroll_summary from the payslips table"""
+    return f'''
+    SELECT p.pay_period, COALESCE(e.department, 'Unknown'), COALESCE(e.employee_type, 'Unknown'),
+           COUNT(*), {", ".join(f"SUM(p.{column})" for column in columns)}
+    FROM payslips p LEFT JOIN employees e ON e.emp_id = p.emp_id
+    GROUP BY 1, 2, 3
+'''
+
+
+def _summary_triggers(columns):
+    """Triggers keeping payroll_summary in step with payslips and employees"""
+    return (
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_payslips_insert_summary AFTER INSERT ON payslips BEGIN
+            {_summary_payslip_delta("NEW", "+", columns)};
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_payslips_update_summary AFTER UPDATE ON payslips BEGIN
+            {_summary_payslip_delta("OLD", "-", columns)};
+            {_summary_payslip_delta("NEW", "+", columns)};
+            {_summary_payslip_prune("OLD")};
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_payslips_delete_summary AFTER DELETE ON payslips BEGIN
+            {_summary_payslip_delta("OLD", "-", columns)};
+            {_summary_payslip_prune("OLD")};
+        END
+        ''',
+        # Moving an employee moves all of their payslips to the new department / type
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_employees_update_summary
+        AFTER UPDATE OF department, employee_type ON employees
+        WHEN OLD.department IS NOT NEW.department OR OLD.employee_type IS NOT NEW.employee_type BEGIN
+            {_summary_employee_delta("OLD", "OLD.department", "OLD.employee_type", "-", columns)};
+            {_summary_employee_delta("NEW", "NEW.department", "NEW.employee_type", "+", columns)};
+            {_summary_employee_prune("OLD", "OLD.department", "OLD.employee_type")};
+        END
+        ''',
+        # Payslips stored before their employee row was summarised under 'Unknown'
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_employees_insert_summary AFTER INSERT ON employees BEGIN
+            {_summary_employee_delta("NEW", "'Unknown'", "'Unknown'", "-", columns)};
+            {_summary_employee_delta("NEW", "NEW.department", "NEW.employee_type", "+", columns)};
+            {_summary_employee_prune("NEW", "'Unknown'", "'Unknown'")};
+        END
+        ''',
+        # An employee's payslips go with them; deleting them first lets the payslip
+        # trigger still see which department they were summarised under
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_employees_delete_payslips BEFORE DELETE ON employees BEGIN
+            DELETE FROM payslips WHERE emp_id = OLD.emp_id;
+        END
+        ''',
+    )
+
+
+SUMMARY_RECOMPUTE_SQL = _summary_recompute_sql(SUMMARY_COLUMNS)
+SUMMARY_TRIGGER_NAMES = ("trg_payslips_insert_summary", "trg_payslips_update_summary", "trg_payslips_delete_summary",
+                         "trg_employees_update_summary", "trg_employees_insert_summary",
+                         "trg_employees_delete_payslips")
+
+# Numeric suffix of an employee ID (the NNNN of DEPT-T-NNNN)
+EMP_ID_NUMBER_SQL = "CAST(substr(emp_id, length(rtrim(emp_id, '0123456789')) + 1) AS INTEGER)"
+
+# Payslips paid again later for the same employee and pay period (all but the newest)
+_SUPERSEDED_PAYSLIP_IDS = '''
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY emp_id, pay_period ORDER BY creation_date DESC, id DESC) AS newest
+        FROM payslips)
+    WHERE newest > 1
+'''
+
+# Schema history of paysphere.db. Each migration is (version, description, statements);
+# init_db applies the ones newer than the version stored in PRAGMA user_version, in
+# order, each inside its own transaction. Never edit a released migration - add a new one.
+MIGRATIONS = (
+    (1, "employees and payslips tables", (
+        '''
+        CREATE TABLE IF NOT EXISTS employees (
+            emp_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            job_title TEXT NOT NULL,
+            email TEXT NOT NULL UNIQUE,
+            phone TEXT,
+            department TEXT NOT NULL,
+            manager TEXT,
+            hire_date TEXT,
+            birth_date TEXT,
+            employee_type TEXT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS payslips (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id TEXT NOT NULL,
+            pay_period TEXT NOT NULL,
+            total_hours REAL NOT NULL,
+            overtime_hours REAL NOT NULL,
+            basic_salary REAL NOT NULL,
+            incentives REAL NOT NULL,
+            bonus REAL NOT NULL,
+            overtime_pay REAL NOT NULL,
+            total_earnings REAL NOT NULL,
+            salary_advance REAL NOT NULL,
+            sss_contribution REAL NOT NULL,
+            philhealth_contribution REAL NOT NULL,
+            pagibig_contribution REAL NOT NULL,
+            total_deductions REAL NOT NULL,
+            net_pay REAL NOT NULL,
+            creation_date TEXT NOT NULL
+        )
+        ''',
+    )),
+    (2, "indexes for payslip lookups", (
+        # view_payslip (latest payslip of an employee) and delete_employee
+        "CREATE INDEX IF NOT EXISTS idx_payslips_emp_created ON payslips (emp_id, creation_date)",
+        # payroll report and pay runs for one pay period
+        "CREATE INDEX IF NOT EXISTS idx_payslips_period ON payslips (pay_period, emp_id)",
+    )),
+    (3, "indexes for the employee listing", (
+        "CREATE INDEX IF NOT EXISTS idx_employees_department ON employees (department COLLATE NOCASE, emp_id)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_hire_date ON employees (hire_date, emp_id)",
+    )),
+    (4, "one payslip per employee and pay period", (
+        # Keep only the newest payslip where a period was paid more than once; the older
+        # ones move to payslips_archive, as stored at the time (REAL pesos, no withholding tax)
+        "CREATE TABLE IF NOT EXISTS payslips_archive AS SELECT * FROM payslips WHERE false",
+        f"INSERT INTO payslips_archive SELECT * FROM payslips WHERE id IN ({_SUPERSEDED_PAYSLIP_IDS})",
+        f"DELETE FROM payslips WHERE id IN ({_SUPERSEDED_PAYSLIP_IDS})",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_payslips_emp_period ON payslips (emp_id, pay_period)",
+    )),
+    (5, "payroll_summary table kept up to date by triggers", (
+        f'''
+        CREATE TABLE IF NOT EXISTS payroll_summary (
+            pay_period TEXT NOT NULL,
+            department TEXT NOT NULL,
+            employee_type TEXT NOT NULL,
+            payslip_count INTEGER NOT NULL,
+            {", ".join(f"{column} REAL NOT NULL" for column in _SUMMARY_COLUMNS_V5)},
+            PRIMARY KEY (pay_period, department, employee_type)
+        ) WITHOUT ROWID
+        ''',
+        *_summary_triggers(_SUMMARY_COLUMNS_V5),
+        "DELETE FROM payroll_summary",
+        f"INSERT INTO payroll_summary {_summary_recompute_sql(_SUMMARY_COLUMNS_V5)}",
+    )),
+    (6, "persistent ID sequences", (
+        '''
+        CREATE TABLE IF NOT EXISTS sequences (
+            name TEXT PRIMARY KEY,
+            next_value INTEGER NOT NULL
+        )
+        ''',
+        # Employee numbering continues after the highest numeric suffix already stored
+        f"INSERT OR IGNORE INTO sequences (name, next_value) "
+        f"SELECT 'employee_id', COALESCE(MAX({EMP_ID_NUMBER_SQL}), 0) + 1 FROM employees",
+    )),
+    (7, "money in integer centavos", (
+        # Tables are rebuilt to change column types; the triggers go first because they refer to payslips
+        *(f"DROP TRIGGER IF EXISTS {name}" for name in SUMMARY_TRIGGER_NAMES),
+        f'''
+        CREATE TABLE payslips_centavos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id TEXT NOT NULL,
+            pay_period TEXT NOT NULL,
+            total_hours REAL NOT NULL,
+            overtime_hours REAL NOT NULL,
+            {", ".join(f"{column} INTEGER NOT NULL" for column in _MONEY_COLUMNS_V5)},
+            creation_date TEXT NOT NULL
+        )
+        ''',
+        # Peso amounts become centavos rounded half away from zero; the inner ROUND drops
+        # binary floating-point noise such as 14.499999999999998 for 0.145 pesos
+        f'''
+        INSERT INTO payslips_centavos (id, emp_id, pay_period, total_hours, overtime_hours,
+                                       {", ".join(_MONEY_COLUMNS_V5)}, creation_date)
+        SELECT id, emp_id, pay_period, total_hours, overtime_hours,
+               {", ".join(f"CAST(ROUND(ROUND({column} * 100, 4)) AS INTEGER)" for column in _MONEY_COLUMNS_V5)},
+               creation_date
+        FROM payslips
+        ''',
+        "DROP TABLE payslips",
+        "ALTER TABLE payslips_centavos RENAME TO payslips",
+        "CREATE INDEX IF NOT EXISTS idx_payslips_emp_created ON payslips (emp_id, creation_date)",
+        "CREATE INDEX IF NOT EXISTS idx_payslips_period ON payslips (pay_period, emp_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_payslips_emp_period ON payslips (emp_id, pay_period)",
+        "DROP TABLE payroll_summary",
+        f'''
+        CREATE TABLE payroll_summary (
+            pay_period TEXT NOT NULL,
+            department TEXT NOT NULL,
+            employee_type TEXT NOT NULL,
+            payslip_count INTEGER NOT NULL,
+            {", ".join(f"{column} {'REAL' if column in HOUR_COLUMNS else 'INTEGER'} NOT NULL"
+                       for column in _SUMMARY_COLUMNS_V5)},
+            PRIMARY KEY (pay_period, department, employee_type)
+        ) WITHOUT ROWID
+        ''',
+        *_summary_triggers(_SUMMARY_COLUMNS_V5),
+        f"INSERT INTO payroll_summary {_summary_recompute_sql(_SUMMARY_COLUMNS_V5)}",
+    )),
+    (8, "withholding tax on payslips", (
+        # Payslips stored before withholding was computed keep a tax of 0
+        "ALTER TABLE payslips ADD COLUMN withholding_tax INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE payroll_summary ADD COLUMN withholding_tax INTEGER NOT NULL DEFAULT 0",
+        *(f"DROP TRIGGER IF EXISTS {name}" for name in SUMMARY_TRIGGER_NAMES),
+        *_summary_triggers(SUMMARY_COLUMNS),
+    )),
+    (9, "summary triggers prune only the rows they change", (
+        # Earlier triggers scanned the whole payroll_summary table for empty rows on every change
+        *(f"DROP TRIGGER IF EXISTS {name}" for name in SUMMARY_TRIGGER_NAMES),
+        *_summary_triggers(SUMMARY_COLUMNS),
+    )),
+    (10, "indexes for every employee sort key", (
+        # The listing pages through employees in (sort key, emp_id) order with an index search per page
+        "CREATE INDEX IF NOT EXISTS idx_employees_name ON employees (name, emp_id)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_department_sort ON employees (department, emp_id)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_manager ON employees (manager, emp_id)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_type ON employees (employee_type, emp_id)",
+    )),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Statements the triggers run for each changed row; PayrollSystem's own lookups are passed to
+# check_query_plans by the caller, built from the SQL it runs
+QUERY_PLAN_CHECKS = (
+    ("payslips of a deleted employee (trg_employees_delete_payslips)",
+     "DELETE FROM payslips WHERE emp_id = ?", ("HR-F-0001",)),
+    ("pay periods of an employee (trg_employees_update_summary)",
+     "SELECT pay_period FROM payslips WHERE emp_id = ? GROUP BY pay_period", ("HR-F-0001",)),
+    ("summary row of a payslip (payslip triggers)",
+     "SELECT * FROM payroll_summary WHERE pay_period = ? AND department = ? AND employee_type = ?",
+     ("2024-01", "Finance", "F")),
+)
+
+# Per-connection settings: WAL lets readers run while a writer commits, NORMAL
+# synchronous is durable in WAL mode without an fsync on every commit, and the page
+# cache / memory map keep hot pages out of the read() path.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",      # 16 MB page cache
+    "PRAGMA mmap_size = 268435456",    # 256 MB memory-mapped I/O
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Number of prepared statements sqlite3 keeps per connection. All SQL in the
+# program uses fixed text with ? placeholders, so repeated queries skip parsing.
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_all_connections = []
+_all_connections_lock = threading.Lock()
+
+
+def connect(db_path=DB_PATH):
+    """Open a new tuned connection whose rows can be read by index or by column name"""
+    conn = sqlite3.connect(db_path, timeout=30, cached_statements=STATEMENT_CACHE_SIZE,
+                           check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_db(db_path=DB_PATH):
+    """
+    Return the calling thread's connection to db_path, opening it on first use.
+    The connection is reused for the lifetime of the thread, so callers must not close it;
+    use it as a context manager to commit or roll back a transaction.
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    key = os.path.abspath(db_path)
+    conn = connections.get(key)
+    if conn is None:
+        conn = connections[key] = connect(db_path)
+        with _all_connections_lock:
+            _all_connections.append(conn)
+    return conn
+
+
+def close_db():
+    """Close the calling thread's connections"""
+    connections = getattr(_local, 'connections', None) or {}
+    with _all_connections_lock:
+        for conn in connections.values():
+            if conn in _all_connections:
+                _all_connections.remove(conn)
+            conn.close()
+    connections.clear()
+
+
+@atexit.register
+def close_all():
+    """Close every connection opened by any thread (runs automatically at exit)"""
+    with _all_connections_lock:
+        for conn in _all_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _all_connections.clear()
+    connections = getattr(_local, 'connections', None)
+    if connections:
+        connections.clear()
+
+
+class WriteBehindQueue:
+    """
+    Queue rows for one INSERT statement and write them from a background thread in grouped
+    transactions: once batch_size rows are waiting, once the oldest waiting row is
+    flush_interval seconds old, or when flush() is called. put() blocks while max_pending
+    rows are already waiting.
+
+    Crash semantics:
+      * A row is in the database once the transaction of its batch commits; flush() and
+        close() return only after everything queued before them has committed.
+      * close() runs at interpreter exit, so a normal exit, sys.exit() or an uncaught
+        exception loses nothing.
+      * If the process dies without running exit handlers (SIGKILL, os._exit, power loss),
+        rows that were still queued are lost: at most max_pending + batch_size rows, usually
+        the last flush_interval seconds of writes. Each batch is one transaction, so a batch
+        is either fully stored or not at all, and rows are written in the order they were put.
+        With synchronous = NORMAL a power loss can also undo the last committed batches.
+      * A batch that fails is rolled back; its rows are kept in failed_rows and the error is
+        raised by the next put(), flush() or close().
+      * on_commit, if given, is called on the background thread with the rows of each batch
+        once it has committed (never for a batch that failed); its errors are raised the same way.
+      * If the background thread itself stops on an error, the rows it held and every row
+        still queued go to failed_rows, and every later put(), flush() or close() raises
+        that error instead of waiting for a thread that is gone.
+    """
+
+    _STOP = object()
+    # How often a blocked put() or flush() checks that the background thread is still running
+    _POLL_INTERVAL = 0.1
+
+    def __init__(self, db_path, sql, batch_size=500, flush_interval=0.5, max_pending=10000, on_commit=None):
+        self.db_path = db_path
+        self.sql = sql
+        self.on_commit = on_commit
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.failed_rows = []
+        self.batches_written = 0
+        self._queue = queue.Queue(max_pending)
+        self._error = None
+        self._failure = None  # error that stopped the background thread
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        # Daemon threads are stopped after the exit handlers run, so this still drains the queue
+        atexit.register(self.close)
+
+    def put(self, row):
+        self._raise_error()
+        if self._closed:
+            raise RuntimeError("write-behind queue is closed")
+        self._enqueue(row)
+
+    def flush(self):
+        """Wait until every row put so far has been committed"""
+        if not self._closed:
+            done = threading.Event()
+            self._enqueue(done)
+            while not done.wait(self._POLL_INTERVAL):
+                self._check_thread()
+        self._raise_error()
+
+    def close(self):
+        """Write the remaining rows and stop the background thread"""
+        if not self._closed:
+            self._closed = True
+            atexit.unregister(self.close)
+            if self._failure is None:
+                self._enqueue(self._STOP)
+                self._thread.join()
+        self._raise_error()
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def _raise_error(self):
+        self._check_thread()
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _check_thread(self):
+        if self._failure is not None:
+            raise self._failure
+        if not self._thread.is_alive() and not self._closed:
+            raise RuntimeError("write-behind thread is not running")
+
+    def _enqueue(self, item):
+        # A full queue only drains while the background thread runs
+        while True:
+            self._check_thread()
+            try:
+                self._queue.put(item, timeout=self._POLL_INTERVAL)
+                return
+            except queue.Full:
+                pass
+
+    def _run(self):
+        batch = []
+        try:
+            self._serve(batch)
+        except Exception as e:
+            self.failed_rows.extend(batch)
+            self._failure = e
+            # Nothing will write the queued rows any more
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not self._STOP and not isinstance(item, threading.Event):
+                    self.failed_rows.append(item)
+
+    def _serve(self, batch):
+        conn = connect(self.db_path)
+        deadline = None
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()) if batch else None)
+                except queue.Empty:
+                    item = None  # the oldest row has waited flush_interval seconds
+
+                if item is None or item is self._STOP or isinstance(item, threading.Event):
+                    self._write(conn, batch)
+                    if item is self._STOP:
+                        return
+                    if item is not None:
+                        item.set()
+                    continue
+
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._write(conn, batch)
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        if not batch:
+            return
+        try:
+            with conn:
+                conn.executemany(self.sql, batch)
+            self.batches_written += 1
+        except sqlite3.Error as e:
+            self.failed_rows.extend(batch)
+            self._error = e
+        else:
+            if self.on_commit is not None:
+                try:
+                    self.on_commit(list(batch))
+                except Exception as e:
+                    self._error = e
+        batch.clear()
+
+
+class IdSequence:
+    """
+    Numbers from a row of the sequences table. Numbers are reserved in blocks of block_size:
+    one short BEGIN IMMEDIATE transaction moves the stored next_value past the block, after
+    which next() hands them out from memory. Every process reserves its own blocks, so two
+    processes never get the same number. Numbers left over when a process ends are not
+    reused, which leaves gaps in the numbering.
+    """
+
+    def __init__(self, db_path, name, block_size=100):
+        self.db_path = db_path
+        self.name = name
+        self.block_size = block_size
+        self._next = self._end = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def next(self):
+        with self._lock:
+            if self._next >= self._end:
+                self._reserve(self.block_size)
+            value = self._next
+            self._next += 1
+            return value
+
+    def reserve(self, count):
+        """Make sure the next count numbers come from memory (one database round trip at most)"""
+        with self._lock:
+            missing = count - (self._end - self._next)
+            if missing > 0:
+                self._reserve(max(missing, self.block_size))
+
+    def advance_past(self, value):
+        """Never hand out value or anything below it, e.g. after rows were inserted by other means"""
+        with self._lock:
+            with self._connection() as conn:
+                conn.execute("UPDATE sequences SET next_value = MAX(next_value, ?) WHERE name = ?",
+                             (value + 1, self.name))
+            if self._next <= value:
+                self._next = self._end = 0
+
+    def _connection(self):
+        # A connection of its own, so a reservation is never part of the caller's transaction
+        if self._conn is None:
+            self._conn = connect(self.db_path)
+            self._conn.isolation_level = None
+        return self._conn
+
+    def _reserve(self, count):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("UPDATE sequences SET next_value = next_value + ? WHERE name = ? RETURNING next_value",
+                               (count, self.name)).fetchone()
+            if row is None:
+                raise sqlite3.OperationalError(f"no sequence named {self.name!r}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._end = row[0]
+        self._next = self._end - count
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Bring the schema up to SCHEMA_VERSION; returns the list of versions applied"""
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version <= get_schema_version(conn):
+            continue
+        # IMMEDIATE takes the write lock up front so two processes cannot apply the same migration
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version > get_schema_version(conn):
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                applied.append(version)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return applied
+
+
+def check_query_plans(conn, checks=()):
+    """
+    Assert that every query in QUERY_PLAN_CHECKS and checks ((name, sql, params) tuples) reads
+    its tables through an index: an index search, or, for a query with a LIMIT, a walk along
+    an index in ORDER BY order that stops after LIMIT rows. A full table scan or a temporary
+    sort fails the check.
+    """
+    for name, sql, params in (*QUERY_PLAN_CHECKS, *checks):
+        details = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        plan = "; ".join(details)
+        for detail in details:
+            if detail.startswith("SCAN"):
+                assert " USING " in detail and "LIMIT" in sql.upper(), f"{name}: table scan ({plan})"
+        assert not any("TEMP B-TREE" in detail for detail in details), f"{name}: needs a sort ({plan})"
+
+
+def rebuild_payroll_summary(conn):
+    """Recompute payroll_summary from scratch in one transaction"""
+    with conn:
+        conn.execute("DELETE FROM payroll_summary")
+        conn.execute(f"INSERT INTO payroll_summary {SUMMARY_RECOMPUTE_SQL}")
+
+
+def check_payroll_summary(conn, tolerance=0.005):
+    """
+    Compare payroll_summary with a full recompute. Returns a list of
+    (pay_period, department, employee_type, column, stored value, expected value)
+    for every difference; an empty list means the summary is consistent.
+    """
+    columns = ("payslip_count",) + SUMMARY_COLUMNS
+    stored = {tuple(row[:3]): row[3:] for row in conn.execute(
+        f"SELECT pay_period, department, employee_type, {', '.join(columns)} FROM payroll_summary")}
+    expected = {tuple(row[:3]): row[3:] for row in conn.execute(SUMMARY_RECOMPUTE_SQL)}
+
+    differences = []
+    for key in sorted(stored.keys() | expected.keys()):
+        stored_values = stored.get(key) or (None,) * len(columns)
+        expected_values = expected.get(key) or (None,) * len(columns)
+        for column, stored_value, expected_value in zip(columns, stored_values, expected_values):
+            if stored_value is None or expected_value is None or abs(stored_value - expected_value) > tolerance:
+                differences.append((*key, column, stored_value, expected_value))
+    return differences
+
+
+def init_db(db_path=DB_PATH):
+    """Create or upgrade the schema of db_path"""
+    return migrate(get_db(db_path))
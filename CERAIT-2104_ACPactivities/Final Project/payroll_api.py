@@ -0,0 +1,352 @@
+"""
+Local HTTP/JSON API for PayrollSystem, standard library only.
+
+    GET    /employees                        first page of employees (?department= &employee_type=
+                                             &manager= &sort_by= &limit=)
+    POST   /employees                        register an employee (EMPLOYEE_IMPORT_FIELDS as JSON)
+    GET    /employees/<emp_id>               employee details
+    PATCH  /employees/<emp_id>               change some employee details (null clears phone,
+                                             manager, hire_date or birth_date)
+    DELETE /employees/<emp_id>               delete an employee and their payslips
+    POST   /employees/<emp_id>/payslips      create a payslip (total_hours_worked, over_hours,
+                                             salary_advance, incentives, bonus, pay_period)
+    GET    /employees/<emp_id>/payslip       latest payslip (?pay_period=yyyy-mm for another one)
+    GET    /payroll/<yyyy-mm>                payroll report of a pay period
+
+Money sent in (salary_advance, incentives, bonus) is in pesos; money sent back is integer
+centavos, exactly as stored, so 1234567 means 12,345.67 pesos.
+
+Reads run concurrently on a thread pool and only query the database, where WAL lets them
+run next to a writer. Every change is queued for a single writer task that applies them one
+at a time on its own thread, so the PayrollSystem in memory is only ever changed by that thread.
+"""
+import json
+import time
+import random
+import asyncio
+import sqlite3
+import functools
+from urllib.parse import urlsplit, parse_qsl
+from concurrent.futures import ThreadPoolExecutor
+
+from payroll_formats import is_pay_period
+
+MAX_BODY_SIZE = 1 << 20
+MAX_PAGE_SIZE = 500
+
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+PAY_PERIOD_ERROR = "pay period must use yyyy-mm format with a month from 01 to 12"
+PAYSLIP_REQUEST_FIELDS = ("total_hours_worked", "over_hours", "salary_advance", "incentives", "bonus", "pay_period")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class PayrollAPI:
+    """Routes requests to a PayrollSystem: reads on a thread pool, changes through one writer"""
+
+    def __init__(self, system, readers=8, queue_size=1024):
+        self.system = system
+        self.readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="payroll-read")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="payroll-write")
+        self.queue_size = queue_size
+        self.writes = None
+        self.writer_task = None
+
+    async def start(self):
+        self.writes = asyncio.Queue(self.queue_size)
+        self.writer_task = asyncio.create_task(self._write_loop())
+
+    async def stop(self):
+        if self.writer_task is not None:
+            self.writer_task.cancel()
+        self.readers.shutdown(wait=True)
+        self.writer.shutdown(wait=True)
+
+    async def read(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.readers, functools.partial(function, *args, **kwargs))
+
+    async def write(self, function, *args, **kwargs):
+        """Queue a change for the writer task and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        # A full queue makes callers wait here instead of piling up work
+        await self.writes.put((functools.partial(function, *args, **kwargs), future))
+        return await future
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            change, future = await self.writes.get()
+            try:
+                result = await loop.run_in_executor(self.writer, change)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+
+    def _first_page(self, **filters):
+        return [dict(row) for row in next(self.system.list_employees(**filters), [])]
+
+    async def dispatch(self, method, target, body):
+        """Return (status, JSON payload) for one request"""
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        parts = [part for part in url.path.split("/") if part]
+        system = self.system
+
+        if parts == ["employees"]:
+            if method == "GET":
+                filters = {name: query[name] for name in ("department", "employee_type", "manager", "sort_by")
+                           if query.get(name)}
+                try:
+                    limit = min(int(query.get("limit", 50)), MAX_PAGE_SIZE)
+                except ValueError:
+                    raise HTTPError(400, "limit must be a number") from None
+                return 200, await self.read(self._first_page, page_size=max(limit, 1), **filters)
+            if method == "POST":
+                return 201, {"emp_id": await self.write(system.add_employee, self._object(body))}
+
+        elif len(parts) == 2 and parts[0] == "employees":
+            emp_id = parts[1].upper()
+            if method == "GET":
+                return 200, self._found(await self.read(system.fetch_employee, emp_id))
+            if method in ("PATCH", "PUT"):
+                await self.write(system.edit_employee, emp_id, self._object(body))
+                return 200, self._found(await self.read(system.fetch_employee, emp_id))
+            if method == "DELETE":
+                await self.write(system.remove_employee, emp_id)
+                return 200, {"deleted": emp_id}
+
+        elif len(parts) == 3 and parts[0] == "employees" and parts[2] in ("payslip", "payslips"):
+            emp_id = parts[1].upper()
+            if method == "GET":
+                pay_period = query.get("pay_period")
+                if pay_period is not None and not is_pay_period(pay_period):
+                    raise HTTPError(400, PAY_PERIOD_ERROR)
+                return 200, self._found(await self.read(system.fetch_payslip, emp_id, pay_period))
+            if method == "POST":
+                request = self._object(body)
+                unknown = set(request) - set(PAYSLIP_REQUEST_FIELDS)
+                if unknown:
+                    raise HTTPError(400, f"unknown fields: {', '.join(sorted(unknown))}")
+                # The payslip just computed; with write-behind it may not be in the database yet
+                return 201, await self.write(system.issue_payslip, emp_id,
+                                             **{field: request.get(field) or 0 for field in PAYSLIP_REQUEST_FIELDS[:-1]},
+                                             pay_period=request.get("pay_period"))
+
+        elif len(parts) == 2 and parts[0] == "payroll":
+            if not is_pay_period(parts[1]):
+                raise HTTPError(400, PAY_PERIOD_ERROR)
+            if method == "GET":
+                return 200, await self.read(system.payroll_report, parts[1])
+
+        else:
+            raise HTTPError(404, "no such resource")
+        raise HTTPError(405, f"{method} is not supported here")
+
+    @staticmethod
+    def _object(body):
+        try:
+            value = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "request body is not valid JSON") from None
+        if not isinstance(value, dict):
+            raise HTTPError(400, "request body must be a JSON object")
+        return value
+
+    @staticmethod
+    def _found(value):
+        if value is None:
+            raise HTTPError(404, "not found")
+        return value
+
+    async def respond(self, method, target, body):
+        try:
+            return await self.dispatch(method, target, body)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except KeyError as e:
+            return 404, {"error": f"employee {e.args[0]} not found"}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except OverflowError:
+            return 400, {"error": "number too large"}
+        except sqlite3.Error as e:
+            return 500, {"error": f"database error: {e}"}
+        except Exception as e:
+            # Anything else still gets an answer instead of a dropped connection
+            return 500, {"error": f"internal error: {type(e).__name__}: {e}"}
+
+    async def handle(self, reader, writer):
+        """Serve one client connection (HTTP/1.1 keep-alive, one request at a time)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    self._send(writer, 400, {"error": "malformed request line"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self._send(writer, 400, {"error": "invalid Content-Length"}, False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    self._send(writer, 413, {"error": "request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.respond(method.upper(), target, body)
+                self._send(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _send(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+
+
+async def _serve(system, host, port, readers):
+    api = PayrollAPI(system, readers)
+    await api.start()
+    server = await asyncio.start_server(api.handle, host, port)
+    print(f"PaySphere API listening on http://{host}:{server.sockets[0].getsockname()[1]}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await api.stop()
+
+
+def serve(system, host="127.0.0.1", port=8080, readers=8):
+    """Run the API until interrupted"""
+    try:
+        asyncio.run(_serve(system, host, port, readers))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _request(reader, writer, method, path, payload=None):
+    """One keep-alive request; returns (status, decoded JSON)"""
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length)) if length else None
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+async def _load(host, port, total, concurrency, write_ratio, pay_period, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    status, employees = await _request(reader, writer, "GET", f"/employees?limit={MAX_PAGE_SIZE}")
+    writer.close()
+    if status != 200 or not employees:
+        raise RuntimeError("the server has no employees to load-test with")
+    emp_ids = [employee["emp_id"] for employee in employees]
+
+    # Request plan: mostly reads, write_ratio of payslip writes
+    plan = []
+    for _ in range(total):
+        emp_id = rng.choice(emp_ids)
+        if rng.random() < write_ratio:
+            plan.append(("create payslip", "POST", f"/employees/{emp_id}/payslips",
+                         {"total_hours_worked": rng.randint(80, 200), "over_hours": rng.randint(0, 12),
+                          "pay_period": pay_period}))
+        else:
+            plan.append(rng.choice((("view employee", "GET", f"/employees/{emp_id}", None),
+                                    ("view payslip", "GET", f"/employees/{emp_id}/payslip", None),
+                                    ("payroll report", "GET", f"/payroll/{pay_period}", None))))
+
+    latencies = {}
+    errors = 0
+
+    async def client(requests):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for kind, method, path, payload in requests:
+                start = time.perf_counter()
+                status, _ = await _request(reader, writer, method, path, payload)
+                latencies.setdefault(kind, []).append(time.perf_counter() - start)
+                if status >= 400 and status != 404:
+                    errors += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(plan[number::concurrency]) for number in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def run_load(host="127.0.0.1", port=8080, total=2000, concurrency=16, write_ratio=0.1, pay_period=None, seed=7):
+    """
+    Load-test a running API with keep-alive clients and print p50/p99 latency per request
+    kind. Returns {kind: (count, p50, p99)} in seconds, with "all" for every request.
+    """
+    pay_period = pay_period or time.strftime("%Y-%m")
+    latencies, errors, elapsed = asyncio.run(_load(host, port, total, concurrency, write_ratio, pay_period, seed))
+    latencies["all"] = [latency for values in latencies.values() for latency in values]
+
+    results = {}
+    print(f"{len(latencies['all'])} requests, {concurrency} connections, {elapsed:.2f}s "
+          f"({len(latencies['all']) / elapsed:,.0f} requests/sec), {errors} errors")
+    for kind, values in latencies.items():
+        values.sort()
+        results[kind] = (len(values), percentile(values, 0.5), percentile(values, 0.99))
+        print(f"{kind:>16}: {len(values):>6} requests, p50 {results[kind][1] * 1000:7.2f} ms, "
+              f"p99 {results[kind][2] * 1000:7.2f} ms")
+    return results
@@ -0,0 +1,173 @@
+"""
+Payroll export for other tools: the payslips of a pay period joined with their employees,
+streamed to CSV or to a columnar binary file.
+
+Both exporters read the query with fetchmany in chunks, so memory stays the same whatever
+the number of payslips. The columnar file is laid out for fast loading:
+
+    magic  b"PSCOL\\x00\\x01\\x00"
+    uint32 header length, JSON header {"pay_period": ..., "columns": [[name, type], ...]}
+    batches, one per chunk:
+        uint32 row count, then per column: uint64 byte length and the bytes
+    uint32 0 (end of batches), uint64 total row count
+
+Column types are "text" (UTF-8 values joined by NUL bytes), "hours" (float64) and "money"
+(int64 centavos); numbers are little-endian. Loading is one frombytes call per numeric
+column and batch and one decode/split per text column and batch.
+"""
+import csv
+import sys
+import json
+import time
+import struct
+from array import array
+
+from database import SUMMARY_COLUMNS, HOUR_COLUMNS
+from payroll_formats import format_money
+
+MAGIC = b"PSCOL\x00\x01\x00"
+DEFAULT_CHUNK_SIZE = 5000
+
+# (name, SQL expression, type) of every exported column, in file order
+EXPORT_COLUMNS = (
+    ("emp_id", "p.emp_id", "text"),
+    ("name", "COALESCE(e.name, '')", "text"),
+    ("job_title", "COALESCE(e.job_title, '')", "text"),
+    ("department", "COALESCE(e.department, 'Unknown')", "text"),
+    ("employee_type", "COALESCE(e.employee_type, 'Unknown')", "text"),
+    ("pay_period", "p.pay_period", "text"),
+    *((column, f"p.{column}", "hours" if column in HOUR_COLUMNS else "money") for column in SUMMARY_COLUMNS),
+    ("creation_date", "p.creation_date", "text"),
+)
+EXPORT_SQL = f'''
+    SELECT {", ".join(expression for _, expression, _ in EXPORT_COLUMNS)}
+    FROM payslips p LEFT JOIN employees e ON e.emp_id = p.emp_id
+    WHERE p.pay_period = ?
+    ORDER BY p.emp_id
+'''
+ARRAY_TYPECODES = {"hours": "d", "money": "q"}
+
+_BATCH = struct.Struct("<I")
+_LENGTH = struct.Struct("<Q")
+
+
+def stream_payroll(conn, pay_period, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the EXPORT_COLUMNS rows of a pay period in lists of at most chunk_size rows"""
+    cursor = conn.execute(EXPORT_SQL, (pay_period,))
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+
+def _summary(rows, path, start):
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "path": path, "elapsed_seconds": elapsed,
+            "rows_per_second": rows / elapsed if elapsed > 0 else 0.0}
+
+
+def export_csv(conn, pay_period, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write a pay period to CSV, money as pesos with two decimals; returns a summary"""
+    start = time.perf_counter()
+    money = [position for position, (_, _, kind) in enumerate(EXPORT_COLUMNS) if kind == "money"]
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as output:
+        writer = csv.writer(output)
+        writer.writerow(name for name, _, _ in EXPORT_COLUMNS)
+        for chunk in stream_payroll(conn, pay_period, chunk_size):
+            for row in chunk:
+                row = list(row)
+                for position in money:
+                    row[position] = format_money(row[position])
+                writer.writerow(row)
+            rows += len(chunk)
+    return _summary(rows, path, start)
+
+
+def _column_bytes(values, kind):
+    if kind == "text":
+        values = [str(value) for value in values]
+        if any("\0" in value for value in values):
+            raise ValueError("text values cannot contain NUL characters")
+        return "\0".join(values).encode("utf-8")
+    values = array(ARRAY_TYPECODES[kind], values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def export_columnar(conn, pay_period, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write a pay period to the columnar binary format (one batch per chunk); returns a summary"""
+    start = time.perf_counter()
+    header = json.dumps({"pay_period": pay_period,
+                         "columns": [[name, kind] for name, _, kind in EXPORT_COLUMNS]}).encode("utf-8")
+    rows = 0
+    with open(path, "wb") as output:
+        output.write(MAGIC + _BATCH.pack(len(header)) + header)
+        for chunk in stream_payroll(conn, pay_period, chunk_size):
+            output.write(_BATCH.pack(len(chunk)))
+            for values, (_, _, kind) in zip(zip(*chunk), EXPORT_COLUMNS):
+                data = _column_bytes(values, kind)
+                output.write(_LENGTH.pack(len(data)) + data)
+            rows += len(chunk)
+        output.write(_BATCH.pack(0) + _LENGTH.pack(rows))
+    return _summary(rows, path, start)
+
+
+def load_columnar(path):
+    """
+    Load a columnar export: returns (header, columns), columns mapping each name to an
+    array ("hours": 'd', "money": 'q') or a list of strings
+    """
+    with open(path, "rb") as source:
+        data = memoryview(source.read())
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path}: not a payroll columnar export")
+    try:
+        header, columns = _read_batches(data)
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"{path}: truncated or damaged export ({e})") from None
+    if sys.byteorder == "big":
+        for values in columns.values():
+            if isinstance(values, array):
+                values.byteswap()
+    return header, columns
+
+
+def _read_batches(data):
+    position = len(MAGIC)
+    (length,) = _BATCH.unpack_from(data, position)
+    position += _BATCH.size
+    header = json.loads(bytes(data[position:position + length]))
+    position += length
+    kinds = [(name, kind) for name, kind in header["columns"]]
+    columns = {name: [] if kind == "text" else array(ARRAY_TYPECODES[kind]) for name, kind in kinds}
+
+    rows = 0
+    while True:
+        (count,) = _BATCH.unpack_from(data, position)
+        position += _BATCH.size
+        if not count:
+            break
+        for name, kind in kinds:
+            (length,) = _LENGTH.unpack_from(data, position)
+            position += _LENGTH.size
+            chunk = data[position:position + length]
+            position += length
+            if kind == "text":
+                values = str(chunk, "utf-8").split("\0")
+                columns[name].extend(values)
+            else:
+                columns[name].frombytes(chunk)
+        rows += count
+    (total,) = _LENGTH.unpack_from(data, position)
+    if total != rows or any(len(values) != rows for values in columns.values()):
+        raise struct.error(f"{rows} of {total} rows")
+    return header, columns
+
+
+EXPORT_FORMATS = {"csv": export_csv, "columnar": export_columnar}
@@ -0,0 +1,25 @@
+"""
+Small value formats shared by the program, the JSON API and the exporters.
+"""
+import re
+from datetime import datetime
+
+CENTAVOS_PER_PESO = 100
+
+
+def is_pay_period(value):
+    """True for a yyyy-mm pay period with a real month (not 2024-00 or 2024-13)"""
+    if not isinstance(value, str) or not re.match(r"^\d{4}-\d{2}$", value):
+        return False
+    try:
+        datetime.strptime(value, "%Y-%m")
+    except ValueError:
+        return False
+    return True
+
+
+def format_money(centavos):
+    """Integer centavos as a peso amount with two decimals, e.g. 1234567 -> '12345.67'"""
+    sign = "-" if centavos < 0 else ""
+    pesos, cents = divmod(abs(centavos), CENTAVOS_PER_PESO)
+    return f"{sign}{pesos}.{cents:02d}"
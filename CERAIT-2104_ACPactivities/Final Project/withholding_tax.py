@@ -0,0 +1,161 @@
+"""
+Withholding tax on compensation, from the graduated income tax tables (TRAIN law).
+
+Each table is a list of brackets (lower bound, tax at the lower bound, rate on the excess),
+compiled once into parallel lists sorted by lower bound. The tax is one bisect (or one
+searchsorted for NumPy arrays) followed by integer arithmetic:
+
+    tax = base tax + (taxable compensation - lower bound) * rate / 10000   (rate in basis points)
+
+Amounts are integer centavos and the division rounds halves up. Taxable compensation is
+what is left after the employee's SSS, PhilHealth and Pag-IBIG contributions. Tables are
+versioned by the first pay period (yyyy-mm) they apply to; withholding_tax_rules()
+returns the monthly and annual tables in force for a pay period.
+"""
+import time
+from bisect import bisect_right
+from functools import lru_cache
+
+BASIS_POINTS = 10000
+
+
+def _pesos(amount):
+    """Whole or fractional pesos to centavos, for writing the tables in pesos"""
+    return round(amount * 100)
+
+
+def graduated_brackets(*brackets):
+    """Brackets given in pesos as (lower bound, base tax, rate in basis points)"""
+    return [(_pesos(lower), _pesos(base), rate) for lower, base, rate in brackets]
+
+
+# Published tables, oldest first: (first pay period, monthly brackets, annual brackets)
+SCHEDULES = (
+    # RA 10963 (TRAIN), 2018-2022
+    ("2018-01",
+     graduated_brackets((0, 0, 0), (20833, 0, 2000), (33333, 2500, 2500), (66667, 10833.33, 3000),
+                        (166667, 40833.33, 3200), (666667, 200833.33, 3500)),
+     graduated_brackets((0, 0, 0), (250000, 0, 2000), (400000, 30000, 2500), (800000, 130000, 3000),
+                        (2000000, 490000, 3200), (8000000, 2410000, 3500))),
+    # RA 10963 (TRAIN), 2023 onwards
+    ("2023-01",
+     graduated_brackets((0, 0, 0), (20833, 0, 1500), (33333, 1875, 2000), (66667, 8541.80, 2500),
+                        (166667, 33541.80, 3000), (666667, 183541.80, 3500)),
+     graduated_brackets((0, 0, 0), (250000, 0, 1500), (400000, 22500, 2000), (800000, 102500, 2500),
+                        (2000000, 402500, 3000), (8000000, 2202500, 3500))),
+)
+
+
+class TaxTable:
+    """One compiled graduated table; call it with a taxable compensation in centavos"""
+    __slots__ = ("lower", "base", "rate", "_arrays")
+
+    def __init__(self, brackets):
+        brackets = sorted(brackets)
+        if not brackets or brackets[0][0] != 0:
+            raise ValueError("the first bracket must start at 0")
+        self.lower = [bracket[0] for bracket in brackets]
+        self.base = [bracket[1] for bracket in brackets]
+        self.rate = [bracket[2] for bracket in brackets]
+        self._arrays = None
+
+    def __call__(self, taxable):
+        if taxable <= 0:
+            return 0
+        position = bisect_right(self.lower, taxable) - 1
+        excess = taxable - self.lower[position]
+        return self.base[position] + (excess * self.rate[position] + BASIS_POINTS // 2) // BASIS_POINTS
+
+    def apply_array(self, taxable):
+        """The same computation for a NumPy array of taxable compensations; returns int64 centavos"""
+        import numpy as np
+        if self._arrays is None:
+            self._arrays = tuple(np.array(values, dtype=np.int64) for values in (self.lower, self.base, self.rate))
+        lower, base, rate = self._arrays
+        taxable = np.maximum(np.asarray(taxable, dtype=np.int64), 0)
+        position = np.searchsorted(lower, taxable, side="right") - 1
+        excess = taxable - lower[position]
+        return base[position] + (excess * rate[position] + BASIS_POINTS // 2) // BASIS_POINTS
+
+
+class WithholdingTaxRules:
+    """The monthly table (used per payslip) and the annual table (used for a whole year) of one version"""
+    __slots__ = ("name", "monthly", "annual")
+
+    def __init__(self, name, monthly, annual):
+        self.name = name
+        self.monthly = TaxTable(monthly)
+        self.annual = TaxTable(annual)
+
+    def __call__(self, taxable):
+        """Tax withheld from one month's taxable compensation"""
+        return self.monthly(taxable)
+
+    def apply_array(self, taxable):
+        return self.monthly.apply_array(taxable)
+
+    def __repr__(self):
+        return f"WithholdingTaxRules({self.name!r})"
+
+
+@lru_cache(maxsize=None)
+def _rules_for(pay_period):
+    # The latest version starting on or before the pay period (the oldest one for earlier periods)
+    position = max(bisect_right([schedule[0] for schedule in SCHEDULES], pay_period) - 1, 0)
+    start, monthly, annual = SCHEDULES[position]
+    return WithholdingTaxRules(f"TRAIN {start}", monthly, annual)
+
+
+def withholding_tax_rules(pay_period=None):
+    """The tables in force for a pay period (yyyy-mm, default: this month), compiled once per version"""
+    return _rules_for(pay_period or time.strftime("%Y-%m"))
+
+
+# Values from the published tables: (pay period, "monthly" or "annual", taxable, tax)
+PUBLISHED_VALUES = (
+    ("2023-01", "monthly", 2083300, 0),
+    ("2023-01", "monthly", 2500000, 62505),
+    ("2023-01", "monthly", 3333300, 187500),
+    ("2023-01", "monthly", 5000000, 520840),
+    ("2023-01", "monthly", 6666700, 854180),
+    ("2023-01", "monthly", 10000000, 1687505),
+    ("2023-01", "monthly", 16666700, 3354180),
+    ("2023-01", "monthly", 66666700, 18354180),
+    ("2023-01", "monthly", 100000000, 30020835),
+    ("2023-01", "annual", 25000000, 0),
+    ("2023-01", "annual", 40000000, 2250000),
+    ("2023-01", "annual", 60000000, 6250000),
+    ("2023-01", "annual", 80000000, 10250000),
+    ("2023-01", "annual", 200000000, 40250000),
+    ("2023-01", "annual", 800000000, 220250000),
+    ("2023-01", "annual", 1000000000, 290250000),
+    ("2022-12", "monthly", 3333300, 250000),
+    ("2022-12", "monthly", 6666700, 1083333),
+    ("2022-12", "annual", 40000000, 3000000),
+    ("2022-12", "annual", 80000000, 13000000),
+)
+
+
+def verify():
+    """
+    Check the scalar and the NumPy computations against PUBLISHED_VALUES and each other.
+    Returns a list of mismatch descriptions (empty when everything agrees).
+    """
+    mismatches = []
+    for pay_period, table, taxable, expected in PUBLISHED_VALUES:
+        actual = getattr(withholding_tax_rules(pay_period), table)(taxable)
+        if actual != expected:
+            mismatches.append(f"{pay_period} {table} {taxable}: {actual}, published {expected}")
+    try:
+        import numpy as np
+    except ImportError:
+        return mismatches
+    taxable = np.arange(-100, 120000000, 9973, dtype=np.int64)
+    for pay_period, _, _ in SCHEDULES:
+        rules = withholding_tax_rules(pay_period)
+        for name, table in (("monthly", rules.monthly), ("annual", rules.annual)):
+            vectorized = table.apply_array(taxable)
+            scalar = np.fromiter((table(int(value)) for value in taxable), dtype=np.int64, count=len(taxable))
+            if not np.array_equal(vectorized, scalar):
+                mismatches.append(f"{pay_period} {name}: scalar and vectorized computations differ")
+    return mismatches
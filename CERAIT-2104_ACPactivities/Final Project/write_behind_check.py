@@ -0,0 +1,129 @@
+"""
+Crash test of database.WriteBehindQueue, run by ``python PaySphere-DBMS.py check-write-behind``.
+
+A child process writes numbered batches through the queue and is killed (SIGKILL, or
+TerminateProcess on Windows) in the middle of a batch transaction; the database it leaves
+behind must pass PRAGMA integrity_check and hold only complete batches, in order.
+"""
+import os
+import time
+import random
+import sqlite3
+import tempfile
+import multiprocessing
+
+from database import connect, WriteBehindQueue
+
+# Rows of numbered batches, each batch exactly one write-behind transaction
+_CRASH_TEST_TABLE = '''
+    CREATE TABLE IF NOT EXISTS crash_test (
+        batch INTEGER NOT NULL,
+        seq INTEGER NOT NULL,
+        payload TEXT NOT NULL,
+        PRIMARY KEY (batch, seq)
+    ) WITHOUT ROWID
+'''
+_CRASH_TEST_INSERT = "INSERT INTO crash_test (batch, seq, payload) VALUES (?, ?, ?)"
+
+
+class _CountedRows(list):
+    """The rows of a batch, counting in shared memory how many executemany has read"""
+
+    def __init__(self, rows, progress):
+        super().__init__(rows)
+        self.progress = progress
+
+    def __iter__(self):
+        for row in super().__iter__():
+            yield row
+            self.progress.value += 1
+
+
+class _CrashTestQueue(WriteBehindQueue):
+    """WriteBehindQueue that shows in shared memory how far the open batch transaction is"""
+
+    writing = None     # multiprocessing.Value: rows sent to SQLite in the open transaction, 0 when none is open
+    committed = None   # multiprocessing.Value: batches committed so far
+
+    def _write(self, conn, batch):
+        self.writing.value = 0
+        try:
+            super()._write(conn, _CountedRows(batch, self.writing))
+        finally:
+            batch.clear()
+            self.committed.value = self.batches_written
+            self.writing.value = 0
+
+
+def _crash_test_writer(db_path, batch_size, writing, committed):
+    """Child process of check_write_behind: queue batch after batch until it is killed"""
+    _CrashTestQueue.writing = writing
+    _CrashTestQueue.committed = committed
+    # Only a full batch triggers a write, so every transaction holds exactly one numbered batch
+    writer = _CrashTestQueue(db_path, _CRASH_TEST_INSERT, batch_size, flush_interval=3600, max_pending=batch_size)
+    payload = "x" * 100
+    batch = 0
+    while True:
+        for seq in range(batch_size):
+            writer.put((batch, seq, payload))
+        batch += 1
+
+
+def check_write_behind(rounds=5, batch_size=2000, seed=17):
+    """
+    Kill a process writing through WriteBehindQueue in the middle of a batch transaction and
+    check what it left behind, once per round: PRAGMA integrity_check is ok, the stored
+    batches are 0..n-1 with every row of each, and n covers every batch the writer reported
+    committed. The writer gets SIGKILL (TerminateProcess on Windows), so no exit handler
+    runs. Each round kills once a random number of batches has committed and a random
+    number of rows of the next one has gone to SQLite; both come from seed.
+    Returns (problems, one result dictionary per round).
+    """
+    rng = random.Random(seed)
+    problems = []
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for number in range(1, rounds + 1):
+            db_path = os.path.join(directory, f"crash-{number}.db")
+            with connect(db_path) as conn:
+                conn.execute(_CRASH_TEST_TABLE)
+            conn.close()
+
+            writing = multiprocessing.Value("q", 0, lock=False)
+            committed = multiprocessing.Value("q", 0, lock=False)
+            writer = multiprocessing.Process(target=_crash_test_writer, args=(db_path, batch_size, writing, committed),
+                                             daemon=True)
+            writer.start()
+            wait_for = rng.randint(1, 8)
+            kill_at = rng.randint(1, batch_size)
+            deadline = time.monotonic() + 60
+            while writer.is_alive() and time.monotonic() < deadline and \
+                    (committed.value < wait_for or writing.value < kill_at):
+                time.sleep(0.0001)
+            rows_in_flight = writing.value
+            if not writer.is_alive():
+                problems.append(f"round {number}: the writer exited with status {writer.exitcode} before the kill")
+            writer.kill()
+            writer.join()
+            reported = committed.value
+
+            conn = sqlite3.connect(db_path)
+            try:
+                integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+                batches = conn.execute("SELECT batch, COUNT(*), MIN(seq), MAX(seq) FROM crash_test "
+                                       "GROUP BY batch ORDER BY batch").fetchall()
+            finally:
+                conn.close()
+            if integrity != "ok":
+                problems.append(f"round {number}: integrity_check reports {integrity}")
+            for position, (batch, count, first, last) in enumerate(batches):
+                if batch != position:
+                    problems.append(f"round {number}: batch {batch} stored without batch {position}")
+                    break
+                if (count, first, last) != (batch_size, 0, batch_size - 1):
+                    problems.append(f"round {number}: batch {batch} is partial ({count} of {batch_size} rows)")
+            if len(batches) < reported:
+                problems.append(f"round {number}: {reported} batches committed, {len(batches)} stored")
+            results.append({"round": number, "rows_in_flight": rows_in_flight, "committed": reported,
+                            "stored": len(batches), "integrity": integrity})
+    return problems, results